@@ -28,7 +28,9 @@ def language_by_filename(name):
     return None
 
 
-def write_to_file(filename, contents, force_unix=False):
+_generated_banner_date = re.compile(r"(Auto-generated by LiteX \([^)]*\) on )[0-9: -]+")
+
+def write_to_file(filename, contents, force_unix=False, ignore_banner_date=False):
     newline = None
     if force_unix:
         newline = "\n"
@@ -36,6 +38,11 @@ def write_to_file(filename, contents, force_unix=False):
     if os.path.exists(filename):
         with open(filename, "r", newline=newline) as f:
             old_contents = f.read()
+    if ignore_banner_date and old_contents is not None:
+        # Keep the file (and its timestamp) when only the date of the generated banner differs.
+        old_contents = _generated_banner_date.sub(r"\1", old_contents, count=1)
+        if old_contents == _generated_banner_date.sub(r"\1", contents, count=1):
+            return
     if old_contents != contents:
         with open(filename, "w", newline=newline) as f:
             f.write(contents)
@@ -0,0 +1,257 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Static combinational logic-depth estimation for FHDL fragments.
+
+Estimates, in LUT levels, the depth of the combinational logic between register outputs (or
+inputs/special outputs) and register inputs (or outputs/special inputs) and reports the worst
+paths with their Namespace names. This is a coarse model intended to catch regressions early (in
+seconds, in CI) rather than to replace the static timing analysis of the toolchain.
+"""
+
+import json
+from math import ceil, log
+
+from migen.fhdl.structure import *
+from migen.fhdl.structure import _Operator, _Slice, _Assign, _ArrayProxy, _Fragment
+from migen.fhdl.tools import list_targets, list_signals, list_special_ios
+
+from litex.gen.fhdl.namer import build_namespace
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def _levels(n, k):
+    # Number of levels of a tree of k-input cells reducing n inputs.
+    if n <= 1:
+        return 0
+    return ceil(round(log(n, k), 6))
+
+# Logic Depth Analyzer -----------------------------------------------------------------------------
+
+class LogicDepthAnalyzer:
+    """LogicDepthAnalyzer
+
+    Builds a signal-level graph of the combinational logic of a (lowered) fragment, weights each
+    edge with an estimated cost in LUT levels and computes the longest path to each endpoint.
+
+    Costs model:
+    - Bitwise &/|/^ chains: reduction tree of lut_inputs-input LUTs.
+    - ==/!=: reduction tree over both operands bits.
+    - +/-/comparisons: one LUT level plus carry chain (carry_bits bits per level).
+    - *: mul_cost levels (DSP/multiplier).
+    - Variable shifts/_ArrayProxy/Case: tree of 4:1 muxes (one LUT level each), If: one 2:1 mux.
+    - Slices/Cat/Replicate/~: wiring only.
+    Successive statements assigning the same target are analyzed independently (priority chains
+    between them are not modeled).
+    """
+    def __init__(self, f, ns=None, lut_inputs=6, carry_bits=32, mul_cost=4):
+        self.lut_inputs = lut_inputs
+        self.carry_bits = carry_bits
+        self.mul_cost   = mul_cost
+
+        if not isinstance(f, _Fragment):
+            f = f.get_fragment()
+        if ns is None:
+            ns = build_namespace(list_signals(f) | list_special_ios(f, True, True, True))
+        self.ns = ns
+
+        # Build combinational graph: comb_edges[target][source] = cost.
+        self.comb_edges = {}
+        self._add_statements(self.comb_edges, f.comb)
+
+        # Build endpoints graph: sync register inputs and special inputs.
+        self.endpoint_edges = {}
+        for domain, statements in f.sync.items():
+            edges = {}
+            self._add_statements(edges, statements)
+            for target, sources in edges.items():
+                self.endpoint_edges[(target, domain)] = sources
+        for special_input in list_special_ios(f, ins=True, outs=False, inouts=False):
+            if isinstance(special_input, Signal):
+                self.endpoint_edges[(special_input, None)] = {special_input: 0}
+
+        self._compute_arrivals()
+
+    # Costs ----------------------------------------------------------------------------------------
+
+    def _mux_cost(self, n):
+        return max(1, _levels(n, 4))
+
+    def _adder_cost(self, width):
+        return 1 + width/self.carry_bits
+
+    def _operator_cost(self, node):
+        width = max(len(o) for o in node.operands)
+        if node.op in ["~"]:
+            return 0
+        if node.op in ["==", "!="]:
+            return max(1, _levels(2*width, self.lut_inputs))
+        if node.op in ["+", "-", "<", "<=", ">", ">="]:
+            return self._adder_cost(width)
+        if node.op in ["*"]:
+            return self.mul_cost
+        if node.op in ["<<<", ">>>"]:
+            if isinstance(node.operands[1], Constant):
+                return 0
+            return self._mux_cost(width)
+        if node.op in ["m"]:
+            return 1
+        return 1
+
+    # Graph construction ---------------------------------------------------------------------------
+
+    def _expression_terms(self, node, cost=0, terms=None):
+        # Returns, for each signal leaf of the expression, the maximum cost from leaf to root.
+        if terms is None:
+            terms = {}
+        stack = [(node, cost)]
+        while stack:
+            node, cost = stack.pop()
+            if isinstance(node, Signal):
+                if terms.get(node, -1) < cost:
+                    terms[node] = cost
+            elif isinstance(node, _Operator):
+                # Flatten associative bitwise chains (ex: reduce(or_, ...)) into LUT trees.
+                if node.op in ["&", "|", "^"]:
+                    leaves = []
+                    pending = list(node.operands)
+                    while pending:
+                        operand = pending.pop()
+                        if isinstance(operand, _Operator) and operand.op == node.op:
+                            pending += operand.operands
+                        else:
+                            leaves.append(operand)
+                    op_cost = max(1, _levels(len(leaves), self.lut_inputs))
+                    stack += [(leaf, cost + op_cost) for leaf in leaves]
+                else:
+                    op_cost = self._operator_cost(node)
+                    stack += [(operand, cost + op_cost) for operand in node.operands]
+            elif isinstance(node, _Slice):
+                stack.append((node.value, cost))
+            elif isinstance(node, Cat):
+                stack += [(element, cost) for element in node.l]
+            elif isinstance(node, Replicate):
+                stack.append((node.v, cost))
+            elif isinstance(node, _ArrayProxy):
+                mux_cost = self._mux_cost(len(node.choices))
+                stack += [(choice, cost + mux_cost) for choice in node.choices]
+                stack.append((node.key, cost + mux_cost))
+        return terms
+
+    def _add_edges(self, edges, targets, terms):
+        for target in targets:
+            sources = edges.setdefault(target, {})
+            for source, cost in terms.items():
+                if sources.get(source, -1) < cost:
+                    sources[source] = cost
+
+    def _add_statements(self, edges, statements, ctrl={}, mux=0):
+        for s in statements:
+            if isinstance(s, _Assign):
+                terms = self._expression_terms(s.r, mux)
+                for source, cost in ctrl.items():
+                    if terms.get(source, -1) < cost:
+                        terms[source] = cost
+                self._add_edges(edges, list_targets(s), terms)
+            elif isinstance(s, If):
+                _mux  = mux + 1
+                _ctrl = self._expression_terms(s.cond, _mux, dict(ctrl))
+                self._add_statements(edges, s.t, _ctrl, _mux)
+                self._add_statements(edges, s.f, _ctrl, _mux)
+            elif isinstance(s, Case):
+                _mux  = mux + self._mux_cost(len(s.cases))
+                _ctrl = self._expression_terms(s.test, _mux, dict(ctrl))
+                for case in s.cases.values():
+                    self._add_statements(edges, case, _ctrl, _mux)
+            elif isinstance(s, (list, tuple)):
+                self._add_statements(edges, s, ctrl, mux)
+
+    # Longest paths --------------------------------------------------------------------------------
+
+    def _compute_arrivals(self):
+        # Iterative DFS (combinational chains can be very long on full SoCs); edges closing a
+        # combinational loop (signal-level false loops) are ignored.
+        self.arrival     = {}
+        self.predecessor = {}
+        state = {}
+        for root in self.comb_edges:
+            if root in state:
+                continue
+            stack = [(root, iter(self.comb_edges[root]))]
+            state[root] = "visiting"
+            while stack:
+                node, sources = stack[-1]
+                for source in sources:
+                    if source in self.comb_edges and source not in state:
+                        state[source] = "visiting"
+                        stack.append((source, iter(self.comb_edges[source])))
+                        break
+                else:
+                    stack.pop()
+                    state[node] = "done"
+                    arrival, predecessor = 0, None
+                    for source, cost in self.comb_edges[node].items():
+                        if state.get(source) == "visiting":
+                            continue
+                        a = self.arrival.get(source, 0) + cost
+                        if predecessor is None or a > arrival:
+                            arrival, predecessor = a, source
+                    self.arrival[node]     = arrival
+                    self.predecessor[node] = predecessor
+
+    def _endpoint_arrival(self, sources):
+        arrival, predecessor = 0, None
+        for source, cost in sources.items():
+            a = self.arrival.get(source, 0) + cost
+            if predecessor is None or a > arrival:
+                arrival, predecessor = a, source
+        return arrival, predecessor
+
+    # Reports --------------------------------------------------------------------------------------
+
+    def get_paths(self, n=10):
+        """Returns the n worst paths, deepest first."""
+        paths = []
+        for (endpoint, domain), sources in self.endpoint_edges.items():
+            depth, signal = self._endpoint_arrival(sources)
+            paths.append((depth, endpoint, domain, signal))
+        paths.sort(key=lambda p: (-p[0], self.ns.get_name(p[1])))
+        r = []
+        for depth, endpoint, domain, signal in paths[:n]:
+            path = []
+            seen = set()
+            while signal is not None and signal not in seen:
+                seen.add(signal)
+                path.append((self.ns.get_name(signal), self.arrival.get(signal, 0)))
+                signal = self.predecessor.get(signal, None)
+            path.reverse()
+            r.append({
+                "depth"    : depth,
+                "endpoint" : self.ns.get_name(endpoint),
+                "domain"   : domain,
+                "path"     : path,
+            })
+        return r
+
+    @property
+    def max_depth(self):
+        paths = self.get_paths(n=1)
+        return paths[0]["depth"] if paths else 0
+
+    def report(self, n=10):
+        r = ""
+        for i, p in enumerate(self.get_paths(n)):
+            endpoint = p["endpoint"] + ("" if p["domain"] is None else " ({})".format(p["domain"]))
+            r += "Path {}: depth {:.1f} -> {}\n".format(i, p["depth"], endpoint)
+            for name, depth in p["path"]:
+                r += "  {:6.1f} {}\n".format(depth, name)
+        return r
+
+    def export_json(self, filename=None, n=10):
+        paths = json.dumps(self.get_paths(n), indent=4)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(paths)
+        return paths
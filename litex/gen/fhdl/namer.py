@@ -225,6 +225,22 @@ def build_namespace(signals, reserved_keywords=set()):
     return ns
 
 
+def build_module_paths(signals):
+    # Module hierarchy of each signal, keeping only the levels used for naming by build_namespace.
+    tree = _build_tree(signals)
+    _set_use_name(tree)
+    paths = {}
+    for signal in signals:
+        path    = []
+        treepos = tree
+        for name, number in signal.backtrace[:-1]:
+            treepos = treepos.children[name]
+            if treepos.use_name:
+                path.append(name)
+        paths[signal] = path
+    return paths
+
+
 class Namespace:
     def __init__(self, pnd, reserved_keywords=set()):
         self.counts = {k: 1 for k in reserved_keywords}
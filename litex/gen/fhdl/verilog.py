@@ -519,7 +519,8 @@ class DummyAttrTranslate(dict):
 def convert(f, ios=set(), name="top", platform=None,
     special_overrides    = dict(),
     attr_translate       = DummyAttrTranslate(),
-    regular_comb         = True):
+    regular_comb         = True,
+    analyze_logic_depth  = False):
 
     # Create ConvOutput.
     r = ConvOutput()
@@ -627,4 +628,10 @@ def convert(f, ios=set(), name="top", platform=None,
     r.set_main_source(verilog)
     r.ns = ns
 
+    # Logic Depth Analysis (optional).
+    # --------------------------------
+    if analyze_logic_depth:
+        from litex.gen.fhdl.logic_depth import LogicDepthAnalyzer
+        r.logic_depth = LogicDepthAnalyzer(f, ns)
+
     return r
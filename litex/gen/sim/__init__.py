@@ -1 +1,3 @@
 from litex.gen.sim.core import Simulator, run_simulation, passive
+from litex.gen.sim.verilator import VerilatorSimulator, run_verilator_simulation
+from litex.gen.sim.activity import ActivityProfiler
@@ -0,0 +1,137 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Signal toggle-activity profiling for the Python simulator.
+
+Counts, at Evaluator commit time (ie only for the signals that actually changed), the toggles and
+bit transitions of each signal and of each clock domain, and aggregates them by module hierarchy
+(from the Signals backtraces used by the namer) to report the hottest signals/modules.
+
+Usage:
+    profiler = ActivityProfiler()
+    run_simulation(dut, generators, activity_profiler=profiler)
+    print(profiler.report())
+"""
+
+import json
+
+from litex.gen.fhdl.namer import build_namespace, build_module_paths
+
+# Activity Profiler --------------------------------------------------------------------------------
+
+class ActivityProfiler:
+    """ActivityProfiler
+
+    Commits happening on a clock edge are accounted to the clock domain(s) of the edge (to each of
+    them when several domains share the edge), other commits (falling edges, initial propagation)
+    to the None domain. Intermediate values of the combinatorial propagation are counted.
+    """
+    def __init__(self):
+        self.signals  = {} # Signal -> [toggles, bit transitions].
+        self.domains  = {} # Domain -> [toggles, bit transitions].
+        self.cycles   = {} # Domain -> number of cycles (rising edges).
+        self.design   = set()
+        self._domains = [None]
+
+    # Simulator hooks ------------------------------------------------------------------------------
+
+    def set_design(self, signals):
+        # All the design signals, used to name signals/modules as the namer does for the design.
+        self.design = set(signals)
+
+    def set_domains(self, domains):
+        for domain in domains:
+            self.cycles[domain] = self.cycles.get(domain, 0) + 1
+        self._domains = sorted(domains) if domains else [None]
+
+    def record(self, signal, old, new):
+        bits = bin((old ^ new) & (2**len(signal) - 1)).count("1")
+        if bits == 0:
+            return
+        try:
+            counts = self.signals[signal]
+        except KeyError:
+            counts = self.signals[signal] = [0, 0]
+        counts[0] += 1
+        counts[1] += bits
+        for domain in self._domains:
+            try:
+                counts = self.domains[domain]
+            except KeyError:
+                counts = self.domains[domain] = [0, 0]
+            counts[0] += 1
+            counts[1] += bits
+
+    # Reports --------------------------------------------------------------------------------------
+
+    def get_signals(self, n=10, ns=None):
+        """Returns the n most active signals (by bit transitions)."""
+        if ns is None:
+            ns = build_namespace(self.design | set(self.signals.keys()))
+        signals = sorted(self.signals.items(), key=lambda s: (-s[1][1], -s[1][0], s[0].duid))
+        return [{
+            "name"    : ns.get_name(signal),
+            "toggles" : toggles,
+            "bits"    : bits,
+        } for signal, (toggles, bits) in signals[:n]]
+
+    def get_modules(self, n=10, depth=None):
+        """Returns the n most active modules (by bit transitions), aggregated over submodules."""
+        modules = {}
+        paths   = build_module_paths(self.design | set(self.signals.keys()))
+        for signal, (toggles, bits) in self.signals.items():
+            path = paths[signal]
+            if depth is not None:
+                path = path[:depth]
+            for i in range(len(path) + 1):
+                name = ".".join(path[:i]) or "top"
+                counts = modules.setdefault(name, [0, 0])
+                counts[0] += toggles
+                counts[1] += bits
+        modules = sorted(modules.items(), key=lambda m: (-m[1][1], -m[1][0], m[0]))
+        return [{
+            "name"    : name,
+            "toggles" : toggles,
+            "bits"    : bits,
+        } for name, (toggles, bits) in modules[:n]]
+
+    def get_domains(self):
+        """Returns toggles/bit transitions (total and per cycle) of each clock domain."""
+        r = {}
+        for domain, (toggles, bits) in sorted(self.domains.items(), key=lambda d: str(d[0])):
+            cycles = self.cycles.get(domain, 0)
+            r[domain] = {
+                "cycles"         : cycles,
+                "toggles"        : toggles,
+                "bits"           : bits,
+                "bits_per_cycle" : bits/cycles if cycles else None,
+            }
+        return r
+
+    def report(self, n=10):
+        r = "Domains:\n"
+        for domain, d in self.get_domains().items():
+            r += "  {:10} {:10d} toggles {:10d} bits".format(str(domain), d["toggles"], d["bits"])
+            if d["bits_per_cycle"] is not None:
+                r += " ({:.1f} bits/cycle)".format(d["bits_per_cycle"])
+            r += "\n"
+        r += "Modules:\n"
+        for m in self.get_modules(n):
+            r += "  {:10d} bits {:10d} toggles {}\n".format(m["bits"], m["toggles"], m["name"])
+        r += "Signals:\n"
+        for s in self.get_signals(n):
+            r += "  {:10d} bits {:10d} toggles {}\n".format(s["bits"], s["toggles"], s["name"])
+        return r
+
+    def export_json(self, filename=None, n=10):
+        activity = json.dumps({
+            "domains" : {str(k): v for k, v in self.get_domains().items()},
+            "modules" : self.get_modules(n),
+            "signals" : self.get_signals(n),
+        }, indent=4)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(activity)
+        return activity
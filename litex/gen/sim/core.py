@@ -27,6 +27,7 @@ from migen.fhdl.module import Module
 from migen.genlib.resetsync import AsyncResetSynchronizer
 
 from litex.gen.sim.vcd import VCDWriter, DummyVCDWriter
+from litex.gen.sim.memory import extract_memories
 
 
 class ClockState:
@@ -101,9 +102,11 @@ def _truncate(value, nbits, signed):
 
 
 class Evaluator:
-    def __init__(self, clock_domains, replaced_memories):
+    def __init__(self, clock_domains, replaced_memories, native_memories={}, profiler=None):
         self.clock_domains = clock_domains
         self.replaced_memories = replaced_memories
+        self.native_memories = native_memories
+        self.profiler = profiler
         self.signal_values = dict()
         self.modifications = dict()
 
@@ -111,6 +114,8 @@ class Evaluator:
         r = set()
         for k, v in self.modifications.items():
             if k not in self.signal_values or self.signal_values[k] != v:
+                if self.profiler is not None:
+                    self.profiler.record(k, self.signal_values.get(k, k.reset.value), v)
                 self.signal_values[k] = v
                 r.add(k)
         self.modifications.clear()
@@ -161,6 +166,9 @@ class Evaluator:
             idx = min(len(node.choices) - 1, self.eval(node.key, postcommit))
             return self.eval(node.choices[idx], postcommit)
         elif isinstance(node, _MemoryLocation):
+            if node.memory in self.native_memories:
+                memory = self.native_memories[node.memory]
+                return memory.read(self.eval(node.index, postcommit))
             array = self.replaced_memories[node.memory]
             return self.eval(array[self.eval(node.index, postcommit)], postcommit)
         elif isinstance(node, ClockSignal):
@@ -200,6 +208,10 @@ class Evaluator:
             idx = min(len(node.choices) - 1, self.eval(node.key))
             self.assign(node.choices[idx], value)
         elif isinstance(node, _MemoryLocation):
+            if node.memory in self.native_memories:
+                memory = self.native_memories[node.memory]
+                memory.write(self.eval(node.index), value)
+                return
             array = self.replaced_memories[node.memory]
             self.assign(array[self.eval(node.index)], value)
         else:
@@ -256,13 +268,26 @@ class DummyAsyncResetSynchronizer:
 
 # TODO: instances via Iverilog/VPI
 class Simulator:
+    """Simulator
+
+    By default, Memories are converted to Signals with MemoryToArray (and dumped to the VCD). With
+    native_memories=True, Memories are instead simulated with SimMemory (compact storage, see
+    litex.gen.sim.memory), available in self.memories for preload/inspection, and their contents
+    are not dumped to the VCD.
+
+    An ActivityProfiler (see litex.gen.sim.activity) can be passed to collect signal toggle
+    statistics.
+    """
     def __init__(self, fragment_or_module, generators, clocks={"sys": 10}, vcd_name=None,
-                 special_overrides={}):
+                 special_overrides={}, native_memories=False, activity_profiler=None):
         if isinstance(fragment_or_module, _Fragment):
             self.fragment = fragment_or_module
         else:
             self.fragment = fragment_or_module.get_fragment()
 
+        self.memories = {}
+        if native_memories:
+            self.memories = extract_memories(self.fragment)
         mta = MemoryToArray()
         mta.transform_fragment(None, self.fragment)
 
@@ -272,16 +297,7 @@ class Simulator:
         if self.fragment.specials:
             raise ValueError("Could not lower all specials", self.fragment.specials)
 
-        if not isinstance(generators, dict):
-            generators = {"sys": generators}
-        self.generators = dict()
-        self.passive_generators = set()
-        for k, v in generators.items():
-            if (isinstance(v, collections.abc.Iterable)
-                    and not inspect.isgenerator(v)):
-                self.generators[k] = list(v)
-            else:
-                self.generators[k] = [v]
+        self._init_generators(generators)
 
         clocks = collections.OrderedDict(sorted(clocks.items(),
                                                 key=operator.itemgetter(0)))
@@ -296,8 +312,11 @@ class Simulator:
         # comb signals return to their reset value if nothing assigns them
         self.fragment.comb[0:0] = [s.eq(s.reset)
                                    for s in list_targets(self.fragment.comb)]
+        self.profiler = activity_profiler
+        if self.profiler is not None:
+            self.profiler.set_design(list_signals(self.fragment))
         self.evaluator = Evaluator(self.fragment.clock_domains,
-                                   mta.replacements)
+                                   mta.replacements, self.memories, self.profiler)
 
         if vcd_name is None:
             self.vcd = DummyVCDWriter()
@@ -315,6 +334,18 @@ class Simulator:
             for signal in sorted(signals, key=lambda x: x.duid):
                 self.vcd.set(signal, signal.reset.value)
 
+    def _init_generators(self, generators):
+        if not isinstance(generators, dict):
+            generators = {"sys": generators}
+        self.generators = dict()
+        self.passive_generators = set()
+        for k, v in generators.items():
+            if (isinstance(v, collections.abc.Iterable)
+                    and not inspect.isgenerator(v)):
+                self.generators[k] = list(v)
+            else:
+                self.generators[k] = [v]
+
     def __enter__(self):
         return self
 
@@ -327,10 +358,15 @@ class Simulator:
     def _commit_and_comb_propagate(self):
         # TODO: optimize
         all_modified = set()
+        for memory in self.memories.values():
+            memory.commit()
+            memory.comb(self.evaluator)
         modified = self.evaluator.commit()
         all_modified |= modified
         while modified:
             self.evaluator.execute(self.fragment.comb)
+            for memory in self.memories.values():
+                memory.comb(self.evaluator)
             modified = self.evaluator.commit()
             all_modified |= modified
         for signal in all_modified:
@@ -385,10 +421,14 @@ class Simulator:
         while True:
             dt, rising, falling = self.time.tick()
             self.vcd.delay(dt)
+            if self.profiler is not None:
+                self.profiler.set_domains(rising)
             for cd in rising:
                 self.evaluator.assign(self.fragment.clock_domains[cd].clk, 1)
                 if cd in self.fragment.sync:
                     self.evaluator.execute(self.fragment.sync[cd])
+                for memory in self.memories.values():
+                    memory.sync(self.evaluator, cd)
                 if cd in self.generators:
                     self._process_generators(cd)
             for cd in falling:
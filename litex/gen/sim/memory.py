@@ -0,0 +1,133 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+from array import array
+
+from migen.fhdl.specials import Memory, WRITE_FIRST, NO_CHANGE
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def _new_storage(width, depth, init):
+    # Use the smallest array type able to store width bits (Python list for wider memories).
+    for typecode in ["B", "H", "I", "L", "Q"]:
+        if 8*array(typecode).itemsize >= width:
+            storage = array(typecode, bytes(array(typecode).itemsize*depth))
+            break
+    else:
+        storage = [0]*depth
+    for i, value in enumerate(init or []):
+        storage[i] = value & (2**width - 1)
+    return storage
+
+# Simulation Memory --------------------------------------------------------------------------------
+
+class SimMemory:
+    """Native simulation model of a Memory.
+
+    Keeps the Memory contents in a compact array and implements the ports semantics (sync/async
+    read, re, we_granularity, READ_FIRST/WRITE_FIRST/NO_CHANGE) directly, instead of converting the
+    Memory to one Signal per word (MemoryToArray). Contents can be accessed from testbenches with
+    load/dump or indexing.
+
+    Writes from ports and from generators (yield memory[adr].eq(value)) are applied at commit time,
+    as for Signals. Direct accesses (indexing, load/dump) read/write the contents immediately: they
+    are intended for preload/inspection (asynchronous read ports only reflect direct writes at the
+    next combinatorial propagation).
+    """
+    def __init__(self, memory):
+        self.memory  = memory
+        self.width   = memory.width
+        self.depth   = memory.depth
+        self.mask    = 2**memory.width - 1
+        self.data    = _new_storage(memory.width, memory.depth, memory.init)
+        self.pending = []
+
+        # Ports (sync ports grouped by Clock Domain, comb ports: async reads or WRITE_FIRST reads).
+        self.sync_ports = {}
+        self.comb_ports = []
+        self.adr_regs   = {}
+        for port in memory.ports:
+            self.sync_ports.setdefault(port.clock.cd, []).append(port)
+            if port.async_read or (port.mode == WRITE_FIRST):
+                self.comb_ports.append(port)
+                self.adr_regs[port] = 0
+
+    # Testbench accesses ---------------------------------------------------------------------------
+
+    def __len__(self):
+        return self.depth
+
+    def __getitem__(self, adr):
+        return self.data[adr]
+
+    def __setitem__(self, adr, value):
+        self.data[adr] = value & self.mask
+
+    def load(self, data, offset=0):
+        for i, value in enumerate(data):
+            self.data[offset + i] = value & self.mask
+
+    def dump(self, offset=0, length=None):
+        length = self.depth - offset if length is None else length
+        return list(self.data[offset:offset + length])
+
+    # Simulation -----------------------------------------------------------------------------------
+
+    def read(self, adr):
+        return self.data[min(adr, self.depth - 1)]
+
+    def write(self, adr, value, mask=None):
+        mask = self.mask if mask is None else mask
+        self.pending.append((min(adr, self.depth - 1), value, mask))
+
+    def sync(self, evaluator, cd):
+        for port in self.sync_ports.get(cd, []):
+            adr = evaluator.eval(port.adr)
+            we  = 0 if port.we is None else evaluator.eval(port.we)
+            # Read.
+            if not port.async_read:
+                re = 1 if port.re is None else evaluator.eval(port.re)
+                if re:
+                    if port.mode == WRITE_FIRST:
+                        self.adr_regs[port] = adr
+                    elif (port.mode == NO_CHANGE) and (port.we is not None):
+                        if not we:
+                            evaluator.assign(port.dat_r, self.read(adr))
+                    else:
+                        evaluator.assign(port.dat_r, self.read(adr))
+            # Write.
+            if we:
+                if port.we_granularity:
+                    mask = 0
+                    for i in range(self.width//port.we_granularity):
+                        if (we >> i) & 0b1:
+                            mask |= (2**port.we_granularity - 1) << (i*port.we_granularity)
+                else:
+                    mask = self.mask
+                self.write(adr, evaluator.eval(port.dat_w), mask)
+
+    def commit(self):
+        for adr, value, mask in self.pending:
+            self.data[adr] = (self.data[adr] & ~mask) | (value & mask)
+        r = len(self.pending) > 0
+        self.pending.clear()
+        return r
+
+    def comb(self, evaluator):
+        for port in self.comb_ports:
+            adr = evaluator.eval(port.adr) if port.async_read else self.adr_regs[port]
+            evaluator.assign(port.dat_r, self.read(adr))
+
+
+def extract_memories(fragment):
+    """Removes the Memory specials (and their ports) from fragment, returns their SimMemory."""
+    memories = {}
+    ports    = set()
+    for special in sorted(fragment.specials, key=lambda x: x.duid):
+        if isinstance(special, Memory):
+            memories[special] = SimMemory(special)
+            ports |= set(special.ports)
+    fragment.specials -= set(memories.keys()) | ports
+    return memories
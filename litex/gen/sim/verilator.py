@@ -0,0 +1,431 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""Verilator backend for the generator-based simulator.
+
+Converts the fragment to Verilog, builds it with Verilator as a shared library (with a small VPI
+shim) and drives it from the usual generators (yield signal.eq(value), (yield signal), ...) through
+ctypes. Top-level and internal signals are accessed by their Namespace name: all of them by
+default (--public-flat-rw) or only the selected ones (public_signals).
+
+Built models are cached in build_dir (keyed by the Verilog/build options hash), so re-running a
+simulation on an unchanged design only costs the Verilator model evaluation.
+"""
+
+import os
+import ctypes
+import hashlib
+import tempfile
+import subprocess
+from shutil import which
+
+from migen.fhdl.structure import *
+from migen.fhdl.structure import _Fragment
+from migen.fhdl.tools import list_targets
+from migen.fhdl.specials import Memory
+from migen.genlib.resetsync import AsyncResetSynchronizer
+
+from litex.gen.sim.core import Evaluator, Simulator, TimeManager, DummyAsyncResetSynchronizer
+
+# Verilator Shim -----------------------------------------------------------------------------------
+
+_shim_cpp = """\
+#include <stdint.h>
+#include <verilated.h>
+#include <verilated_vpi.h>
+#if VM_TRACE
+#include <verilated_vcd_c.h>
+#endif
+#include "Vtop.h"
+
+struct sim_s {
+    VerilatedContext *ctx;
+    Vtop *top;
+#if VM_TRACE
+    VerilatedVcdC *tfp;
+#endif
+};
+
+extern "C" void *sim_new(void) {
+    sim_s *s = new sim_s;
+    s->ctx = new VerilatedContext;
+    s->top = new Vtop{s->ctx};
+#if VM_TRACE
+    s->tfp = NULL;
+#endif
+    return s;
+}
+
+extern "C" void sim_trace(void *p, const char *filename) {
+#if VM_TRACE
+    sim_s *s = (sim_s *)p;
+    s->ctx->traceEverOn(true);
+    s->tfp = new VerilatedVcdC;
+    s->top->trace(s->tfp, 99);
+    s->tfp->open(filename);
+#endif
+}
+
+extern "C" void sim_eval(void *p, uint64_t time) {
+    sim_s *s = (sim_s *)p;
+    s->ctx->time(time);
+    s->top->eval();
+#if VM_TRACE
+    if (s->tfp)
+        s->tfp->dump(time);
+#endif
+}
+
+extern "C" void sim_delete(void *p) {
+    sim_s *s = (sim_s *)p;
+#if VM_TRACE
+    if (s->tfp) {
+        s->tfp->close();
+        delete s->tfp;
+    }
+#endif
+    s->top->final();
+    delete s->top;
+    delete s->ctx;
+    delete s;
+}
+
+extern "C" void *sim_handle(const char *name) {
+    return vpi_handle_by_name((PLI_BYTE8 *)name, NULL);
+}
+
+extern "C" void *sim_handle_index(void *h, int index) {
+    return vpi_handle_by_index((vpiHandle)h, index);
+}
+
+extern "C" void sim_read(void *h, uint32_t *words, int nwords) {
+    s_vpi_value v;
+    v.format = vpiVectorVal;
+    vpi_get_value((vpiHandle)h, &v);
+    for (int i = 0; i < nwords; i++)
+        words[i] = v.value.vector[i].aval;
+}
+
+extern "C" void sim_write(void *h, uint32_t *words, int nwords) {
+    s_vpi_vecval vec[nwords];
+    s_vpi_value v;
+    for (int i = 0; i < nwords; i++) {
+        vec[i].aval = words[i];
+        vec[i].bval = 0;
+    }
+    v.format = vpiVectorVal;
+    v.value.vector = vec;
+    vpi_put_value((vpiHandle)h, &v, NULL, vpiNoDelay);
+}
+"""
+
+# Verilator Model ----------------------------------------------------------------------------------
+
+class VerilatorModel:
+    """ctypes wrapper of a Verilator model built with the VPI shim."""
+    def __init__(self, library, top="top"):
+        self.top = top
+        self.lib = lib = ctypes.CDLL(library)
+        lib.sim_new.restype           = ctypes.c_void_p
+        lib.sim_trace.argtypes        = [ctypes.c_void_p, ctypes.c_char_p]
+        lib.sim_eval.argtypes         = [ctypes.c_void_p, ctypes.c_uint64]
+        lib.sim_delete.argtypes       = [ctypes.c_void_p]
+        lib.sim_handle.restype        = ctypes.c_void_p
+        lib.sim_handle.argtypes       = [ctypes.c_char_p]
+        lib.sim_handle_index.restype  = ctypes.c_void_p
+        lib.sim_handle_index.argtypes = [ctypes.c_void_p, ctypes.c_int]
+        lib.sim_read.argtypes         = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        lib.sim_write.argtypes        = [ctypes.c_void_p, ctypes.c_void_p, ctypes.c_int]
+        self.sim     = lib.sim_new()
+        self.handles = {}
+
+    def trace(self, filename):
+        self.lib.sim_trace(self.sim, filename.encode())
+
+    def eval(self, time=0):
+        self.lib.sim_eval(self.sim, time)
+
+    def close(self):
+        if self.sim is not None:
+            self.lib.sim_delete(self.sim)
+            self.sim = None
+
+    def handle(self, name, index=None):
+        key = (name, index)
+        if key not in self.handles:
+            handle = None
+            for path in [f"TOP.{self.top}.{name}", f"{self.top}.{name}"]:
+                handle = self.lib.sim_handle(path.encode())
+                if handle:
+                    break
+            if not handle:
+                raise KeyError(f"Signal {name} not found in Verilator model (not public?)")
+            if index is not None:
+                handle = self.lib.sim_handle_index(handle, index)
+            self.handles[key] = handle
+        return self.handles[key]
+
+    def read(self, handle, nbits):
+        nwords = (nbits + 31)//32
+        words  = (ctypes.c_uint32*nwords)()
+        self.lib.sim_read(handle, words, nwords)
+        value = 0
+        for i in range(nwords):
+            value |= words[i] << (32*i)
+        return value & (2**nbits - 1)
+
+    def write(self, handle, nbits, value):
+        nwords = (nbits + 31)//32
+        value &= 2**nbits - 1
+        words  = (ctypes.c_uint32*nwords)(*[(value >> (32*i)) & 0xffffffff for i in range(nwords)])
+        self.lib.sim_write(handle, words, nwords)
+
+# Verilator Evaluator ------------------------------------------------------------------------------
+
+class _VerilatorSignalValues:
+    # Signal values mapping backed by the Verilator model (signals not present in the model, ex
+    # only used by the generators, are stored locally and read as their reset value until written,
+    # as with the Python simulator).
+    def __init__(self, model, names):
+        self.model  = model
+        self.names  = names
+        self.values = {}
+
+    def __getitem__(self, signal):
+        name = self.names.get(signal, None)
+        if name is None:
+            return self.values.get(signal, signal.reset.value)
+        value = self.model.read(self.model.handle(name), len(signal))
+        if signal.signed and (value & 2**(len(signal) - 1)):
+            value -= 2**len(signal)
+        return value
+
+    def __setitem__(self, signal, value):
+        name = self.names.get(signal, None)
+        if name is None:
+            self.values[signal] = value
+        else:
+            self.model.write(self.model.handle(name), len(signal), value)
+
+
+class _VerilatorMemory:
+    # Memory accesses (yield mem[adr], yield mem[adr].eq(value)) backed by the Verilator model.
+    def __init__(self, model, name, memory):
+        self.model   = model
+        self.name    = name
+        self.memory  = memory
+        self.pending = []
+
+    def read(self, adr):
+        adr = min(adr, self.memory.depth - 1)
+        return self.model.read(self.model.handle(self.name, adr), self.memory.width)
+
+    def write(self, adr, value, mask=None):
+        self.pending.append((min(adr, self.memory.depth - 1), value))
+
+    def commit(self):
+        for adr, value in self.pending:
+            self.model.write(self.model.handle(self.name, adr), self.memory.width, value)
+        self.pending.clear()
+
+
+class VerilatorEvaluator(Evaluator):
+    def __init__(self, clock_domains, model, names, memories):
+        Evaluator.__init__(self, clock_domains, {}, memories)
+        self.signal_values = _VerilatorSignalValues(model, names)
+
+    def commit(self):
+        r = set()
+        for memory in self.native_memories.values():
+            memory.commit()
+        for k, v in self.modifications.items():
+            self.signal_values[k] = v
+            r.add(k)
+        self.modifications.clear()
+        return r
+
+# Verilator Build ----------------------------------------------------------------------------------
+
+def _strip_dates(verilog):
+    # Remove generation dates from the Verilog (to get a stable hash).
+    return "\n".join(l for l in verilog.splitlines() if not l.startswith(("// Date", "//  Auto-Generated")))
+
+
+def build_verilator_model(verilog, build_dir, top="top", sources=[], data_files={},
+    public_signals = None,
+    trace          = False,
+    threads        = os.cpu_count(),
+    opt_level      = "O3",
+    verbose        = False):
+    """Builds (or reuses from build_dir) a Verilator model of verilog, returns the library path."""
+    if which("verilator") is None:
+        raise OSError("Unable to find Verilator, please make sure it is installed and in PATH.")
+
+    options = [top, sources, public_signals, trace, opt_level]
+    digest  = hashlib.sha1((_strip_dates(verilog) + repr(options)).encode()).hexdigest()[:16]
+    build_dir = os.path.join(build_dir, f"{top}_{digest}")
+    library   = os.path.join(build_dir, "libVtop.so")
+    if os.path.exists(library):
+        return library
+    os.makedirs(build_dir, exist_ok=True)
+
+    # Sources.
+    with open(os.path.join(build_dir, f"{top}.v"), "w") as f:
+        f.write(verilog)
+    for filename, content in data_files.items():
+        with open(os.path.join(build_dir, filename), "w") as f:
+            f.write(content)
+    with open(os.path.join(build_dir, "sim_shim.cpp"), "w") as f:
+        f.write(_shim_cpp)
+    public = "--public-flat-rw"
+    if public_signals is not None:
+        vlt = "`verilator_config\n"
+        for name in public_signals:
+            vlt += f"public_flat_rw -module \"{top}\" -var \"{name}\"\n"
+        with open(os.path.join(build_dir, "public.vlt"), "w") as f:
+            f.write(vlt)
+        public = "public.vlt"
+
+    # Build script.
+    verilator_root = subprocess.check_output(["verilator", "--getenv", "VERILATOR_ROOT"]).decode().strip()
+    script = """\
+set -e
+verilator --cc {top}.v {sources} {public} --top-module {top} --prefix Vtop --vpi {trace} \\
+    -Wno-fatal -Wno-lint -Wno-style -{opt_level} -CFLAGS "-fPIC -{opt_level}" \\
+    --Mdir obj_dir --build -j {threads}
+g++ -shared -fPIC -{opt_level} {trace_define} -Iobj_dir -I{root}/include -I{root}/include/vltstd \\
+    sim_shim.cpp obj_dir/Vtop__ALL.a obj_dir/libverilated.a -pthread -o libVtop.so
+""".format(
+        top          = top,
+        sources      = " ".join(os.path.abspath(s) for s in sources),
+        public       = public,
+        trace        = "--trace" if trace else "",
+        trace_define = "-DVM_TRACE=1" if trace else "",
+        opt_level    = opt_level,
+        threads      = threads,
+        root         = verilator_root,
+    )
+    with open(os.path.join(build_dir, "build.sh"), "w") as f:
+        f.write(script)
+    r = subprocess.run(["bash", "build.sh"], cwd=build_dir,
+        stdout = None if verbose else subprocess.PIPE,
+        stderr = subprocess.STDOUT)
+    if r.returncode != 0:
+        raise OSError("Verilator build failed:\n" + (r.stdout or b"").decode(errors="replace"))
+    return library
+
+# Verilator Simulator ------------------------------------------------------------------------------
+
+class VerilatorSimulator(Simulator):
+    """Verilator backend of Simulator, with the same generators API.
+
+    Generators are run on the settled (pre-edge) model state at the rising edges of their clock
+    domain and their writes are applied after the edge, as with the Python simulator. Memories are
+    always simulated by the model (no native_memories option) and accessed with yield mem[adr].
+    """
+    def __init__(self, fragment_or_module, generators, clocks={"sys": 10}, vcd_name=None,
+                 special_overrides={}, build_dir=None, sources=[],
+                 public_signals=None, activity_profiler=None, **kwargs):
+        from litex.gen.fhdl.verilog import convert
+
+        if activity_profiler is not None:
+            raise ValueError("Activity profiling is only supported by the Python simulator.")
+
+        if isinstance(fragment_or_module, _Fragment):
+            self.fragment = fragment_or_module
+        else:
+            self.fragment = fragment_or_module.get_fragment()
+
+        # Generators.
+        self._init_generators(generators)
+
+        # Clock Domains (clocks/resets driven by the simulator are the model IOs).
+        self.time = TimeManager(clocks)
+        for clock in clocks.keys():
+            if clock not in self.fragment.clock_domains:
+                cd = ClockDomain(name=clock, reset_less=True)
+                cd.clk.reset = C(self.time.clocks[clock].high)
+                self.fragment.clock_domains.append(cd)
+        targets = list_targets(self.fragment)
+        ios = set()
+        for cd in self.fragment.clock_domains:
+            if cd.name in clocks:
+                for s in [cd.clk, cd.rst]:
+                    if (s is not None) and (s not in targets):
+                        ios.add(s)
+        if not ios:
+            raise ValueError("Verilator simulation requires at least one clock/reset driven by the "
+                "simulator (clocks {} are all driven by the design).".format(", ".join(clocks.keys())))
+
+        # Verilog conversion.
+        overrides = {AsyncResetSynchronizer: DummyAsyncResetSynchronizer}
+        overrides.update(special_overrides)
+        conv = convert(self.fragment, ios=ios, name="top", special_overrides=overrides)
+        names = {s: conv.ns.get_name(s) for s in conv.ns.sigs if isinstance(s, Signal)}
+        if public_signals is not None:
+            public_signals = [conv.ns.get_name(s) if isinstance(s, Signal) else s for s in public_signals]
+            public_signals += [names[s] for s in ios]
+            names = {s: n for s, n in names.items() if n in public_signals}
+
+        # Verilator model.
+        if build_dir is None:
+            build_dir = os.path.join(tempfile.gettempdir(), "litex_sim_verilator")
+        library = build_verilator_model(conv.main_source, build_dir,
+            sources        = sources,
+            data_files     = conv.data_files,
+            public_signals = public_signals,
+            trace          = vcd_name is not None,
+            **kwargs)
+        self.model = VerilatorModel(library)
+        if vcd_name is not None:
+            self.model.trace(vcd_name)
+        self.timestamp = 0
+
+        # Evaluator.
+        memories = {}
+        for s in conv.ns.sigs:
+            if isinstance(s, Memory):
+                memories[s] = _VerilatorMemory(self.model, conv.ns.get_name(s), s)
+        self.memories  = {}
+        self.names     = names
+        self.evaluator = VerilatorEvaluator(self.fragment.clock_domains, self.model, names, memories)
+
+    def close(self):
+        self.model.close()
+
+    def read(self, name, nbits=32):
+        """Reads a model signal by Namespace name."""
+        return self.model.read(self.model.handle(name), nbits)
+
+    def write(self, name, value, nbits=32):
+        """Writes a model signal by Namespace name."""
+        self.model.write(self.model.handle(name), nbits, value)
+
+    def run(self):
+        self.model.eval(self.timestamp)
+        while True:
+            dt, rising, falling = self.time.tick()
+            self.timestamp += dt
+            # Run generators on pre-edge values.
+            for cd in sorted(rising):
+                if cd in self.generators:
+                    self._process_generators(cd)
+            # Clock edges.
+            for cd in rising:
+                self.evaluator.signal_values[self.fragment.clock_domains[cd].clk] = 1
+            for cd in falling:
+                self.evaluator.signal_values[self.fragment.clock_domains[cd].clk] = 0
+            self.model.eval(self.timestamp)
+            # Apply generators writes.
+            if self.evaluator.commit():
+                self.model.eval(self.timestamp)
+
+            if not self._continue_simulation():
+                break
+
+
+def run_verilator_simulation(*args, **kwargs):
+    with VerilatorSimulator(*args, **kwargs) as s:
+        s.run()
@@ -9,6 +9,7 @@ import os
 import sys
 import inspect
 import importlib
+import collections.abc
 
 from migen import *
 
@@ -72,39 +73,70 @@ CPU_GCC_TRIPLE_RISCV32 = CPU_GCC_TRIPLE_RISCV64 + (
 
 # CPUS ---------------------------------------------------------------------------------------------
 
+class CPURegistry(collections.abc.Mapping):
+    """Lazy CPU registry.
+
+    CPU names are discovered with a cheap directory scan (a CPU is a directory with a core.py, in
+    litex.soc.cores.cpu or in the execution path) and the CPU module is only imported on first
+    access to its class, so that importing LiteX does not import every CPU wrapper.
+    """
+    def __init__(self):
+        self._paths   = collections.OrderedDict({"None": None})
+        self._classes = {"None": CPUNone}
+        paths = [
+            # Add litex.soc.cores.cpu path.
+            os.path.dirname(__file__),
+            # Add execution path.
+            os.getcwd()
+        ]
+
+        # Search for CPUs in paths.
+        for path in paths:
+            for file in sorted(os.listdir(path)):
+
+                # Verify that it's a path...
+                cpu_path = os.path.join(path, file)
+                if not os.path.isdir(cpu_path):
+                    continue
+
+                # ... and that core.py is present.
+                cpu_core = os.path.join(cpu_path, "core.py")
+                if not os.path.exists(cpu_core):
+                    continue
+
+                # OK, it seems to be a CPU; register it (execution path can override LiteX's CPUs).
+                self._paths[file] = path
+
+    def _load(self, cpu):
+        path = self._paths[cpu]
+        if path == os.path.dirname(__file__):
+            module = importlib.import_module("litex.soc.cores.cpu." + cpu)
+        else:
+            if path not in sys.path:
+                sys.path.append(path)
+            module = importlib.import_module(cpu)
+        for cpu_name, cpu_cls in inspect.getmembers(module, inspect.isclass):
+            if cpu_name.lower() in [cpu, cpu.replace("_", "")]:
+                return cpu_cls
+        raise KeyError("No CPU class found in {} module".format(cpu))
+
+    def __getitem__(self, cpu):
+        if cpu not in self._classes:
+            if cpu not in self._paths:
+                raise KeyError(cpu)
+            self._classes[cpu] = self._load(cpu)
+        return self._classes[cpu]
+
+    def __contains__(self, cpu):
+        return cpu in self._paths
+
+    def __iter__(self):
+        return iter(self._paths)
+
+    def __len__(self):
+        return len(self._paths)
+
 def collect_cpus():
-    cpus  = {"None" : CPUNone}
-    paths = [
-        # Add litex.soc.cores.cpu path.
-        os.path.dirname(__file__),
-        # Add execution path.
-        os.getcwd()
-    ]
-
-    exec_dir = os.getcwd()
-
-    # Search for CPUs in paths.
-    for path in paths:
-        for file in os.listdir(path):
-
-            # Verify that it's a path...
-            cpu_path = os.path.join(path, file)
-            if not os.path.isdir(cpu_path):
-                continue
-
-            # ... and that core.py is present.
-            cpu_core = os.path.join(cpu_path, "core.py")
-            if not os.path.exists(cpu_core):
-                continue
-
-            # OK, it seems to be a CPU; now get the class and add it to dict.
-            cpu = file
-            sys.path.append(path)
-            for cpu_name, cpu_cls in inspect.getmembers(importlib.import_module(cpu), inspect.isclass):
-                if cpu_name.lower() in [cpu, cpu.replace("_", "")]:
-                    cpus[cpu] = cpu_cls
-
-    # Return collected CPUs.
-    return cpus
+    return CPURegistry()
 
 CPUS = collect_cpus()
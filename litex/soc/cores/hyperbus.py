@@ -9,7 +9,7 @@
 from migen import *
 from migen.genlib.misc import WaitTimer
 
-from litex.build.io import DifferentialOutput
+from litex.build.io import DifferentialOutput, DDROutput, DDRInput
 
 from litex.soc.interconnect import wishbone
 
@@ -23,16 +23,32 @@ class HyperRAM(Module):
     - FPGA vendor agnostic.
     - no setup/chip configuration (use default latency).
 
-    This core favors portability and ease of use over performance.
+    This core favors portability and ease of use over performance. Consecutive Wishbone accesses
+    (ex: incrementing bursts) are mapped to HyperBus linear bursts (limited to tCSM) and the
+    defaults can be changed for higher throughput:
+    - clk_ratio="2:1": HyperRAM Clk = sys_clk/2 (instead of sys_clk/4), the Clk being generated
+      with a DDROutput to keep it 90° shifted with DQ (CSn/DQ/RWDS outputs are registered to match
+      the DDROutput latency). DQ/RWDS are sampled with DDRInputs and read data is validated by the
+      RWDS toggles, making reads independent of the IOs/RAM latencies.
+    - latency_mode="variable": HyperRAM is configured in variable latency mode and the latency
+      (1x or 2x) is sampled on RWDS during Command/Address.
+    - with_config: Configures latency/latency_mode in CR0 at startup (forced in variable mode,
+      otherwise the chip defaults are expected to match).
     """
-    def __init__(self, pads, latency=6, sys_clk_freq=None):
+    def __init__(self, pads, latency=6, sys_clk_freq=None, clk_ratio="4:1", latency_mode="fixed",
+        with_config = False):
         self.pads = pads
         self.bus  = bus = wishbone.Interface()
 
         # # #
 
+        assert clk_ratio    in ["4:1", "2:1"]
+        assert latency_mode in ["fixed", "variable"]
+        ratio       = {"4:1": 4, "2:1": 2}[clk_ratio]
+        with_config = with_config or (latency_mode == "variable")
+
         clk       = Signal()
-        clk_phase = Signal(2)
+        clk_phase = Signal(2 if ratio == 4 else 1)
         cs        = Signal()
         ca        = Signal(48)
         ca_active = Signal()
@@ -44,6 +60,12 @@ class HyperRAM(Module):
 
         assert dw in [8, 16]
 
+        # With sys_clk/2, the Clk DDROutput registers its inputs (1 sys_clk latency): register CSn,
+        # DQ and RWDS outputs too to keep them aligned with Clk.
+        if ratio == 2:
+            dq   = self.add_output_register(dq)
+            rwds = self.add_output_register(rwds)
+
         # Drive Control Signals --------------------------------------------------------------------
 
         # Rst.
@@ -51,12 +73,22 @@ class HyperRAM(Module):
             self.comb += pads.rst_n.eq(1)
 
         # CSn.
-        self.comb += pads.cs_n[0].eq(~cs)
+        if ratio == 2:
+            cs_n = Signal(reset=1)
+            self.sync += cs_n.eq(~cs)
+            self.comb += pads.cs_n[0].eq(cs_n)
+        else:
+            self.comb += pads.cs_n[0].eq(~cs)
         assert len(pads.cs_n) <= 2
         if len(pads.cs_n) == 2:
             self.comb += pads.cs_n[1].eq(1)
 
         # Clk.
+        if ratio == 2:
+            # DDR Clk: clk_i1/clk_i2 are the Clk levels on the first/second half of sys_clk period.
+            clk_i1 = Signal()
+            clk_i2 = Signal()
+            self.specials += DDROutput(i1=clk_i1, i2=clk_i2, o=clk)
         if hasattr(pads, "clk"):
             self.comb += pads.clk.eq(clk)
         else:
@@ -67,23 +99,45 @@ class HyperRAM(Module):
         burst_timer  = WaitTimer(int(sys_clk_freq*self.tCSM))
         self.submodules += burst_timer
 
-        # Clock Generation (sys_clk/4) -------------------------------------------------------------
+        # Clock Generation (sys_clk/4 or sys_clk/2) -----------------------------------------------
         self.sync += clk_phase.eq(clk_phase + 1)
-        cases = {}
-        cases[1] = clk.eq(cs) # Set pads clk on 90° (if cs is set)
-        cases[3] = clk.eq(0)  # Clear pads clk on 270°
-        self.sync += Case(clk_phase, cases)
+        if ratio == 4:
+            cases = {}
+            cases[1] = clk.eq(cs) # Set pads clk on 90° (if cs is set)
+            cases[3] = clk.eq(0)  # Clear pads clk on 270°
+            self.sync += Case(clk_phase, cases)
+        else:
+            self.comb += clk_i2.eq(cs & (clk_phase == 1)) # Set pads clk on 90° (if cs is set)
+            self.sync += clk_i1.eq(clk_i2)                # Keep pads clk set until 270°
 
         # Data Shift-In Register -------------------------------------------------------------------
         dqi = Signal(dw)
-        self.sync += dqi.eq(dq.i) # Sample on 90° and 270°
+        if ratio == 4:
+            self.sync += dqi.eq(dq.i) # Sample on 90° and 270°
+        else:
+            # With sys_clk/2, RAM Clk edges are on sys_clk falling edges: sample DQ/RWDS on sys_clk
+            # rising edges with DDRInputs. During reads, the RAM toggles RWDS with each data: use the
+            # toggles to validate read data (rx_valid).
+            rwdsi     = Signal(dw//8)
+            rwdsi_d   = Signal()
+            rx_active = Signal()
+            rx_valid  = Signal()
+            for i in range(dw):
+                self.specials += DDRInput(i=dq.i[i], o1=dqi[i], o2=Signal())
+            for i in range(dw//8):
+                self.specials += DDRInput(i=rwds.i[i], o1=rwdsi[i], o2=Signal())
+            self.sync += rwdsi_d.eq(rwdsi[0])
+            self.comb += rx_valid.eq(rwdsi[0] != rwdsi_d)
         self.comb += [
             sr_new.eq(Cat(dqi, sr[:-dw])),
             If(ca_active,
                 sr_new.eq(Cat(dqi[:8], sr[:-8])) # Only 8-bit during Command/Address.
             )
         ]
-        self.sync += If(clk_phase[0] == 0, sr.eq(sr_new)) # Shift on 0° and 180°
+        if ratio == 4:
+            self.sync += If(clk_phase[0] == 0, sr.eq(sr_new)) # Shift on 0° and 180°
+        else:
+            self.sync += If(~rx_active | rx_valid, sr.eq(sr_new)) # Shift on each sys_clk (0° and 180°)
 
         # Data Shift-Out Register ------------------------------------------------------------------
         self.comb += [
@@ -105,9 +159,24 @@ class HyperRAM(Module):
             ca[ashift:3].eq(bus.adr),         # Lower Column Address
         ]
 
-        # Latency count starts from the middle of the command (thus the -4). In fixed latency mode
-        # (default), latency is 2 x Latency count. We have 4 x sys_clk per RAM clock:
-        latency_cycles = (latency * 2 * 4) - 4
+        # Latency count starts from the middle of the command (thus the -ratio). In fixed latency mode
+        # (default), latency is 2 x Latency count. In variable latency mode, latency is 1 x Latency
+        # count unless RWDS is set during Command/Address. We have ratio x sys_clk per RAM clock:
+        latency_cycles_x1 = (latency * 1 * ratio) - ratio
+        latency_cycles_x2 = (latency * 2 * ratio) - ratio
+        latency_x2        = Signal(reset=1)
+        if latency_mode == "variable":
+            self.sync += If(cs & ca_active, latency_x2.eq(rwds.i[0] if ratio == 4 else rwdsi[0]))
+
+        # Configuration (CR0) ----------------------------------------------------------------------
+        if with_config:
+            latency_codes = {3: 0b1110, 4: 0b1111, 5: 0b0000, 6: 0b0001, 7: 0b0010}
+            assert latency in latency_codes.keys()
+            config_ca   = 0x600001000000 # Write, Register Space, Linear Burst, CR0.
+            config_cr0  = 0x8f07 # Defaults (Drive Strength, Legacy Wrapped Burst, 32-byte).
+            config_cr0 |= latency_codes[latency] << 4
+            config_cr0 |= (latency_mode == "fixed") << 3
+            config_done = Signal()
 
         # Bus Latch --------------------------------------------------------------------------------
         bus_adr   = Signal(32)
@@ -136,22 +205,49 @@ class HyperRAM(Module):
                 )
             )
         )
+        if with_config:
+            # Write CR0 before the first access (Registers writes have no latency).
+            fsm.act("IDLE",
+                If(~config_done & (clk_phase == 0),
+                    NextValue(sr, config_ca),
+                    NextState("SEND-COMMAND-ADDRESS")
+                )
+            )
         fsm.act("SEND-COMMAND-ADDRESS",
             # Set CSn.
             cs.eq(1),
             # Send Command on DQ.
             ca_active.eq(1),
             dq.oe.eq(1),
-            # Wait for 6*2 cycles...
-            If(cycles == (6*2 - 1),
+            # Wait for 6 x RAM Clk edges...
+            If(cycles == (6*ratio//2 - 1),
                 NextState("WAIT-LATENCY")
             )
         )
+        if with_config:
+            fsm.act("SEND-COMMAND-ADDRESS",
+                If((cycles == (6*ratio//2 - 1)) & ~config_done,
+                    NextValue(sr, Cat(Signal(32), C(config_cr0, 16))),
+                    NextState("WRITE-CONFIG")
+                )
+            )
+            fsm.act("WRITE-CONFIG",
+                # Set CSn.
+                cs.eq(1),
+                # Send CR0 on DQ (8-bit).
+                ca_active.eq(1),
+                dq.oe.eq(1),
+                # Wait for 2 x RAM Clk edges...
+                If(cycles == (ratio - 1),
+                    NextValue(config_done, 1),
+                    NextState("IDLE")
+                )
+            )
         fsm.act("WAIT-LATENCY",
             # Set CSn.
             cs.eq(1),
             # Wait for Latency cycles...
-            If(cycles == (latency_cycles - 1),
+            If(cycles == Mux(latency_x2, latency_cycles_x2 - 1, latency_cycles_x1 - 1),
                 # Latch Bus.
                 bus_latch.eq(1),
                 # Early Write Ack (to allow bursting).
@@ -160,6 +256,8 @@ class HyperRAM(Module):
             )
         )
         states = {8:4, 16:2}[dw]
+        # Data step: 1 x RAM Clk edge (ratio/2 cycles). With sys_clk/2, reads are stepped on RWDS.
+        data_step = (cycles == (ratio//2 - 1)) if ratio == 4 else bus_we
         for n in range(states):
             fsm.act(f"READ-WRITE-DATA{n}",
                 # Enable Burst Timer.
@@ -172,8 +270,8 @@ class HyperRAM(Module):
                     rwds.oe.eq(1),
                     *[rwds.o[dw//8-1-i].eq(~bus_sel[4-1-n*dw//8-i]) for i in range(dw//8)],
                 ),
-                # Wait for 2 cycles (since HyperRAM's Clk = sys_clk/4).
-                If(cycles == (2 - 1),
+                # Wait for 1 x RAM Clk edge (ratio/2 cycles).
+                If(data_step,
                     # Set next default state (with rollover for bursts).
                     NextState(f"READ-WRITE-DATA{(n + 1)%states}"),
                     # On last state, see if we can continue the burst or if we should end it.
@@ -196,6 +294,30 @@ class HyperRAM(Module):
                     )
                 )
             )
+            if ratio == 2:
+                fsm.act(f"READ-WRITE-DATA{n}",
+                    # Shift-In Data on RWDS toggles (for read).
+                    rx_active.eq(~bus_we),
+                    If(~bus_we & rx_valid,
+                        # Set next default state (with rollover for bursts).
+                        NextState(f"READ-WRITE-DATA{(n + 1)%states}"),
+                        # On first state (of next data), continue the burst when a consecutive access
+                        # is ready or end it.
+                        If((n == 0) & ~first,
+                            If(bus.stb & bus.cyc & ~bus.we & (bus.adr == (bus_adr + 1)) & (~burst_timer.done),
+                                # Latch Bus.
+                                bus_latch.eq(1),
+                            ).Else(
+                                NextState("IDLE")
+                            )
+                        ),
+                        # On last state, Read Ack (dat_r ready).
+                        If(n == (states - 1),
+                            NextValue(first, 0),
+                            bus.ack.eq(1),
+                        )
+                    )
+                )
         fsm.finalize()
         self.sync += cycles.eq(cycles + 1)
         self.sync += If(fsm.next_state != fsm.state, cycles.eq(0))
@@ -204,3 +326,12 @@ class HyperRAM(Module):
         t = TSTriple(len(pad))
         self.specials += t.get_tristate(pad)
         return t
+
+    def add_output_register(self, t):
+        r = Record([("oe", 1), ("o", len(t.o)), ("i", len(t.i))])
+        self.sync += [
+            t.oe.eq(r.oe),
+            t.o.eq(r.o),
+        ]
+        self.comb += r.i.eq(t.i)
+        return r
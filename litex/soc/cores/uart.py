@@ -303,9 +303,29 @@ CMD_WRITE_BURST_INCR  = 0x01
 CMD_READ_BURST_INCR   = 0x02
 CMD_WRITE_BURST_FIXED = 0x03
 CMD_READ_BURST_FIXED  = 0x04
+CMD_POLL              = 0x05
+CMD_RMW               = 0x06
 
 class Stream2Wishbone(Module):
-    def __init__(self, phy=None, clk_freq=None, data_width=32, address_width=32):
+    """Stream2Wishbone
+
+    Bridges a byte stream to a Wishbone master. Each command is sent as: cmd (1 byte), length (1
+    byte), address (address_width/8 bytes, MSB first), followed by command specific data.
+
+    length_width sets the width of the length field (8 or 16 bits, sent MSB first). With a non-zero
+    prefetch_depth, reads are streamed: words are prefetched into a FIFO (with incrementing Wishbone
+    bursts) while the previous ones are being serialized, allowing reads at the PHY line rate.
+
+    With with_poll_rmw, two extra commands are executed directly in gateware (saving host round
+    trips on high latency links):
+    - CMD_POLL: length is a timeout (in ms), followed by mask and value (data_width/8 bytes each).
+      The register is read until (reg & mask) == value or timeout; the last read value is returned
+      (or ~value when the slave never acks, the read being abandoned 1ms after the timeout).
+    - CMD_RMW: length is ignored, followed by mask and value; writes (reg & ~mask) | (value & mask).
+    """
+    def __init__(self, phy=None, clk_freq=None, data_width=32, address_width=32, length_width=8,
+        prefetch_depth = 0,
+        with_poll_rmw  = False):
         self.sink     = sink   = stream.Endpoint([("data", 8)]) if phy is None else phy.source
         self.source   = source = stream.Endpoint([("data", 8)]) if phy is None else phy.sink
         self.wishbone = wishbone.Interface(data_width=data_width, adr_width=address_width)
@@ -313,28 +333,63 @@ class Stream2Wishbone(Module):
         # # #
         assert data_width    in [8, 16, 32]
         assert address_width in [8, 16, 32]
+        assert length_width  in [8, 16]
 
         cmd              = Signal(8,                           reset_less=True)
         incr             = Signal()
-        length           = Signal(8,                           reset_less=True)
+        length           = Signal(length_width,                reset_less=True)
+        len_bytes_count  = Signal(max(1, length_width//8 - 1), reset_less=True)
         address          = Signal(address_width,               reset_less=True)
         data             = Signal(data_width,                  reset_less=True)
         data_bytes_count = Signal(int(log2(data_width//8)),    reset_less=True)
         addr_bytes_count = Signal(int(log2(address_width//8)), reset_less=True)
-        words_count      = Signal(8,                           reset_less=True)
+        words_count      = Signal(length_width,                reset_less=True)
+        mask             = Signal(data_width,                  reset_less=True)
+        value            = Signal(data_width,                  reset_less=True)
 
         data_bytes_count_done  = (data_bytes_count == (data_width//8 - 1))
         addr_bytes_count_done  = (addr_bytes_count == (address_width//8 - 1))
+        len_bytes_count_done   = (len_bytes_count  == (length_width//8 - 1))
         words_count_done  = (words_count == (length - 1))
 
         self.submodules.fsm   = fsm   = ResetInserter()(FSM(reset_state="RECEIVE-CMD"))
         self.submodules.timer = timer = WaitTimer(int(100e-3*clk_freq))
-        self.comb += timer.wait.eq(~fsm.ongoing("RECEIVE-CMD"))
+        # Watchdog, restarted on each transmitted byte (for long reads). Polls have their own timeout
+        # and are excluded from it.
+        idle = fsm.ongoing("RECEIVE-CMD")
+        if with_poll_rmw:
+            idle = idle | fsm.ongoing("POLL-READ")
+        self.comb += timer.wait.eq(~idle & ~(source.valid & source.ready))
         self.comb += fsm.reset.eq(timer.done)
+        cmd_dispatch = If((cmd == CMD_WRITE_BURST_INCR) | (cmd == CMD_WRITE_BURST_FIXED),
+            NextValue(incr, cmd == CMD_WRITE_BURST_INCR),
+            # Zero-length bursts are no-ops.
+            If(length == 0,
+                NextState("RECEIVE-CMD")
+            ).Else(
+                NextState("RECEIVE-DATA")
+            )
+        ).Elif((cmd == CMD_READ_BURST_INCR) | (cmd == CMD_READ_BURST_FIXED),
+            NextValue(incr, cmd == CMD_READ_BURST_INCR),
+            If(length == 0,
+                NextState("RECEIVE-CMD")
+            ).Else(
+                NextState("READ-STREAM" if prefetch_depth else "READ-DATA")
+            )
+        )
+        if with_poll_rmw:
+            cmd_dispatch.Elif((cmd == CMD_POLL) | (cmd == CMD_RMW),
+                NextValue(incr, 0),
+                NextState("RECEIVE-MASK")
+            )
+        cmd_dispatch.Else(
+            NextState("RECEIVE-CMD")
+        )
         fsm.act("RECEIVE-CMD",
             sink.ready.eq(1),
             NextValue(data_bytes_count, 0),
             NextValue(addr_bytes_count, 0),
+            NextValue(len_bytes_count, 0),
             NextValue(words_count, 0),
             If(sink.valid,
                 NextValue(cmd, sink.data),
@@ -344,8 +399,11 @@ class Stream2Wishbone(Module):
         fsm.act("RECEIVE-LENGTH",
             sink.ready.eq(1),
             If(sink.valid,
-                NextValue(length, sink.data),
-                NextState("RECEIVE-ADDRESS")
+                NextValue(length, Cat(sink.data, length)),
+                NextValue(len_bytes_count, len_bytes_count + 1),
+                If(len_bytes_count_done,
+                    NextState("RECEIVE-ADDRESS")
+                )
             )
         )
         fsm.act("RECEIVE-ADDRESS",
@@ -354,15 +412,7 @@ class Stream2Wishbone(Module):
                 NextValue(address, Cat(sink.data, address)),
                 NextValue(addr_bytes_count, addr_bytes_count + 1),
                 If(addr_bytes_count_done,
-                    If((cmd == CMD_WRITE_BURST_INCR) | (cmd == CMD_WRITE_BURST_FIXED),
-                        NextValue(incr, cmd == CMD_WRITE_BURST_INCR),
-                        NextState("RECEIVE-DATA")
-                    ).Elif((cmd == CMD_READ_BURST_INCR) | (cmd == CMD_READ_BURST_FIXED),
-                        NextValue(incr, cmd == CMD_READ_BURST_INCR),
-                        NextState("READ-DATA")
-                    ).Else(
-                        NextState("RECEIVE-CMD")
-                    )
+                    cmd_dispatch
                 )
             )
         )
@@ -376,6 +426,71 @@ class Stream2Wishbone(Module):
                 )
             )
         )
+        if with_poll_rmw:
+            poll_ms_tick  = WaitTimer(int(1e-3*clk_freq))
+            poll_ms_count = Signal(length_width + 1, reset_less=True)
+            self.submodules += poll_ms_tick
+            self.comb += poll_ms_tick.wait.eq(fsm.ongoing("POLL-READ") & ~poll_ms_tick.done)
+            fsm.act("RECEIVE-MASK",
+                sink.ready.eq(1),
+                If(sink.valid,
+                    NextValue(mask, Cat(sink.data, mask)),
+                    NextValue(data_bytes_count, data_bytes_count + 1),
+                    If(data_bytes_count_done,
+                        NextState("RECEIVE-VALUE")
+                    )
+                )
+            )
+            fsm.act("RECEIVE-VALUE",
+                sink.ready.eq(1),
+                If(sink.valid,
+                    NextValue(value, Cat(sink.data, value)),
+                    NextValue(data_bytes_count, data_bytes_count + 1),
+                    If(data_bytes_count_done,
+                        NextValue(poll_ms_count, 0),
+                        # Returned (not matching) if the register is never read.
+                        NextValue(data, ~Cat(sink.data, value)),
+                        If(cmd == CMD_POLL,
+                            NextState("POLL-READ")
+                        ).Else(
+                            NextState("RMW-READ")
+                        )
+                    )
+                )
+            )
+            fsm.act("POLL-READ",
+                sink.ready.eq(0),
+                self.wishbone.stb.eq(1),
+                self.wishbone.we.eq(0),
+                self.wishbone.cyc.eq(1),
+                If(poll_ms_tick.done,
+                    NextValue(poll_ms_count, poll_ms_count + 1)
+                ),
+                # Length is now the timeout, return a single word.
+                If(self.wishbone.ack,
+                    NextValue(data, self.wishbone.dat_r),
+                    If(((self.wishbone.dat_r & mask) == value) | (poll_ms_count >= length),
+                        NextValue(length, 1),
+                        NextState("SEND-DATA")
+                    )
+                # Slave not acking: give up 1ms after the timeout (dropping cyc/stb).
+                ).Elif(poll_ms_count > length,
+                    NextValue(length, 1),
+                    NextState("SEND-DATA")
+                )
+            )
+            fsm.act("RMW-READ",
+                sink.ready.eq(0),
+                self.wishbone.stb.eq(1),
+                self.wishbone.we.eq(0),
+                self.wishbone.cyc.eq(1),
+                If(self.wishbone.ack,
+                    NextValue(data, (self.wishbone.dat_r & ~mask) | (value & mask)),
+                    NextValue(length, 1),
+                    NextState("WRITE-DATA")
+                )
+            )
+
         self.comb += [
             self.wishbone.adr.eq(address),
             self.wishbone.dat_w.eq(data),
@@ -409,7 +524,55 @@ class Stream2Wishbone(Module):
         cases = {}
         for i, n in enumerate(reversed(range(data_width//8))):
             cases[i] = source.data.eq(data[8*n:])
-        self.comb += Case(data_bytes_count, cases)
+        if prefetch_depth:
+            # Reads are issued while the FIFO has room and serialized (MSB first) from the FIFO.
+            issued_count = Signal(length_width, reset_less=True)
+            issue_done   = (issued_count == length)
+            fifo = stream.SyncFIFO([("data", data_width)], prefetch_depth, buffered=True)
+            conv = stream.Converter(data_width, 8, reverse=True)
+            fifo = ResetInserter()(fifo)
+            conv = ResetInserter()(conv)
+            self.submodules += fifo, conv
+            self.comb += [
+                fifo.reset.eq(~fsm.ongoing("READ-STREAM")),
+                conv.reset.eq(~fsm.ongoing("READ-STREAM")),
+                fifo.sink.data.eq(self.wishbone.dat_r),
+                fifo.source.connect(conv.sink, omit={"last"}),
+                conv.sink.last.eq(words_count_done),
+                If(fsm.ongoing("READ-STREAM"),
+                    source.data.eq(conv.source.data)
+                ).Else(
+                    Case(data_bytes_count, cases)
+                )
+            ]
+            fsm.act("READ-STREAM",
+                sink.ready.eq(0),
+                If(~issue_done & fifo.sink.ready,
+                    self.wishbone.stb.eq(1),
+                    self.wishbone.we.eq(0),
+                    self.wishbone.cyc.eq(1),
+                    # Incrementing burst, ended on the last word or when the FIFO can become full
+                    # (cyc/stb are then released).
+                    self.wishbone.cti.eq(Mux(incr & (issued_count != (length - 1)) & (fifo.level < (prefetch_depth - 1)),
+                        0b010, 0b111)),
+                    fifo.sink.valid.eq(self.wishbone.ack),
+                    If(self.wishbone.ack,
+                        NextValue(issued_count, issued_count + 1),
+                        NextValue(address, address + incr)
+                    )
+                ),
+                source.valid.eq(conv.source.valid),
+                conv.source.ready.eq(source.ready),
+                If(conv.sink.valid & conv.sink.ready,
+                    NextValue(words_count, words_count + 1),
+                    If(words_count_done,
+                        NextState("RECEIVE-CMD")
+                    )
+                )
+            )
+            fsm.act("RECEIVE-CMD", NextValue(issued_count, 0))
+        else:
+            self.comb += Case(data_bytes_count, cases)
         fsm.act("SEND-DATA",
             sink.ready.eq(0),
             source.valid.eq(1),
@@ -426,23 +589,28 @@ class Stream2Wishbone(Module):
                 )
             )
         )
-        self.comb += source.last.eq(data_bytes_count_done & words_count_done)
+        if prefetch_depth:
+            self.comb += source.last.eq(Mux(fsm.ongoing("READ-STREAM"),
+                conv.source.last,
+                data_bytes_count_done & words_count_done))
+        else:
+            self.comb += source.last.eq(data_bytes_count_done & words_count_done)
         if hasattr(source, "length"):
             self.comb += source.length.eq((data_width//8)*length)
 
 
 class UARTBone(Stream2Wishbone):
-    def __init__(self, phy, clk_freq, cd="sys"):
+    def __init__(self, phy, clk_freq, cd="sys", **kwargs):
         if cd == "sys":
             self.submodules.phy = phy
-            Stream2Wishbone.__init__(self, self.phy, clk_freq=clk_freq)
+            Stream2Wishbone.__init__(self, self.phy, clk_freq=clk_freq, **kwargs)
         else:
             self.submodules.phy = ClockDomainsRenamer(cd)(phy)
             self.submodules.tx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from="sys", cd_to=cd)
             self.submodules.rx_cdc = stream.ClockDomainCrossing([("data", 8)], cd_from=cd,    cd_to="sys")
             self.comb += self.phy.source.connect(self.rx_cdc.sink)
             self.comb += self.tx_cdc.source.connect(self.phy.sink)
-            Stream2Wishbone.__init__(self, clk_freq=clk_freq)
+            Stream2Wishbone.__init__(self, clk_freq=clk_freq, **kwargs)
             self.comb += self.rx_cdc.source.connect(self.sink)
             self.comb += self.source.connect(self.tx_cdc.sink)
 
@@ -615,11 +615,92 @@ class VideoTerminal(Module):
             )
         ]
 
+# Video Scaler -------------------------------------------------------------------------------------
+
+class VideoScaler(Module):
+    """Video Scaler
+
+    Integer upscaler of a pixel stream: each pixel is repeated hscale times and each line (of hres
+    source pixels) vscale times. Lines are only consumed once from the sink: repeated lines are
+    replayed from an on-chip line buffer.
+    """
+    def __init__(self, hres, depth, hscale=1, vscale=1):
+        self.sink   = sink   = stream.Endpoint([("data", depth)])
+        self.source = source = stream.Endpoint([("data", depth)])
+
+        # # #
+
+        hcount = Signal(max=max(hres,   2))
+        hrep   = Signal(max=max(hscale, 2))
+        vrep   = Signal(max=max(vscale, 2))
+
+        hrep_last   = (hrep   == (hscale - 1))
+        hcount_last = (hcount == (hres   - 1))
+        vrep_last   = (vrep   == (vscale - 1))
+        advance     = source.valid & source.ready & hrep_last
+
+        # Line Buffer.
+        if vscale > 1:
+            mem = Memory(depth, hres)
+            wr  = mem.get_port(write_capable=True)
+            rd  = mem.get_port()
+            self.specials += mem, wr, rd
+            self.comb += [
+                wr.adr.eq(hcount),
+                wr.dat_w.eq(sink.data),
+                wr.we.eq((vrep == 0) & sink.valid & sink.ready),
+                # Read ahead so that rd.dat_r always corresponds to the current pixel.
+                rd.adr.eq(hcount),
+                If(advance,
+                    rd.adr.eq(Mux(hcount_last, 0, hcount + 1))
+                )
+            ]
+
+        # Pixels from Sink on first line, from Line Buffer on repeated lines.
+        self.comb += [
+            If(vrep == 0,
+                source.valid.eq(sink.valid),
+                source.data.eq(sink.data),
+                sink.ready.eq(source.ready & hrep_last),
+            ).Else(
+                source.valid.eq(1),
+                source.data.eq(rd.dat_r if vscale > 1 else 0),
+            )
+        ]
+
+        # Counters.
+        self.sync += [
+            If(source.valid & source.ready,
+                hrep.eq(hrep + 1),
+                If(hrep_last,
+                    hrep.eq(0),
+                    hcount.eq(hcount + 1),
+                    If(hcount_last,
+                        hcount.eq(0),
+                        vrep.eq(vrep + 1),
+                        If(vrep_last,
+                            vrep.eq(0)
+                        )
+                    )
+                )
+            )
+        ]
+
 # Video FrameBuffer --------------------------------------------------------------------------------
 
 class VideoFrameBuffer(Module, AutoCSR):
-    """Video FrameBuffer"""
-    def __init__(self, dram_port, hres=800, vres=600, base=0x00000000, fifo_depth=65536, clock_domain="sys", clock_faster_than_sys=False, format="rgb888"):
+    """Video FrameBuffer
+
+    Streams the framebuffer from DRAM to the Video PHY. To reduce DRAM bandwidth:
+    - hscale/vscale: Framebuffer is (hres/hscale)x(vres/vscale) and upscaled with a VideoScaler
+      (each DRAM line is only fetched once).
+    - with_double_buffer: dma_swap_base CSR requests a base swap at the next frame boundary,
+      dma_swap_pending is cleared once the new buffer is displayed (on VSync).
+    """
+    def __init__(self, dram_port, hres=800, vres=600, base=0x00000000, fifo_depth=65536, clock_domain="sys", clock_faster_than_sys=False, format="rgb888",
+        hscale             = 1,
+        vscale             = 1,
+        with_double_buffer = False):
         self.vtg_sink  = vtg_sink = stream.Endpoint(video_timing_layout)
         self.source    = source   = stream.Endpoint(video_data_layout)
         self.underflow = Signal()
@@ -631,15 +712,22 @@ class VideoFrameBuffer(Module, AutoCSR):
 
         # # #
 
+        assert (hres % hscale == 0) and (vres % vscale == 0)
+        self.fb_hres = fb_hres = hres//hscale
+        self.fb_vres = fb_vres = vres//vscale
+
         # Video DMA.
         from litedram.frontend.dma import LiteDRAMDMAReader
         self.submodules.dma = LiteDRAMDMAReader(dram_port, fifo_depth=fifo_depth//(dram_port.data_width//8), fifo_buffered=True)
-        self.dma.add_csr(
-            default_base   = base,
-            default_length = hres*vres*depth//8, # 32-bit RGB-888 or 16-bit RGB-565
-            default_enable = 0,
-            default_loop   = 1
-        )
+        if not with_double_buffer:
+            self.dma.add_csr(
+                default_base   = base,
+                default_length = fb_hres*fb_vres*depth//8, # 32-bit RGB-888 or 16-bit RGB-565
+                default_enable = 0,
+                default_loop   = 1
+            )
+        else:
+            self.add_double_buffer(dram_port, base, fb_hres*fb_vres*depth//8, clock_domain)
 
         # If DRAM Data Width > depth and Video clock is faster than sys_clk:
         if (dram_port.data_width > depth) and clock_faster_than_sys:
@@ -665,6 +753,17 @@ class VideoFrameBuffer(Module, AutoCSR):
                 ]
             video_pipe_source = self.cdc.source
 
+        # Video Scaling.
+        if (hscale > 1) or (vscale > 1):
+            self.submodules.scaler = ClockDomainsRenamer(clock_domain)(VideoScaler(
+                hres   = fb_hres,
+                depth  = depth,
+                hscale = hscale,
+                vscale = vscale,
+            ))
+            self.comb += video_pipe_source.connect(self.scaler.sink)
+            video_pipe_source = self.scaler.source
+
         # Video Generation.
         self.comb += [
             vtg_sink.ready.eq(1),
@@ -691,6 +790,78 @@ class VideoFrameBuffer(Module, AutoCSR):
         # Underflow.
         self.comb += self.underflow.eq(~source.valid)
 
+    def add_double_buffer(self, dram_port, base, length, clock_domain):
+        # Same CSRs than LiteDRAMDMAReader (dma_base/length/enable/done/loop/offset) + swap control.
+        self._dma_base         = CSRStorage(32, reset=base)
+        self._dma_length       = CSRStorage(32, reset=length)
+        self._dma_enable       = CSRStorage()
+        self._dma_done         = CSRStatus()
+        self._dma_loop         = CSRStorage(reset=1)
+        self._dma_offset       = CSRStatus(32)
+        self._dma_swap_base    = CSRStorage(32)
+        self._dma_swap_pending = CSRStatus()
+
+        # # #
+
+        shift        = log2_int(dram_port.data_width//8)
+        front        = Signal(32, reset=base)
+        offset       = Signal(32)
+        done         = Signal()
+        swap_request = Signal()
+        swap_display = Signal()
+
+        # Base update (immediate) / Swap request (at next frame boundary).
+        self.sync += [
+            If(self._dma_base.re,
+                front.eq(self._dma_base.storage)
+            ),
+            If(self._dma_swap_base.re,
+                swap_request.eq(1)
+            )
+        ]
+
+        # DMA Addresses generation (looping on the framebuffer or stopping at its end).
+        self.comb += [
+            self.dma.enable.eq(self._dma_enable.storage),
+            self.dma.sink.valid.eq(self._dma_enable.storage & ~done),
+            self.dma.sink.last.eq(offset == (self._dma_length.storage[shift:] - 1)),
+            self.dma.sink.address.eq(front[shift:] + offset),
+            self._dma_done.status.eq(done),
+            self._dma_offset.status.eq(offset),
+        ]
+        self.sync += [
+            If(~self._dma_enable.storage,
+                offset.eq(0),
+                done.eq(0)
+            ).Elif(self.dma.sink.valid & self.dma.sink.ready,
+                offset.eq(offset + 1),
+                If(self.dma.sink.last,
+                    If(self._dma_loop.storage,
+                        offset.eq(0)
+                    ).Else(
+                        done.eq(1)
+                    ),
+                    If(swap_request,
+                        front.eq(self._dma_swap_base.storage),
+                        swap_request.eq(0),
+                        swap_display.eq(1)
+                    )
+                )
+            )
+        ]
+
+        # Swap completion: wait for next VSync (new buffer being displayed).
+        vsync      = Signal()
+        vsync_d    = Signal()
+        self.specials += MultiReg(self.vtg_sink.vsync, vsync)
+        self.sync += [
+            vsync_d.eq(vsync),
+            If(vsync & ~vsync_d,
+                swap_display.eq(0)
+            )
+        ]
+        self.comb += self._dma_swap_pending.status.eq(swap_request | swap_display)
+
 # Video PHYs ---------------------------------------------------------------------------------------
 
 class Open(Signal): pass
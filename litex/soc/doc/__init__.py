@@ -39,45 +39,8 @@ def generate_svd(soc, buildpath, filename=None, name="soc", **kwargs):
         svd.write(export.get_csr_svd(soc, **kwargs))
 
 
-def generate_docs(soc, base_dir,
-    project_name          = "LiteX SoC Project",
-    author                = "Anonymous",
-    sphinx_extensions     = [],
-    quiet                 = False,
-    note_pulses           = False,
-    from_scratch          = True,
-    sphinx_extra_config   = ""):
-    """Possible extra extensions:
-        [
-            'm2r',
-            'recommonmark',
-            'sphinx_rtd_theme',
-            'sphinx_autodoc_typehints',
-        ]
-    """
-
-    # Ensure the target directory is a full path
-    if base_dir[-1] != '/':
-        base_dir = base_dir + '/'
-
-    # Ensure the output directory exists
-    pathlib.Path(base_dir + "/_static").mkdir(parents=True, exist_ok=True)
-
-    # Create the sphinx configuration file if the user has requested,
-    # or if it doesn't exist already.
-    if from_scratch or not os.path.isfile(base_dir + "conf.py"):
-        with open(base_dir + "conf.py", "w", encoding="utf-8") as conf:
-            year = datetime.datetime.now().year
-            sphinx_ext_str = ""
-            for ext in sphinx_extensions:
-                sphinx_ext_str += "\n    \"{}\",".format(ext)
-            print(default_sphinx_configuration.format(project_name, year,
-                                                      author, author, sphinx_ext_str), file=conf)
-            print(sphinx_extra_config, file=conf)
-
-    if not quiet:
-        print("Generate the documentation by running `sphinx-build -M html {} {}_build`".format(base_dir, base_dir))
-
+def get_documentation(soc):
+    """Returns the documented CSR regions and the additional documented modules of the SoC."""
     # Gather all interrupts so we can easily map IRQ numbers to CSR sections
     interrupts = {}
     for csr, irq in sorted(soc.irq.locs.items()):
@@ -119,6 +82,56 @@ def generate_docs(soc, base_dir,
             except ModuleNotDocumented:
                 pass
 
+    return documented_regions, additional_modules
+
+
+def generate_docs(soc, base_dir,
+    project_name          = "LiteX SoC Project",
+    author                = "Anonymous",
+    sphinx_extensions     = [],
+    quiet                 = False,
+    note_pulses           = False,
+    from_scratch          = True,
+    sphinx_extra_config   = "",
+    documentation         = None):
+    """Possible extra extensions:
+        [
+            'm2r',
+            'recommonmark',
+            'sphinx_rtd_theme',
+            'sphinx_autodoc_typehints',
+        ]
+
+    documentation: Documented CSR regions and modules (see get_documentation), gathered from the SoC
+    when not provided.
+    """
+
+    # Ensure the target directory is a full path
+    if base_dir[-1] != '/':
+        base_dir = base_dir + '/'
+
+    # Ensure the output directory exists
+    pathlib.Path(base_dir + "/_static").mkdir(parents=True, exist_ok=True)
+
+    # Create the sphinx configuration file if the user has requested,
+    # or if it doesn't exist already.
+    if from_scratch or not os.path.isfile(base_dir + "conf.py"):
+        with open(base_dir + "conf.py", "w", encoding="utf-8") as conf:
+            year = datetime.datetime.now().year
+            sphinx_ext_str = ""
+            for ext in sphinx_extensions:
+                sphinx_ext_str += "\n    \"{}\",".format(ext)
+            print(default_sphinx_configuration.format(project_name, year,
+                                                      author, author, sphinx_ext_str), file=conf)
+            print(sphinx_extra_config, file=conf)
+
+    if not quiet:
+        print("Generate the documentation by running `sphinx-build -M html {} {}_build`".format(base_dir, base_dir))
+
+    if documentation is None:
+        documentation = get_documentation(soc)
+    documented_regions, additional_modules = documentation
+
     # Create index.rst containing links to all of the generated files.
     # If the user has set `from_scratch=False`, then skip this step.
     if from_scratch or not os.path.isfile(base_dir + "index.rst"):
@@ -88,7 +88,7 @@ def print_table(table, stream):
             column_widths[i] = max(column_widths[i], len(column))
 
     # Print out header
-    header = table.pop(0)
+    header = table[0]
     print("+", file=stream, end="")
     for i, column in enumerate(header):
         print("-" + "-"*column_widths[i], file=stream, end="")
@@ -106,7 +106,7 @@ def print_table(table, stream):
         print("=+", file=stream, end="")
     print("", file=stream)
 
-    for row in table:
+    for row in table[1:]:
         print("|", file=stream, end="")
         for i, column in enumerate(row):
             print(" " + column.ljust(column_widths[i]) + " |", file=stream, end="")
@@ -13,6 +13,7 @@
 
 
 import os
+import sys
 import argparse
 import subprocess
 import struct
@@ -21,8 +22,10 @@ import shutil
 from litex import get_data_mod
 from litex.build.tools import write_to_file
 from litex.soc.integration import export, soc_core
-from litex.soc.integration.soc import colorer
+from litex.soc.integration.soc import colorer, soc_excepthook
+from litex.soc.integration.snapshot import SoCSnapshot, get_snapshot_key
 from litex.soc.cores import cpu
+from litex.tools.remote.csr_builder import write_csr_cache
 
 # Helpers ------------------------------------------------------------------------------------------
 
@@ -76,14 +79,19 @@ class Builder:
         # Exports.
         csr_json         = None,
         csr_csv          = None,
+        csr_cache        = False,
         csr_svd          = None,
         memory_x         = None,
+        csr_h_fragments  = False,
 
         # BIOS Options.
         bios_options     = [],
 
         # Documentation.
-        generate_doc     = False):
+        generate_doc     = False,
+
+        # SoC Snapshot.
+        snapshot         = False):
 
         self.soc = soc
 
@@ -104,12 +112,22 @@ class Builder:
         self.csr_svd  = csr_svd
         self.memory_x = memory_x
 
+        # Write the compiled CSR map (csr.csv.cache) along csr.csv for host tools (fast start-up).
+        self.csr_cache = csr_cache
+
+        # Generate csr.h as per-peripheral fragments (generated/csr/<name>.h) included by csr.h.
+        self.csr_h_fragments = csr_h_fragments
+
         # BIOS Options.
         self.bios_options = bios_options
 
         # Documentation
         self.generate_doc = generate_doc
 
+        # SoC Snapshot: Save the SoC metadata and reuse it on export-only runs (no compilation) when
+        # the target's inputs are unchanged.
+        self.snapshot = snapshot
+
         # List software packages and libraries.
         self.software_packages  = []
         self.software_libraries = []
@@ -164,86 +182,137 @@ class Builder:
 
         return "\n".join(variables_contents)
 
-    def _generate_includes(self, with_bios=True):
-        # Generate Include/Generated directories.
-        _create_dir(self.include_dir)
-        _create_dir(self.generated_dir)
+    def _get_soc_includes(self, with_bios=True):
+        # Generated files depending on the SoC objects (saved rendered in the SoC snapshot).
+        includes = {}
 
         # Generate BIOS files when the SoC uses it.
         if with_bios:
             # Generate Variables to variables.mak.
-            variables_contents = self._get_variables_contents()
-            write_to_file(os.path.join(self.generated_dir, "variables.mak"), variables_contents)
+            includes["variables.mak"] = self._get_variables_contents()
 
             # Generate Output Format to output_format.ld.
-            output_format_contents = export.get_linker_output_format(self.soc.cpu)
-            write_to_file(os.path.join(self.generated_dir, "output_format.ld"), output_format_contents)
-
-            # Generate Memory Regions to regions.ld.
-            regions_contents = export.get_linker_regions(self.soc.mem_regions)
-            write_to_file(os.path.join(self.generated_dir, "regions.ld"), regions_contents)
+            includes["output_format.ld"] = export.get_linker_output_format(self.soc.cpu)
 
         # Collect / Generate I2C config and init table.
         from litex.soc.cores.bitbang import collect_i2c_info
         i2c_devs, i2c_init = collect_i2c_info(self.soc)
         if i2c_devs:
-            i2c_info = export.get_i2c_header((i2c_devs, i2c_init))
-            write_to_file(os.path.join(self.generated_dir, "i2c.h"), i2c_info)
+            includes["i2c.h"] = export.get_i2c_header((i2c_devs, i2c_init))
+
+        # Generate LiteDRAM C header to sdram_phy.h when the SoC use it
+        if hasattr(self.soc, "sdram"):
+            from litedram.init import get_sdram_phy_c_header
+            includes["sdram_phy.h"] = get_sdram_phy_c_header(
+                self.soc.sdram.controller.settings.phy,
+                self.soc.sdram.controller.settings.timing)
+
+        return includes
+
+    def _generate_includes(self, soc, includes, with_bios=True):
+        # Generate Include/Generated directories.
+        _create_dir(self.include_dir)
+        _create_dir(self.generated_dir)
+
+        # Generated files are only rewritten when their contents (banner date excepted) change, to
+        # avoid unnecessary software rebuilds.
+        def write_generated(filename, contents):
+            write_to_file(os.path.join(self.generated_dir, filename), contents, ignore_banner_date=True)
+
+        # Write SoC objects dependent files (variables.mak, output_format.ld, i2c.h, sdram_phy.h).
+        for filename, contents in includes.items():
+            write_generated(filename, contents)
+
+        # Generate Memory Regions to regions.ld.
+        if with_bios:
+            regions_contents = export.get_linker_regions(soc.mem_regions)
+            write_generated("regions.ld", regions_contents)
 
         # Generate Memory Regions to mem.h.
-        mem_contents = export.get_mem_header(self.soc.mem_regions)
-        write_to_file(os.path.join(self.generated_dir, "mem.h"), mem_contents)
+        mem_contents = export.get_mem_header(soc.mem_regions)
+        write_generated("mem.h", mem_contents)
 
         # Generate Memory Regions to memory.x if specified.
         if self.memory_x is not None:
-            memory_x_contents = export.get_memory_x(self.soc)
+            memory_x_contents = export.get_memory_x(soc)
             write_to_file(os.path.realpath(self.memory_x), memory_x_contents)
 
         # Generate SoC Config/Constants to soc.h.
-        soc_contents = export.get_soc_header(self.soc.constants)
-        write_to_file(os.path.join(self.generated_dir, "soc.h"), soc_contents)
-
-        # Generate CSR registers definitions/access functions to csr.h.
-        csr_contents = export.get_csr_header(
-            regions   = self.soc.csr_regions,
-            constants = self.soc.constants,
-            csr_base  = self.soc.mem_regions["csr"].origin)
-        write_to_file(os.path.join(self.generated_dir, "csr.h"), csr_contents)
+        soc_contents = export.get_soc_header(soc.constants)
+        write_generated("soc.h", soc_contents)
+
+        # Generate CSR registers definitions/access functions to csr.h (or csr.h + fragments).
+        csr_fragments_dir = os.path.join(self.generated_dir, "csr")
+        if self.csr_h_fragments:
+            csr_fragments = export.get_csr_header_fragments(
+                regions   = soc.csr_regions,
+                constants = soc.constants,
+                csr_base  = soc.mem_regions["csr"].origin)
+            _create_dir(csr_fragments_dir)
+            for filename, contents in csr_fragments.items():
+                write_generated(filename, contents)
+        else:
+            csr_fragments = {}
+            csr_contents  = export.get_csr_header(
+                regions   = soc.csr_regions,
+                constants = soc.constants,
+                csr_base  = soc.mem_regions["csr"].origin)
+            write_generated("csr.h", csr_contents)
+        # Remove fragments of removed peripherals (or all when fragments are disabled).
+        if os.path.isdir(csr_fragments_dir):
+            for filename in os.listdir(csr_fragments_dir):
+                if "csr/" + filename not in csr_fragments:
+                    os.remove(os.path.join(csr_fragments_dir, filename))
 
         # Generate Git SHA1 of tools to git.h
         git_contents = export.get_git_header()
-        write_to_file(os.path.join(self.generated_dir, "git.h"), git_contents)
-
-        # Generate LiteDRAM C header to sdram_phy.h when the SoC use it
-        if hasattr(self.soc, "sdram"):
-            from litedram.init import get_sdram_phy_c_header
-            sdram_contents = get_sdram_phy_c_header(
-                self.soc.sdram.controller.settings.phy,
-                self.soc.sdram.controller.settings.timing)
-            write_to_file(os.path.join(self.generated_dir, "sdram_phy.h"), sdram_contents)
+        write_generated("git.h", git_contents)
 
-    def _generate_csr_map(self):
+    def _generate_csr_map(self, soc, svd_regions=None):
         # JSON Export.
         if self.csr_json is not None:
             csr_json_contents = export.get_csr_json(
-                csr_regions = self.soc.csr_regions,
-                constants   = self.soc.constants,
-                mem_regions = self.soc.mem_regions)
+                csr_regions = soc.csr_regions,
+                constants   = soc.constants,
+                mem_regions = soc.mem_regions)
             write_to_file(os.path.realpath(self.csr_json), csr_json_contents)
 
         # CSV Export.
         if self.csr_csv is not None:
             csr_csv_contents = export.get_csr_csv(
-                csr_regions = self.soc.csr_regions,
-                constants   = self.soc.constants,
-                mem_regions = self.soc.mem_regions)
+                csr_regions = soc.csr_regions,
+                constants   = soc.constants,
+                mem_regions = soc.mem_regions)
             write_to_file(os.path.realpath(self.csr_csv), csr_csv_contents)
+            # Compiled CSR map for host tools (fast start-up).
+            if self.csr_cache:
+                write_csr_cache(os.path.realpath(self.csr_csv))
 
         # SVD Export.
         if self.csr_svd is not None:
-            csr_svd_contents = export.get_csr_svd(self.soc)
+            csr_svd_contents = export.get_csr_svd(soc, documented_regions=svd_regions)
             write_to_file(os.path.realpath(self.csr_svd), csr_svd_contents)
 
+    def _generate_doc(self, soc, documentation=None):
+        from litex.soc.doc import generate_docs
+        doc_dir = os.path.join(self.output_dir, "doc")
+        generate_docs(soc, doc_dir, documentation=documentation)
+        os.system(f"sphinx-build -M html {doc_dir} {doc_dir}/_build")
+
+    def get_snapshot_filename(self):
+        return os.path.join(self.output_dir, "soc_snapshot.pickle")
+
+    def _load_snapshot(self, key):
+        # Return the SoC snapshot if valid for the inputs (key) and the requested exports.
+        snapshot = SoCSnapshot.read(self.get_snapshot_filename(), key=key)
+        if snapshot is None:
+            return None
+        if (self.csr_svd is not None) and (snapshot.svd_regions is None):
+            return None
+        if self.generate_doc and (snapshot.documentation is None):
+            return None
+        return snapshot
+
     def _check_meson(self):
         # Check Meson install/version.
         meson_present   = (shutil.which("meson") is not None)
@@ -292,6 +361,21 @@ class Builder:
         if with_bios:
             self.add_software_package("bios")
 
+        # Export-only run: Generate the exports from the SoC snapshot when the inputs are unchanged
+        # (the SoC is not finalized/built, so no Verilog Name Space is returned).
+        if self.snapshot:
+            snapshot_key = get_snapshot_key()
+            if not (self.compile_software or self.compile_gateware):
+                snapshot = self._load_snapshot(snapshot_key)
+                if snapshot is not None:
+                    print(colorer("Generating exports from SoC snapshot {}.".format(
+                        self.get_snapshot_filename())))
+                    self._generate_includes(snapshot, snapshot.includes, with_bios=with_bios)
+                    self._generate_csr_map(snapshot, svd_regions=snapshot.svd_regions)
+                    if self.generate_doc:
+                        self._generate_doc(snapshot, documentation=snapshot.documentation)
+                    return None
+
         # Create Gateware directory.
         _create_dir(self.gateware_dir)
 
@@ -317,10 +401,14 @@ class Builder:
         self.soc.finalize()
 
         # Generate Software Includes/Files.
-        self._generate_includes(with_bios=with_bios)
+        includes = self._get_soc_includes(with_bios=with_bios)
+        self._generate_includes(self.soc, includes, with_bios=with_bios)
 
         # Export SoC Mapping.
-        self._generate_csr_map()
+        svd_regions = None
+        if self.csr_svd is not None:
+            svd_regions = export.get_documented_csr_regions(self.soc)
+        self._generate_csr_map(self.soc, svd_regions=svd_regions)
 
         # Compile the BIOS when the SoC uses it.
         if self.soc.cpu_type is not None:
@@ -351,11 +439,19 @@ class Builder:
         self.soc.do_exit(vns=vns)
 
         # Generate SoC Documentation.
+        documentation = None
         if self.generate_doc:
-            from litex.soc.doc import generate_docs
-            doc_dir = os.path.join(self.output_dir, "doc")
-            generate_docs(self.soc, doc_dir)
-            os.system(f"sphinx-build -M html {doc_dir} {doc_dir}/_build")
+            from litex.soc.doc import get_documentation
+            documentation = get_documentation(self.soc)
+            self._generate_doc(self.soc, documentation=documentation)
+
+        # Save SoC Snapshot.
+        if self.snapshot:
+            snapshot = SoCSnapshot(self.soc, snapshot_key,
+                includes      = includes,
+                svd_regions   = svd_regions,
+                documentation = documentation)
+            snapshot.write(self.get_snapshot_filename())
 
         return vns
 
@@ -385,13 +481,18 @@ def builder_args(parser):
     builder_group.add_argument("--no-compile-software", action="store_true", help="Disable Software compilation only.")
     builder_group.add_argument("--no-compile-gateware", action="store_true", help="Disable Gateware compilation only.")
     builder_group.add_argument("--csr-csv",             default=None,        help="Write SoC mapping to the specified CSV file.")
+    builder_group.add_argument("--csr-cache",           action="store_true", help="Write compiled CSR map (csr.csv.cache) along CSV file for host tools.")
     builder_group.add_argument("--csr-json",            default=None,        help="Write SoC mapping to the specified JSON file.")
     builder_group.add_argument("--csr-svd",             default=None,        help="Write SoC mapping to the specified SVD file.")
     builder_group.add_argument("--memory-x",            default=None,        help="Write SoC Memory Regions to the specified Memory-X file.")
+    builder_group.add_argument("--csr-h-fragments",     action="store_true", help="Generate csr.h as per-peripheral fragments (only rewritten when modified).")
     builder_group.add_argument("--doc",                 action="store_true", help="Generate SoC Documentation.")
+    builder_group.add_argument("--snapshot",            action="store_true", help="Save SoC snapshot and use it for export-only runs (--no-compile) with unchanged inputs.")
 
 
 def builder_argdict(args):
+    # Exit without traceback on SoCErrors.
+    sys.excepthook = soc_excepthook
     return {
         "output_dir":       args.output_dir,
         "gateware_dir":     args.gateware_dir,
@@ -401,8 +502,11 @@ def builder_argdict(args):
         "compile_software": (not args.no_compile) and (not args.no_compile_software),
         "compile_gateware": (not args.no_compile) and (not args.no_compile_gateware),
         "csr_csv":          args.csr_csv,
+        "csr_cache":        args.csr_cache,
         "csr_json":         args.csr_json,
         "csr_svd":          args.csr_svd,
         "memory_x":         args.memory_x,
+        "csr_h_fragments":  args.csr_h_fragments,
         "generate_doc":     args.doc,
+        "snapshot":         args.snapshot,
     }
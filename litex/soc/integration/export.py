@@ -199,13 +199,14 @@ def _get_csr_addr(csr_base, addr, with_csr_base_define=True):
         return f"{hex(csr_base + addr)}L"
 
 def _get_rw_functions_c(reg_name, reg_base, nwords, busword, alignment, read_only, csr_base, with_csr_base_define, with_access_functions):
-    r = ""
+    # Streamed (list of strings appended to r), see _get_csr_region_header.
+    r = []
 
     addr_str = f"CSR_{reg_name.upper()}_ADDR"
     size_str = f"CSR_{reg_name.upper()}_SIZE"
-    r += f"#define {addr_str} {_get_csr_addr(csr_base, reg_base, with_csr_base_define)}\n"
+    r.append(f"#define {addr_str} {_get_csr_addr(csr_base, reg_base, with_csr_base_define)}\n")
 
-    r += f"#define {size_str} {nwords}\n"
+    r.append(f"#define {size_str} {nwords}\n")
 
     size = nwords*busword//8
     if size > 8:
@@ -222,94 +223,155 @@ def _get_rw_functions_c(reg_name, reg_base, nwords, busword, alignment, read_onl
 
     stride = alignment//8;
     if with_access_functions:
-        r += f"static inline {ctype} {reg_name}_read(void) {{\n"
+        r.append(f"static inline {ctype} {reg_name}_read(void) {{\n")
         if nwords > 1:
-            r += f"\t{ctype} r = csr_read_simple({_get_csr_addr(csr_base, reg_base, with_csr_base_define)});\n"
+            r.append(f"\t{ctype} r = csr_read_simple({_get_csr_addr(csr_base, reg_base, with_csr_base_define)});\n")
             for sub in range(1, nwords):
-                r += f"\tr <<= {busword};\n"
-                r += f"\tr |= csr_read_simple({_get_csr_addr(csr_base, reg_base+sub*stride, with_csr_base_define)});\n"
-            r += "\treturn r;\n}\n"
+                r.append(f"\tr <<= {busword};\n")
+                r.append(f"\tr |= csr_read_simple({_get_csr_addr(csr_base, reg_base+sub*stride, with_csr_base_define)});\n")
+            r.append("\treturn r;\n}\n")
         else:
-            r += f"\treturn csr_read_simple({_get_csr_addr(csr_base, reg_base, with_csr_base_define)});\n}}\n"
+            r.append(f"\treturn csr_read_simple({_get_csr_addr(csr_base, reg_base, with_csr_base_define)});\n}}\n")
 
         if not read_only:
-            r += f"static inline void {reg_name}_write({ctype} v) {{\n"
+            r.append(f"static inline void {reg_name}_write({ctype} v) {{\n")
             for sub in range(nwords):
                 shift = (nwords-sub-1)*busword
                 if shift:
                     v_shift = "v >> {}".format(shift)
                 else:
                     v_shift = "v"
-                r += f"\tcsr_write_simple({v_shift}, {_get_csr_addr(csr_base, reg_base+sub*stride, with_csr_base_define)});\n"
-            r += "}\n"
+                r.append(f"\tcsr_write_simple({v_shift}, {_get_csr_addr(csr_base, reg_base+sub*stride, with_csr_base_define)});\n")
+            r.append("}\n")
     return r
 
+def _get_csr_field_functions_c(reg_name, field_name, offset, size, read_only):
+    r = []
+    r.append(f"static inline uint32_t {field_name}_extract(uint32_t oldword) {{\n")
+    r.append(f"\tuint32_t mask = ((uint32_t)(1 << {size})-1);\n")
+    r.append(f"\treturn ( (oldword >> {offset}) & mask );\n}}\n")
+    r.append(f"static inline uint32_t {field_name}_read(void) {{\n")
+    r.append(f"\tuint32_t word = {reg_name}_read();\n")
+    r.append(f"\treturn {field_name}_extract(word);\n")
+    r.append("}\n")
+    if not read_only:
+        r.append(f"static inline uint32_t {field_name}_replace(uint32_t oldword, uint32_t plain_value) {{\n")
+        r.append(f"\tuint32_t mask = ((uint32_t)(1 << {size})-1);\n")
+        r.append(f"\treturn (oldword & (~(mask << {offset}))) | (mask & plain_value)<< {offset} ;\n}}\n")
+        r.append(f"static inline void {field_name}_write(uint32_t plain_value) {{\n")
+        r.append(f"\tuint32_t oldword = {reg_name}_read();\n")
+        r.append(f"\tuint32_t newword = {field_name}_replace(oldword, plain_value);\n")
+        r.append(f"\t{reg_name}_write(newword);\n")
+        r.append("}\n")
+    return r
+
+def _get_csr_header_prelude(csr_base, with_csr_base_define=True, with_access_functions=True):
+    r = []
+    if with_access_functions:
+        r.append("#include <stdint.h>\n")
+        r.append("#include <system.h>\n")
+        r.append("#ifndef CSR_ACCESSORS_DEFINED\n")
+        r.append("#include <hw/common.h>\n")
+        r.append("#endif /* ! CSR_ACCESSORS_DEFINED */\n")
+    if with_csr_base_define:
+        r.append("#ifndef CSR_BASE\n")
+        r.append(f"#define CSR_BASE {hex(csr_base)}L\n")
+        r.append("#endif\n")
+    return r
+
+def _get_csr_region_header(name, region, csr_base, alignment, with_csr_base_define=True, with_access_functions=True):
+    # Defines/access functions of a CSR region, yielded per CSR to avoid building the whole header
+    # with string concatenations.
+    origin = region.origin - csr_base
+    yield "\n/* "+name+" */\n"
+    if with_csr_base_define:
+        yield f"#define CSR_{name.upper()}_BASE {_get_csr_addr(csr_base, origin, with_csr_base_define)}\n"
+    if isinstance(region.obj, Memory):
+        return
+    for csr in region.obj:
+        nr = (csr.size + region.busword - 1)//region.busword
+        yield from _get_rw_functions_c(
+            reg_name              = name + "_" + csr.name,
+            reg_base              = origin,
+            nwords                = nr,
+            busword               = region.busword,
+            alignment             = alignment,
+            read_only             = getattr(csr, "read_only", False),
+            csr_base              = csr_base,
+            with_csr_base_define  = with_csr_base_define,
+            with_access_functions = with_access_functions,
+        )
+        origin += alignment//8*nr
+        if hasattr(csr, "fields"):
+            for field in csr.fields.fields:
+                field_define = f"CSR_{name.upper()}_{csr.name.upper()}_{field.name.upper()}"
+                yield f"#define {field_define}_OFFSET {field.offset}\n"
+                yield f"#define {field_define}_SIZE {field.size}\n"
+                if with_access_functions and csr.size <= 32: # FIXME: Implement extract/read functions for csr.size > 32-bit.
+                    reg_name = name + "_" + csr.name.lower()
+                    yield from _get_csr_field_functions_c(
+                        reg_name   = reg_name,
+                        field_name = reg_name + "_" + field.name.lower(),
+                        offset     = field.offset,
+                        size       = field.size,
+                        read_only  = getattr(csr, "read_only", False),
+                    )
 
 def get_csr_header(regions, constants, csr_base=None, with_csr_base_define=True, with_access_functions=True):
     alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
-    r = generated_banner("//")
+    csr_base  = csr_base if csr_base is not None else regions[next(iter(regions))].origin
+    r = [generated_banner("//")]
     if with_access_functions: # FIXME
-        r += "#include <generated/soc.h>\n"
-    r += "#ifndef __GENERATED_CSR_H\n#define __GENERATED_CSR_H\n"
-    if with_access_functions:
-        r += "#include <stdint.h>\n"
-        r += "#include <system.h>\n"
-        r += "#ifndef CSR_ACCESSORS_DEFINED\n"
-        r += "#include <hw/common.h>\n"
-        r += "#endif /* ! CSR_ACCESSORS_DEFINED */\n"
-    csr_base = csr_base if csr_base is not None else regions[next(iter(regions))].origin
-    if with_csr_base_define:
-        r += "#ifndef CSR_BASE\n"
-        r += f"#define CSR_BASE {hex(csr_base)}L\n"
-        r += "#endif\n"
+        r.append("#include <generated/soc.h>\n")
+    r.append("#ifndef __GENERATED_CSR_H\n#define __GENERATED_CSR_H\n")
+    r.extend(_get_csr_header_prelude(csr_base, with_csr_base_define, with_access_functions))
     for name, region in regions.items():
-        origin = region.origin - csr_base
-        r += "\n/* "+name+" */\n"
-        if with_csr_base_define:
-            r += f"#define CSR_{name.upper()}_BASE {_get_csr_addr(csr_base, origin, with_csr_base_define)}\n"
-        if not isinstance(region.obj, Memory):
-            for csr in region.obj:
-                nr = (csr.size + region.busword - 1)//region.busword
-                r += _get_rw_functions_c(
-                    reg_name              = name + "_" + csr.name,
-                    reg_base              = origin,
-                    nwords                = nr,
-                    busword               = region.busword,
-                    alignment             = alignment,
-                    read_only             = getattr(csr, "read_only", False),
-                    csr_base              = csr_base,
-                    with_csr_base_define  = with_csr_base_define,
-                    with_access_functions = with_access_functions,
-                )
-                origin += alignment//8*nr
-                if hasattr(csr, "fields"):
-                    for field in csr.fields.fields:
-                        offset = str(field.offset)
-                        size = str(field.size)
-                        r += f"#define CSR_{name.upper()}_{csr.name.upper()}_{field.name.upper()}_OFFSET {offset}\n"
-                        r += f"#define CSR_{name.upper()}_{csr.name.upper()}_{field.name.upper()}_SIZE {size}\n"
-                        if with_access_functions and csr.size <= 32: # FIXME: Implement extract/read functions for csr.size > 32-bit.
-                            reg_name   = name + "_" + csr.name.lower()
-                            field_name = reg_name + "_" + field.name.lower()
-                            r += "static inline uint32_t " + field_name + "_extract(uint32_t oldword) {\n"
-                            r += "\tuint32_t mask = ((uint32_t)(1 << " + size + ")-1);\n"
-                            r += "\treturn ( (oldword >> " + offset + ") & mask );\n}\n"
-                            r += "static inline uint32_t " + field_name + "_read(void) {\n"
-                            r += "\tuint32_t word = " + reg_name + "_read();\n"
-                            r += "\treturn " + field_name + "_extract(word);\n"
-                            r += "}\n"
-                            if not getattr(csr, "read_only", False):
-                                r += "static inline uint32_t " + field_name + "_replace(uint32_t oldword, uint32_t plain_value) {\n"
-                                r += "\tuint32_t mask = ((uint32_t)(1 << " + size + ")-1);\n"
-                                r += "\treturn (oldword & (~(mask << " + offset + "))) | (mask & plain_value)<< " + offset + " ;\n}\n"
-                                r += "static inline void " + field_name + "_write(uint32_t plain_value) {\n"
-                                r += "\tuint32_t oldword = " + reg_name + "_read();\n"
-                                r += "\tuint32_t newword = " + field_name + "_replace(oldword, plain_value);\n"
-                                r += "\t" + reg_name + "_write(newword);\n"
-                                r += "}\n"
+        r.extend(_get_csr_region_header(name, region, csr_base, alignment, with_csr_base_define, with_access_functions))
+    r.append("\n#endif\n")
+    return "".join(r)
 
-    r += "\n#endif\n"
-    return r
+def get_csr_header_fragments(regions, constants, csr_base=None, with_csr_base_define=True, with_access_functions=True):
+    """Returns the CSR header split in per-peripheral fragments, as a {filename: contents} dict.
+
+    - csr_base.h: Common includes/CSR_BASE define.
+    - csr/<name>.h: Defines/access functions of the <name> peripheral, self-contained.
+    - csr.h: Umbrella header including all the fragments.
+
+    Fragments only change with their peripheral, allowing software to only include the fragments it
+    uses and write_to_file to only rewrite the modified fragments.
+    """
+    alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
+    csr_base  = csr_base if csr_base is not None else regions[next(iter(regions))].origin
+    fragments = {}
+
+    # Common.
+    r = [generated_banner("//")]
+    if with_access_functions: # FIXME
+        r.append("#include <generated/soc.h>\n")
+    r.append("#ifndef __GENERATED_CSR_BASE_H\n#define __GENERATED_CSR_BASE_H\n")
+    r.extend(_get_csr_header_prelude(csr_base, with_csr_base_define, with_access_functions))
+    r.append("\n#endif\n")
+    fragments["csr_base.h"] = "".join(r)
+
+    # Peripherals.
+    for name, region in regions.items():
+        r = [generated_banner("//")]
+        r.append(f"#ifndef __GENERATED_CSR_{name.upper()}_H\n#define __GENERATED_CSR_{name.upper()}_H\n")
+        r.append("#include <generated/csr_base.h>\n")
+        r.extend(_get_csr_region_header(name, region, csr_base, alignment, with_csr_base_define, with_access_functions))
+        r.append("\n#endif\n")
+        fragments[f"csr/{name}.h"] = "".join(r)
+
+    # Umbrella.
+    r = [generated_banner("//")]
+    r.append("#ifndef __GENERATED_CSR_H\n#define __GENERATED_CSR_H\n")
+    r.append("#include <generated/csr_base.h>\n")
+    for name in regions.keys():
+        r.append(f"#include <generated/csr/{name}.h>\n")
+    r.append("\n#endif\n")
+    fragments["csr.h"] = "".join(r)
+
+    return fragments
 
 def get_i2c_header(i2c_init_values):
     i2c_devs, i2c_init = i2c_init_values
@@ -372,6 +434,11 @@ def get_i2c_header(i2c_init_values):
 
 # JSON Export --------------------------------------------------------------------------------------
 
+def _get_csr_type(csr):
+    if isinstance(csr, CSRStatus) and not hasattr(csr, "r"):
+        return "ro"
+    return getattr(csr, "type", "rw") # SoC snapshot CSRs (litex.soc.integration.snapshot).
+
 def get_csr_json(csr_regions={}, constants={}, mem_regions={}):
     alignment = constants.get("CONFIG_CSR_ALIGNMENT", 32)
 
@@ -388,9 +455,7 @@ def get_csr_json(csr_regions={}, constants={}, mem_regions={}):
         if not isinstance(region.obj, Memory):
             for csr in region.obj:
                 _size = (csr.size + region.busword - 1)//region.busword
-                _type = "rw"
-                if isinstance(csr, CSRStatus) and not hasattr(csr, "r"):
-                    _type = "ro"
+                _type = _get_csr_type(csr)
                 d["csr_registers"][name + "_" + csr.name] = {
                     "addr": region_origin,
                     "size": _size,
@@ -435,7 +500,17 @@ def get_csr_csv(csr_regions={}, constants={}, mem_regions={}):
 
 # SVD Export --------------------------------------------------------------------------------------
 
-def get_csr_svd(soc, vendor="litex", name="soc", description=None):
+def get_documented_csr_regions(soc):
+    documented_regions = []
+    for region_name, region in soc.csr.regions.items():
+        documented_regions.append(DocumentedCSRRegion(
+            name           = region_name,
+            region         = region,
+            csr_data_width = soc.csr.data_width)
+        )
+    return documented_regions
+
+def get_csr_svd(soc, vendor="litex", name="soc", description=None, documented_regions=None):
     def sub_csr_bit_range(busword, csr, offset):
         nwords = (csr.size + busword - 1)//busword
         i = nwords - offset - 1
@@ -490,13 +565,8 @@ def get_csr_svd(soc, vendor="litex", name="soc", description=None):
     for csr, irq in sorted(soc.irq.locs.items()):
         interrupts[csr] = irq
 
-    documented_regions = []
-    for region_name, region in soc.csr.regions.items():
-        documented_regions.append(DocumentedCSRRegion(
-            name           = region_name,
-            region         = region,
-            csr_data_width = soc.csr.data_width)
-        )
+    if documented_regions is None:
+        documented_regions = get_documented_csr_regions(soc)
 
     svd = []
     svd.append('<?xml version="1.0" encoding="utf-8"?>')
@@ -0,0 +1,198 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""SoC Snapshot.
+
+Compact and versioned copy of the metadata of a finalized SoC (bus/CSR/IRQ regions, constants, CSR
+descriptions with their fields, documentation) saved by the Builder and keyed on a hash of the
+target's inputs, allowing export-only runs to regenerate csr.json/csv/h, SVD, documentation, etc...
+from it (through the regular export functions) without finalizing/building the SoC again.
+"""
+
+import os
+import sys
+import copy
+import pickle
+import hashlib
+from types import SimpleNamespace
+
+from litex.soc.integration.soc import SoCCSRRegion
+from litex.soc.interconnect.csr import CSRStatus
+
+SNAPSHOT_VERSION = 1
+
+# Snapshot Key -------------------------------------------------------------------------------------
+
+# Builder arguments only selecting the exports/compilations (with the number of values they take),
+# not part of the key.
+snapshot_key_excluded_args = {
+    "--csr-csv"             : 1,
+    "--csr-json"            : 1,
+    "--csr-svd"             : 1,
+    "--memory-x"            : 1,
+    "--csr-h-fragments"     : 0,
+    "--doc"                 : 0,
+    "--no-compile"          : 0,
+    "--no-compile-software" : 0,
+    "--no-compile-gateware" : 0,
+    "--snapshot"            : 0,
+}
+
+def get_snapshot_key(argv=None, modules=None):
+    """Hash of the target's inputs: command line arguments and path/mtime/size of the source files of
+    the imported Python modules (target script included)."""
+    argv    = sys.argv if argv is None else argv
+    modules = sys.modules.values() if modules is None else modules
+    h = hashlib.sha256()
+    h.update(str(SNAPSHOT_VERSION).encode())
+    skip = 0
+    for arg in argv:
+        if skip:
+            skip -= 1
+            continue
+        name = arg.split("=")[0]
+        if name in snapshot_key_excluded_args:
+            skip = snapshot_key_excluded_args[name] if "=" not in arg else 0
+            continue
+        h.update(b"\0" + arg.encode())
+    files = set()
+    for module in list(modules):
+        filename = getattr(module, "__file__", None)
+        if filename is not None:
+            files.add(os.path.abspath(filename))
+    for filename in sorted(files):
+        try:
+            stat = os.stat(filename)
+        except OSError:
+            continue
+        h.update("\0{}:{}:{}".format(filename, stat.st_mtime_ns, stat.st_size).encode())
+    return h.hexdigest()
+
+# Snapshot Elements --------------------------------------------------------------------------------
+
+class SnapshotRegion:
+    def __init__(self, region):
+        self.origin = region.origin
+        self.size   = region.size
+        self.mode   = region.mode
+        self.cached = region.cached
+        self.linker = region.linker
+        self.length = getattr(region, "length", region.size)
+        self.type   = getattr(region, "type", "cached" if region.cached else "io")
+
+
+class SnapshotCSRField:
+    def __init__(self, field):
+        self.name        = field.name
+        self.offset      = field.offset
+        self.size        = field.size
+        self.description = field.description
+
+
+class SnapshotCSR:
+    def __init__(self, csr):
+        self.name      = csr.name
+        self.size      = csr.size
+        self.read_only = getattr(csr, "read_only", False)
+        self.type      = "ro" if isinstance(csr, CSRStatus) and not hasattr(csr, "r") else "rw"
+        if hasattr(csr, "fields"):
+            self.fields = SimpleNamespace(fields=[SnapshotCSRField(f) for f in csr.fields.fields])
+
+
+class SnapshotDocSection:
+    """Rendered ModuleDoc section."""
+    def __init__(self, section):
+        self._title  = section.title()
+        self._body   = section.body()
+        self._format = section.format()
+        self._path   = section.path()
+
+    def title(self):
+        return self._title
+
+    def body(self):
+        return self._body
+
+    def format(self):
+        return self._format
+
+    def path(self):
+        return self._path
+
+
+def _snapshot_documented(documented):
+    # Copy of a DocumentedCSRRegion/DocumentedModule without references to the SoC objects.
+    from litex.soc.doc.csr import DocumentedCSRField
+    documented = copy.copy(documented)
+    if hasattr(documented, "raw_csrs"):
+        documented.raw_csrs = None
+    documented.sections = [SnapshotDocSection(s) for s in documented.sections]
+    csrs = []
+    for csr in getattr(documented, "csrs", []):
+        csr = copy.copy(csr)
+        csr.fields = [f if isinstance(f, DocumentedCSRField) else DocumentedCSRField(f) for f in csr.fields]
+        csrs.append(csr)
+    if hasattr(documented, "csrs"):
+        documented.csrs = csrs
+    return documented
+
+# SoC Snapshot -------------------------------------------------------------------------------------
+
+class SoCSnapshot:
+    """SoC Snapshot
+
+    Provides the attributes of a finalized SoC used by the export functions (constants, mem_regions,
+    csr_regions, csr.regions/data_width, irq.locs, cpu.reset_address) and:
+    - includes: Generated files depending on the SoC objects (CPU, I2C, SDRAM), as rendered.
+    - svd_regions: Documented CSR regions of the SVD export (when provided).
+    - documentation: Documented CSR regions/modules of the documentation (when provided).
+    """
+    def __init__(self, soc, key, includes={}, svd_regions=None, documentation=None):
+        self.version     = SNAPSHOT_VERSION
+        self.key         = key
+        self.constants   = dict(soc.constants)
+        self.mem_regions = {name: SnapshotRegion(region) for name, region in soc.mem_regions.items()}
+        self.csr_regions = {}
+        for name, region in soc.csr_regions.items():
+            # Memories are only exported with their base.
+            csrs = [SnapshotCSR(csr) for csr in region.obj] if isinstance(region.obj, list) else []
+            self.csr_regions[name] = SoCCSRRegion(region.origin, region.busword, csrs)
+        self.csr      = SimpleNamespace(regions=self.csr_regions, data_width=soc.csr.data_width)
+        self.irq      = SimpleNamespace(locs=dict(soc.irq.locs))
+        self.cpu      = SimpleNamespace(reset_address=getattr(soc.cpu, "reset_address", None))
+        self.includes = dict(includes)
+
+        # SVD/Documentation (optional, see export.get_documented_csr_regions/doc.get_documentation).
+        self.svd_regions   = None
+        self.documentation = None
+        if svd_regions is not None:
+            self.svd_regions = [_snapshot_documented(r) for r in svd_regions]
+        if documentation is not None:
+            documented_regions, documented_modules = documentation
+            self.documentation = (
+                [_snapshot_documented(r) for r in documented_regions],
+                [_snapshot_documented(m) for m in documented_modules],
+            )
+
+    def write(self, filename):
+        # Write to a temporary file first so that concurrent readers never see a partial snapshot.
+        tmp = filename + ".{}.tmp".format(os.getpid())
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, filename)
+
+    @staticmethod
+    def read(filename, key=None):
+        """Returns the snapshot from filename, None when missing/invalid/outdated (or key differs)."""
+        try:
+            with open(filename, "rb") as f:
+                snapshot = pickle.load(f)
+        except Exception:
+            return None
+        if not isinstance(snapshot, SoCSnapshot) or getattr(snapshot, "version", None) != SNAPSHOT_VERSION:
+            return None
+        if key is not None and snapshot.key != key:
+            return None
+        return snapshot
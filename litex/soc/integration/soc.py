@@ -9,6 +9,7 @@
 import os
 import sys
 import time
+import bisect
 import logging
 import argparse
 import datetime
@@ -50,8 +51,13 @@ def build_time(with_time=True):
 # SoCError -----------------------------------------------------------------------------------------
 
 class SoCError(Exception):
-    def __init__(self):
-        sys.stderr = None # Error already described, avoid traceback/exception.
+    pass
+
+def soc_excepthook(exc_type, exc_value, exc_traceback, excepthook=sys.excepthook):
+    # Error already described, avoid traceback/exception (installed by the command-line entry points).
+    if issubclass(exc_type, SoCError):
+        return
+    excepthook(exc_type, exc_value, exc_traceback)
 
 # SoCConstant --------------------------------------------------------------------------------------
 
@@ -102,6 +108,62 @@ class SoCRegion:
 
 class SoCIORegion(SoCRegion): pass
 
+# SoCAddressSpace ----------------------------------------------------------------------------------
+
+class SoCAddressSpace:
+    """Non-overlapping regions of an address space, kept sorted by origin.
+
+    Free aligned slots are searched by bisection to the first region of the search range and then
+    walking the free gaps in address order, so the lowest free aligned slot is returned.
+    """
+    def __init__(self):
+        self.origins = []
+        self.ends    = []
+        self.names   = []
+
+    def add(self, name, origin, size):
+        i = bisect.bisect_right(self.origins, origin)
+        self.origins.insert(i, origin)
+        self.ends.insert(i, origin + size)
+        self.names.insert(i, name)
+
+    def find_overlap(self, origin, size):
+        # Returns the name of a region overlapping [origin, origin + size) (None if free).
+        i = bisect.bisect_right(self.ends, origin)
+        if (i < len(self.origins)) and (self.origins[i] < (origin + size)):
+            return self.names[i]
+        return None
+
+    def alloc(self, start, end, size, size_pow2=None):
+        # Returns the lowest origin aligned on size with origin + size < end and [origin, origin +
+        # size_pow2) free (None if not found).
+        size_pow2 = size if size_pow2 is None else size_pow2
+        gap_start = start
+        i         = bisect.bisect_right(self.ends, start)
+        while True:
+            origin = -(-gap_start//size)*size
+            if (origin + size) >= end:
+                return None
+            gap_end = self.origins[i] if i < len(self.origins) else None
+            if (gap_end is None) or ((origin + size_pow2) <= gap_end):
+                return origin
+            gap_start = max(gap_start, self.ends[i])
+            i += 1
+
+    def get_free(self, start, end):
+        # Returns the free gaps (origin, size) of [start, end).
+        free      = []
+        gap_start = start
+        for i in range(bisect.bisect_right(self.ends, start), len(self.origins)):
+            if self.origins[i] >= end:
+                break
+            if self.origins[i] > gap_start:
+                free.append((gap_start, self.origins[i] - gap_start))
+            gap_start = max(gap_start, self.ends[i])
+        if gap_start < end:
+            free.append((gap_start, end - gap_start))
+        return free
+
 # SoCCSRRegion -------------------------------------------------------------------------------------
 
 class SoCCSRRegion:
@@ -164,6 +226,7 @@ class SoCBusHandler(Module):
         self.slaves           = {}
         self.regions          = {}
         self.io_regions       = {}
+        self.address_space    = SoCAddressSpace() # Non-linker regions.
         self.io_regions_check = True
         self.timeout          = timeout
         self.logger.info("{}-bit {} Bus, {}GiB Address Space.".format(
@@ -209,6 +272,7 @@ class SoCBusHandler(Module):
                 allocated = True
                 region    = self.alloc_region(name, region.size, region.cached)
                 self.regions[name] = region
+                self.address_space.add(name, region.origin, region.size_pow2)
             # Else add Region.
             else:
                 if self.io_regions_check:
@@ -228,17 +292,21 @@ class SoCBusHandler(Module):
                                 str(region)))
                             self.logger.error(self)
                             raise SoCError()
+                # Check for overlap with others regions.
+                overlap = None
+                if not region.linker:
+                    overlap = self.address_space.find_overlap(region.origin, region.size_pow2)
                 self.regions[name] = region
-                # Check for overlap with others IO regions.
-                overlap = self.check_regions_overlap(self.regions)
                 if overlap is not None:
                     self.logger.error("Region {} between {} and {}:".format(
                         colorer("overlap", color="red"),
-                        colorer(overlap[0]),
-                        colorer(overlap[1])))
-                    self.logger.error(str(self.regions[overlap[0]]))
-                    self.logger.error(str(self.regions[overlap[1]]))
+                        colorer(overlap),
+                        colorer(name)))
+                    self.logger.error(str(self.regions[overlap]))
+                    self.logger.error(str(self.regions[name]))
                     raise SoCError()
+                if not region.linker:
+                    self.address_space.add(name, region.origin, region.size_pow2)
             self.logger.info("{} Region {} at {}.".format(
                 colorer(name, color="underline"),
                 colorer("allocated" if allocated else "added", color="cyan" if allocated else "green"),
@@ -258,48 +326,55 @@ class SoCBusHandler(Module):
         else:
             search_regions = {"main": SoCRegion(origin=0x00000000, size=2**self.address_width-1)}
 
-        # Iterate on Search_Regions to find a Candidate.
+        # Iterate on Search_Regions to find a Candidate (lowest aligned free slot).
         for _, search_region in search_regions.items():
-            origin = search_region.origin
-            while (origin + size) < (search_region.origin + search_region.size_pow2):
-                # Align Origin on Size.
-                if (origin%size):
-                    origin += (origin - origin%size)
-                    continue
-                # Create a Candidate.
-                candidate = SoCRegion(origin=origin, size=size, cached=cached)
-                overlap   = False
-                # Check Candidate does not overlap with allocated existing regions.
-                for _, allocated in self.regions.items():
-                    if self.check_regions_overlap({"0": allocated, "1": candidate}) is not None:
-                        origin += size
-                        overlap = True
-                        break
-                if not overlap:
-                    # If no overlap, the Candidate is selected.
-                    return candidate
+            origin = self.address_space.alloc(
+                start     = search_region.origin,
+                end       = search_region.origin + search_region.size_pow2,
+                size      = size,
+                size_pow2 = 2**log2_int(size, False))
+            if origin is not None:
+                return SoCRegion(origin=origin, size=size, cached=cached)
 
         self.logger.error("Not enough Address Space to allocate Region.")
         raise SoCError()
 
     def check_regions_overlap(self, regions, check_linker=False):
-        i = 0
-        while i < len(regions):
-            n0 =  list(regions.keys())[i]
-            r0 = regions[n0]
-            for n1 in list(regions.keys())[i+1:]:
-                r1 = regions[n1]
-                if r0.linker or r1.linker:
-                    if not check_linker:
-                        continue
-                if r0.origin >= (r1.origin + r1.size_pow2):
-                    continue
-                if r1.origin >= (r0.origin + r0.size_pow2):
-                    continue
-                return (n0, n1)
-            i += 1
+        # Sort Regions by Origin and check each one against the furthest reaching previous one.
+        names = [n for n, r in regions.items() if check_linker or not r.linker]
+        names = sorted(names, key=lambda n: regions[n].origin)
+        last  = None
+        for n in names:
+            r = regions[n]
+            if (last is not None) and (r.origin < (regions[last].origin + regions[last].size_pow2)):
+                return (last, n)
+            if (last is None) or ((r.origin + r.size_pow2) > (regions[last].origin + regions[last].size_pow2)):
+                last = n
         return None
 
+    def get_free_regions(self, cached=True):
+        """Returns the free (origin, size) gaps of the cached (outside IO regions) or IO space."""
+        io_regions = sorted(self.io_regions.values(), key=lambda r: r.origin)
+        free       = []
+        if cached:
+            start = 0
+            for r in io_regions + [None]:
+                end = 2**self.address_width if r is None else r.origin
+                if end > start:
+                    free += self.address_space.get_free(start, end)
+                if r is not None:
+                    start = max(start, r.origin + r.size_pow2)
+        else:
+            for r in io_regions:
+                free += self.address_space.get_free(r.origin, r.origin + r.size_pow2)
+        return free
+
+    def get_fragmentation(self, cached=True):
+        """Returns the fragmentation (1 - largest free gap/total free space) of the address space."""
+        free  = [size for _, size in self.get_free_regions(cached)]
+        total = sum(free)
+        return (1 - max(free)/total) if total else 0
+
     def check_region_is_in(self, region, container):
         is_in = True
         if not (region.origin >= container.origin):
@@ -452,6 +527,16 @@ class SoCBusHandler(Module):
         regions = {k: v for k, v in sorted(self.regions.items(), key=lambda item: item[1].origin)}
         for name, region in regions.items():
            r += colorer(name, color="underline") + " "*(20-len(name)) + ": " + str(region) + "\n"
+        if len(self.regions.keys()):
+            r += "Bus Free Space:\n"
+            for name, cached in [("Cached", True), ("IO", False)]:
+                free = self.get_free_regions(cached)
+                r += colorer(name, color="underline") + " "*(20-len(name)) + ": "
+                r += "Size: {}, Gaps: {}, Largest: {}, Fragmentation: {}\n".format(
+                    colorer("0x{:08x}".format(sum(size for _, size in free))),
+                    colorer(len(free)),
+                    colorer("0x{:08x}".format(max([size for _, size in free], default=0))),
+                    colorer("{:.1f}%".format(100*self.get_fragmentation(cached))))
         r += "Bus Masters: ({})\n".format(len(self.masters.keys())) if len(self.masters.keys()) else ""
         for name in self.masters.keys():
            r += "- {}\n".format(colorer(name, color="underline"))
@@ -538,9 +623,11 @@ class SoCCSRHandler(SoCLocHandler):
     supported_alignment     = [32]
     supported_paging        = [0x800*2**i for i in range(4)]
     supported_ordering      = ["big", "little"]
+    supported_interconnect  = ["shared", "hierarchical"]
 
     # Creation -------------------------------------------------------------------------------------
-    def __init__(self, data_width=32, address_width=14, alignment=32, paging=0x800, ordering="big", reserved_csrs={}):
+    def __init__(self, data_width=32, address_width=14, alignment=32, paging=0x800, ordering="big",
+        interconnect="shared", bridge_pipelined=False, reserved_csrs={}):
         SoCLocHandler.__init__(self, "CSR", n_locs=alignment//8*(2**address_width)//paging)
         self.logger = logging.getLogger("SoCCSRHandler")
         self.logger.info("Creating CSR Handler...")
@@ -591,20 +678,32 @@ class SoCCSRHandler(SoCLocHandler):
                 colorer(", ".join("{}".format(x) for x in self.supported_ordering))))
             raise SoCError()
 
+        # Check CSR Interconnect.
+        if interconnect not in self.supported_interconnect:
+            self.logger.error("Unsupported {} {}, supported are: {:s}".format(
+                colorer("Interconnect", color="red"),
+                colorer(interconnect),
+                colorer(", ".join(self.supported_interconnect))))
+            raise SoCError()
+
         # Create CSR Handler.
         self.data_width    = data_width
         self.address_width = address_width
         self.alignment     = alignment
         self.paging        = paging
         self.ordering      = ordering
+        self.interconnect  = interconnect
         self.masters       = {}
         self.regions       = {}
-        self.logger.info("{}-bit CSR Bus, {}-bit Aligned, {}KiB Address Space, {}B Paging, {} Ordering (Up to {} Locations).".format(
+        # Hierarchical Interconnect has a longer read latency, only supported by pipelined bridges.
+        self.bridge_pipelined = bridge_pipelined or (interconnect == "hierarchical")
+        self.logger.info("{}-bit CSR Bus, {}-bit Aligned, {}KiB Address Space, {}B Paging, {} Ordering, {} Interconnect (Up to {} Locations).".format(
             colorer(self.data_width),
             colorer(self.alignment),
             colorer(2**self.address_width/2**10),
             colorer(self.paging),
             colorer(self.ordering),
+            colorer(self.interconnect),
             colorer(self.n_locs)))
 
         # Add reserved CSRs.
@@ -614,6 +713,13 @@ class SoCCSRHandler(SoCLocHandler):
 
         self.logger.info("CSR Handler {}.".format(colorer("created", color="green")))
 
+    # Read Latency ---------------------------------------------------------------------------------
+    def get_read_latency(self):
+        return {
+            "shared"       : 1,
+            "hierarchical" : csr_bus.InterconnectHierarchical.get_read_latency(),
+        }[self.interconnect]
+
     # Add Master -----------------------------------------------------------------------------------
     def add_master(self, name=None, master=None):
         if name is None:
@@ -760,6 +866,8 @@ class SoC(Module):
         csr_address_width    = 14,
         csr_paging           = 0x800,
         csr_ordering         = "big",
+        csr_interconnect     = "shared",
+        csr_bridge_pipelined = False,
         csr_reserved_csrs    = {},
 
         irq_n_irqs           = 32,
@@ -798,12 +906,14 @@ class SoC(Module):
 
         # SoC Bus Handler --------------------------------------------------------------------------
         self.submodules.csr = SoCCSRHandler(
-            data_width    = csr_data_width,
-            address_width = csr_address_width,
-            alignment     = 32,
-            paging        = csr_paging,
-            ordering      = csr_ordering,
-            reserved_csrs = csr_reserved_csrs,
+            data_width       = csr_data_width,
+            address_width    = csr_address_width,
+            alignment        = 32,
+            paging           = csr_paging,
+            ordering         = csr_ordering,
+            interconnect     = csr_interconnect,
+            bridge_pipelined = csr_bridge_pipelined,
+            reserved_csrs    = csr_reserved_csrs,
         )
 
         # SoC IRQ Handler --------------------------------------------------------------------------
@@ -909,7 +1019,9 @@ class SoC(Module):
                 colorer(f"0x{4*len(contents):x}")))
             getattr(self, name).mem.depth = len(contents)
 
-    def add_csr_bridge(self, name="csr", origin=None, register=False):
+    def add_csr_bridge(self, name="csr", origin=None, register=False, pipelined=None):
+        if pipelined is None:
+            pipelined = self.csr.bridge_pipelined
         csr_bridge_cls = {
             "wishbone": wishbone.Wishbone2CSR,
             "axi-lite": axi.AXILite2CSR,
@@ -917,11 +1029,21 @@ class SoC(Module):
         }[self.bus.standard]
         csr_bridge_name = name + "_bridge"
         self.check_if_exists(csr_bridge_name)
+        csr_bridge_kwargs = {}
+        if pipelined:
+            if csr_bridge_cls is not wishbone.Wishbone2CSR:
+                self.logger.error("{} CSR Bridge only supported with {} Bus.".format(
+                    colorer("Pipelined", color="red"),
+                    colorer("wishbone")))
+                raise SoCError()
+            csr_bridge_kwargs["pipelined"]    = True
+            csr_bridge_kwargs["read_latency"] = self.csr.get_read_latency()
         csr_bridge = csr_bridge_cls(
             bus_csr = csr_bus.Interface(
                 address_width = self.csr.address_width,
                 data_width    = self.csr.data_width),
-            register = register)
+            register = register,
+            **csr_bridge_kwargs)
         self.logger.info("CSR Bridge {} {}.".format(
             colorer(name, color="underline"),
             colorer("added", color="green")))
@@ -941,11 +1063,15 @@ class SoC(Module):
 
     def add_cpu(self, name="vexriscv", variant="standard", reset_address=None, cfu=None):
         # Check that CPU is supported.
-        if name not in cpu.CPUS.keys():
+        if cpu.CPUS.get(name) is None:
             supported_cpus = []
             cpu_name_length = max([len(cpu_name) for cpu_name in cpu.CPUS.keys()])
             for cpu_name in sorted(cpu.CPUS.keys()):
-                cpu_cls  = cpu.CPUS[cpu_name]
+                # Skip directories listed as CPUs but without CPU class/importable module.
+                try:
+                    cpu_cls = cpu.CPUS[cpu_name]
+                except (KeyError, ImportError):
+                    continue
                 cpu_desc = f"{cpu_cls.family}\t/ {cpu_cls.category}"
                 supported_cpus += [f"- {cpu_name}{' '*(cpu_name_length - len(cpu_name))} ({cpu_desc})"]
             self.logger.error("{} CPU {}, supported are: \n{}".format(
@@ -1128,7 +1254,9 @@ class SoC(Module):
                 self.submodules.bus_interconnect = interconnect_cls(
                     masters        = list(self.bus.masters.values()),
                     slaves         = [(self.bus.regions[n].decoder(self.bus), s) for n, s in self.bus.slaves.items()],
-                    register       = True,
+                    # Registered decode is only applied to Wishbone: on AXI/AXI-Lite it would add
+                    # a cycle of latency to every request and is left to direct instantiations.
+                    register       = (self.bus.standard == "wishbone"),
                     timeout_cycles = self.bus.timeout)
                 if hasattr(self, "ctrl") and self.bus.timeout is not None:
                     if hasattr(self.ctrl, "bus_error") and hasattr(self.bus_interconnect, "timeout"):
@@ -1174,7 +1302,11 @@ class SoC(Module):
             ordering           = self.csr.ordering,
             soc_bus_data_width = self.bus.data_width)
         if len(self.csr.masters):
-            self.submodules.csr_interconnect = csr_bus.InterconnectShared(
+            csr_interconnect_cls = {
+                "shared"       : csr_bus.InterconnectShared,
+                "hierarchical" : csr_bus.InterconnectHierarchical,
+            }[self.csr.interconnect]
+            self.submodules.csr_interconnect = csr_interconnect_cls(
                 masters = list(self.csr.masters.values()),
                 slaves  = self.csr_bankarray.get_buses())
 
@@ -1370,7 +1502,9 @@ class LiteXSoC(SoC):
             self.add_constant("UART_POLLING")
 
     # Add UARTbone ---------------------------------------------------------------------------------
-    def add_uartbone(self, name="serial", clk_freq=None, baudrate=115200, cd="sys"):
+    def add_uartbone(self, name="serial", clk_freq=None, baudrate=115200, cd="sys", with_poll_rmw=False,
+        length_width   = 8,
+        prefetch_depth = 0):
         # Imports.
         from litex.soc.cores import uart
 
@@ -1379,11 +1513,18 @@ class LiteXSoC(SoC):
             clk_freq = self.sys_clk_freq
         self.check_if_exists("uartbone")
         self.submodules.uartbone_phy = uart.UARTPHY(self.platform.request(name), clk_freq, baudrate)
-        self.submodules.uartbone = uart.UARTBone(phy=self.uartbone_phy, clk_freq=clk_freq, cd=cd)
+        self.submodules.uartbone = uart.UARTBone(phy=self.uartbone_phy, clk_freq=clk_freq, cd=cd,
+            with_poll_rmw  = with_poll_rmw,
+            length_width   = length_width,
+            prefetch_depth = prefetch_depth)
         self.bus.add_master(name="uartbone", master=self.uartbone.wishbone)
+        if with_poll_rmw:
+            self.add_constant("UARTBONE_POLL_RMW")
+        if length_width != 8:
+            self.add_constant("UARTBONE_LENGTH_WIDTH", length_width)
 
     # Add JTAGbone ---------------------------------------------------------------------------------
-    def add_jtagbone(self, name="jtagbone", chain=1):
+    def add_jtagbone(self, name="jtagbone", chain=1, with_poll_rmw=False, length_width=8, prefetch_depth=0):
         # Imports.
         from litex.soc.cores import uart
         from litex.soc.cores.jtag import JTAGPHY
@@ -1391,10 +1532,17 @@ class LiteXSoC(SoC):
         # Core.
         self.check_if_exists(name)
         jtagbone_phy = JTAGPHY(device=self.platform.device, chain=chain, platform=self.platform)
-        jtagbone = uart.UARTBone(phy=jtagbone_phy, clk_freq=self.sys_clk_freq)
+        jtagbone = uart.UARTBone(phy=jtagbone_phy, clk_freq=self.sys_clk_freq,
+            with_poll_rmw  = with_poll_rmw,
+            length_width   = length_width,
+            prefetch_depth = prefetch_depth)
         setattr(self.submodules, f"{name}_phy", jtagbone_phy)
         setattr(self.submodules,          name, jtagbone)
         self.bus.add_master(name=name, master=jtagbone.wishbone)
+        if with_poll_rmw:
+            self.add_constant(f"{name}_POLL_RMW")
+        if length_width != 8:
+            self.add_constant(f"{name}_LENGTH_WIDTH", length_width)
 
     # Add SDRAM ------------------------------------------------------------------------------------
     def add_sdram(self, name="sdram", phy=None, module=None, origin=None, size=None,
@@ -1404,6 +1552,8 @@ class LiteXSoC(SoC):
         l2_cache_min_data_width = 128,
         l2_cache_reverse        = False,
         l2_cache_full_memory_we = True,
+        l2_cache_ways           = 1,
+        l2_cache_policy         = "lru",
         **kwargs):
 
         # Imports.
@@ -1552,16 +1702,27 @@ class LiteXSoC(SoC):
                 l2_cache_size = max(l2_cache_size, int(2*port.data_width/8)) # Use minimal size if lower
                 l2_cache_size = 2**int(log2(l2_cache_size))                  # Round to nearest power of 2
                 l2_cache_data_width = max(port.data_width, l2_cache_min_data_width)
-                l2_cache = wishbone.Cache(
-                    cachesize = l2_cache_size//4,
-                    master    = wb_sdram,
-                    slave     = wishbone.Interface(l2_cache_data_width),
-                    reverse   = l2_cache_reverse)
+                if l2_cache_ways > 1:
+                    l2_cache = wishbone.SetAssociativeCache(
+                        cachesize = l2_cache_size//4,
+                        master    = wb_sdram,
+                        slave     = wishbone.Interface(l2_cache_data_width),
+                        ways      = l2_cache_ways,
+                        policy    = l2_cache_policy,
+                        reverse   = l2_cache_reverse)
+                else:
+                    l2_cache = wishbone.Cache(
+                        cachesize = l2_cache_size//4,
+                        master    = wb_sdram,
+                        slave     = wishbone.Interface(l2_cache_data_width),
+                        reverse   = l2_cache_reverse)
                 if l2_cache_full_memory_we:
                     l2_cache = FullMemoryWE()(l2_cache)
                 self.submodules.l2_cache = l2_cache
                 litedram_wb = self.l2_cache.slave
                 self.add_config("L2_SIZE", l2_cache_size)
+                if l2_cache_ways > 1:
+                    self.add_config("L2_WAYS", l2_cache_ways)
             else:
                 litedram_wb = wishbone.Interface(port.data_width)
                 self.submodules += wishbone.Converter(wb_sdram, litedram_wb)
@@ -1690,7 +1851,7 @@ class LiteXSoC(SoC):
                 self.platform.add_false_path_constraints(self.crg.cd_sys.clk, eth_rx_clk, eth_tx_clk)
 
     # Add SPI Flash --------------------------------------------------------------------------------
-    def add_spi_flash(self, name="spiflash", mode="4x", clk_freq=None, module=None, phy=None, rate="1:1", **kwargs):
+    def add_spi_flash(self, name="spiflash", mode="4x", clk_freq=None, module=None, phy=None, rate="1:1", with_dma=False, **kwargs):
         # Imports.
         from litespi import LiteSPI
         from litespi.phy.generic import LiteSPIPHY
@@ -1715,6 +1876,10 @@ class LiteXSoC(SoC):
         spiflash_region = SoCRegion(origin=self.mem_map.get(name, None), size=module.total_size)
         self.bus.add_slave(name=name, slave=spiflash_core.bus, region=spiflash_region)
 
+        # DMA (Optional, Flash to RAM copies).
+        if with_dma:
+            self.add_spi_flash_dma(name=name)
+
         # Constants.
         self.add_constant("SPIFLASH_PHY_FREQUENCY", clk_freq)
         self.add_constant("SPIFLASH_MODULE_NAME", module.name.upper())
@@ -1725,6 +1890,34 @@ class LiteXSoC(SoC):
         if SpiNorFlashOpCodes.READ_4_4_4 in module.supported_opcodes:
             self.add_constant("SPIFLASH_MODULE_QPI_CAPABLE")
 
+    # Add SPI Flash DMA ----------------------------------------------------------------------------
+    def add_spi_flash_dma(self, name="spiflash", fifo_depth=16):
+        # Imports.
+        from litex.soc.cores.dma import WishboneDMAReader, WishboneDMAWriter
+
+        # DMA Reader (from the memory-mapped SPI Flash).
+        self.check_if_exists(name + "_dma_reader")
+        reader_bus = wishbone.Interface(data_width=self.bus.data_width, adr_width=self.bus.address_width)
+        dma_reader = WishboneDMAReader(reader_bus, with_csr=True)
+        setattr(self.submodules, name + "_dma_reader", dma_reader)
+        self.bus.add_master(name=name + "_dma_reader", master=reader_bus)
+
+        # DMA Writer (to RAM).
+        self.check_if_exists(name + "_dma_writer")
+        writer_bus = wishbone.Interface(data_width=self.bus.data_width, adr_width=self.bus.address_width)
+        dma_writer = WishboneDMAWriter(writer_bus, with_csr=True)
+        setattr(self.submodules, name + "_dma_writer", dma_writer)
+        dma_bus = self.bus if not hasattr(self, "dma_bus") else self.dma_bus
+        dma_bus.add_master(name=name + "_dma_writer", master=writer_bus)
+
+        # FIFO (Decouples Flash reads from RAM writes).
+        dma_fifo = stream.SyncFIFO([("data", self.bus.data_width)], depth=fifo_depth)
+        setattr(self.submodules, name + "_dma_fifo", dma_fifo)
+        self.comb += [
+            dma_reader.source.connect(dma_fifo.sink),
+            dma_fifo.source.connect(dma_writer.sink),
+        ]
+
     # Add SPI SDCard -------------------------------------------------------------------------------
     def add_spi_sdcard(self, name="spisdcard", spi_clk_freq=400e3, with_tristate=False, software_debug=False):
         # Imports.
@@ -2019,7 +2212,10 @@ class LiteXSoC(SoC):
         self.comb += vt.source.connect(phy if isinstance(phy, stream.Endpoint) else phy.sink)
 
     # Add Video Framebuffer ------------------------------------------------------------------------
-    def add_video_framebuffer(self, name="video_framebuffer", phy=None, timings="800x600@60Hz", clock_domain="sys", format="rgb888"):
+    def add_video_framebuffer(self, name="video_framebuffer", phy=None, timings="800x600@60Hz", clock_domain="sys", format="rgb888",
+        hscale             = 1,
+        vscale             = 1,
+        with_double_buffer = False):
         # Imports.
         from litex.soc.cores.video import VideoTimingGenerator, VideoFrameBuffer
 
@@ -2040,6 +2236,9 @@ class LiteXSoC(SoC):
             format = format,
             clock_domain          = clock_domain,
             clock_faster_than_sys = vtg.video_timings["pix_clk"] >= self.sys_clk_freq,
+            hscale                = hscale,
+            vscale                = vscale,
+            with_double_buffer    = with_double_buffer,
         )
         setattr(self.submodules, name, vfb)
 
@@ -2051,8 +2250,8 @@ class LiteXSoC(SoC):
 
         # Constants.
         self.add_constant("VIDEO_FRAMEBUFFER_BASE", base)
-        self.add_constant("VIDEO_FRAMEBUFFER_HRES", hres)
-        self.add_constant("VIDEO_FRAMEBUFFER_VRES", vres)
+        self.add_constant("VIDEO_FRAMEBUFFER_HRES", vfb.fb_hres)
+        self.add_constant("VIDEO_FRAMEBUFFER_VRES", vfb.fb_vres)
         self.add_constant("VIDEO_FRAMEBUFFER_DEPTH", vfb.depth)
 
 # LiteXSoCArgumentParser ---------------------------------------------------------------------------
@@ -2063,14 +2262,19 @@ class LiteXSoCArgumentParser(argparse.ArgumentParser):
         # FIXME: Use 2 stages parser?
 
         def get_selected_cpu_name():
-            for name, cpu_cls in cpu.CPUS.items():
+            # Only look up the selected CPU: CPU modules are imported on first access.
+            for name in cpu.CPUS.keys():
+                # Note: .get() returns None for directories listed as CPUs but without CPU class.
                 if f"--cpu-type={name}" in sys.argv:
-                    return cpu_cls
+                    return cpu.CPUS.get(name)
                 if f"--cpu-type" in sys.argv:
                     if name in sys.argv:
-                        return cpu_cls
+                        return cpu.CPUS.get(name)
             return None
 
+        # Exit without traceback on SoCErrors.
+        sys.excepthook = soc_excepthook
+
         # Intercept selected CPU to fill arguments.
         cpu_cls = get_selected_cpu_name()
         if cpu_cls is not None and hasattr(cpu_cls, "args_fill"):
@@ -94,6 +94,8 @@ class SoCCore(LiteXSoC):
         csr_address_width        = 14,
         csr_paging               = 0x800,
         csr_ordering             = "big",
+        csr_interconnect         = "shared",
+        csr_bridge_pipelined     = False,
 
         # Interrupt parameters
         irq_n_irqs               = 32,
@@ -132,6 +134,8 @@ class SoCCore(LiteXSoC):
             csr_address_width    = csr_address_width,
             csr_paging           = csr_paging,
             csr_ordering         = csr_ordering,
+            csr_interconnect     = csr_interconnect,
+            csr_bridge_pipelined = csr_bridge_pipelined,
             csr_reserved_csrs    = self.csr_map,
 
             irq_n_irqs           = irq_n_irqs,
@@ -332,6 +336,8 @@ def soc_core_args(parser):
     soc_group.add_argument("--csr-address-width", default=14,    type=auto_int, help="CSR bus address-width.")
     soc_group.add_argument("--csr-paging",        default=0x800, type=auto_int, help="CSR bus paging.")
     soc_group.add_argument("--csr-ordering",      default="big",                help="CSR registers ordering (big or little).")
+    soc_group.add_argument("--csr-interconnect",  default="shared",             help="CSR interconnect: shared (default) or hierarchical (registered, for large designs).")
+    soc_group.add_argument("--csr-bridge-pipelined", action="store_true",       help="Use pipelined CSR bridge (posted writes, back-to-back accesses).")
 
     # Identifier parameters
     soc_group.add_argument("--ident",             default=None,  type=str, help="SoC identifier.")
@@ -348,13 +354,15 @@ def soc_core_args(parser):
     soc_group.add_argument("--timer-uptime",    action="store_true", help="Add an uptime capability to Timer.")
 
     # L2 Cache
-    soc_group.add_argument("--l2-size", default=8192, type=auto_int, help="L2 cache size.")
+    soc_group.add_argument("--l2-size",   default=8192,  type=auto_int, help="L2 cache size.")
+    soc_group.add_argument("--l2-ways",   default=1,     type=auto_int, help="L2 cache ways (1: Direct-Mapped).")
+    soc_group.add_argument("--l2-policy", default="lru", type=str,      choices=["lru", "plru", "random"], help="L2 cache replacement policy.")
 
 def soc_core_argdict(args):
     r = dict()
     # Iterate on all arguments.
     soc_args  = inspect.getfullargspec(SoCCore.__init__).args
-    full_args = soc_args + ["l2_size"]
+    full_args = soc_args + ["l2_size", "l2_ways", "l2_policy"]
     for a in full_args:
         # Exclude specific arguments.
         if a in ["self", "platform"]:
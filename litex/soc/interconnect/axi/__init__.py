@@ -13,3 +13,6 @@ from litex.soc.interconnect.axi.axi_lite_to_wishbone import *
 from litex.soc.interconnect.axi.axi_full import *
 from litex.soc.interconnect.axi.axi_full_to_axi_lite import *
 from litex.soc.interconnect.axi.axi_full_to_wishbone import *
+
+# Simulation.
+from litex.soc.interconnect.axi.axi_bfm import *
@@ -0,0 +1,387 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+"""AXI4-Full/Lite Bus Functional Models (simulation)
+
+Master BFM (traffic generator) issuing multiple outstanding reads/writes (with IDs on AXI-Full) and
+Memory Slave BFM responding to them, both with valid/ready back-pressure profiles, and reporting
+bandwidth and latency percentiles. Works on AXIInterface and AXILiteInterface, to be added to the
+generators of run_simulation:
+
+    master = AXIMasterBFM(dut.master, axi_random_traffic(n=64, base=0, size=0x1000))
+    slave  = AXIMemorySlaveBFM(dut.slave, latency=4)
+    run_simulation(dut, master.generators() + slave.generators())
+    print(master.report())
+"""
+
+import math
+import random
+
+from migen import *
+
+from litex.soc.interconnect.axi.axi_common import *
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def _is_axi_full(bus):
+    return hasattr(bus.ar, "len")
+
+def _percentile(values, p):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[max(0, math.ceil(p/100*len(values)) - 1)]
+
+def _latency_stats(latencies):
+    return {
+        "count" : len(latencies),
+        "p50"   : _percentile(latencies, 50),
+        "p90"   : _percentile(latencies, 90),
+        "p99"   : _percentile(latencies, 99),
+        "max"   : max(latencies) if latencies else None,
+    }
+
+# AXI Transaction ----------------------------------------------------------------------------------
+
+class AXITransaction:
+    """AXI Transaction: write (data: list of len + 1 beats) or read (rdata filled by the BFM)."""
+    def __init__(self, write, addr, data=None, len=0, id=0):
+        self.write    = write
+        self.addr     = addr
+        self.data     = data if data is not None else [0]*(len + 1)
+        self.len      = len
+        self.id       = id
+        self.rdata    = []
+        self.resp     = None
+        self.issue    = None
+        self.complete = None
+
+    @property
+    def latency(self):
+        if self.complete is None:
+            return None
+        return self.complete - self.issue
+
+
+def axi_random_traffic(n, base, size, data_width=32, read_ratio=0.5, max_len=0, id_count=1,
+    sequential = False,
+    seed       = 42):
+    """Generates n transactions in [base, base + size) with random (or sequential) addresses."""
+    prng       = random.Random(seed)
+    word_bytes = data_width//8
+    addr       = base
+    r          = []
+    for i in range(n):
+        length = prng.randrange(max_len + 1)
+        nbytes = (length + 1)*word_bytes
+        assert nbytes <= size
+        if sequential:
+            if addr + nbytes > base + size:
+                addr = base
+        else:
+            addr = base + prng.randrange((size - nbytes)//word_bytes + 1)*word_bytes
+        write = prng.randrange(1000) >= 1000*read_ratio
+        data  = [prng.randrange(2**data_width) for _ in range(length + 1)] if write else None
+        r.append(AXITransaction(write, addr, data=data, len=length, id=prng.randrange(id_count)))
+        addr += nbytes
+    return r
+
+# AXI Master BFM -----------------------------------------------------------------------------------
+
+class AXIMasterBFM:
+    """AXI/AXI-Lite Master BFM
+
+    Issues transactions (in order per channel) with up to max_outstanding writes and reads in
+    flight; responses are matched to transactions by ID (in order per ID). valid_rand/ready_rand
+    (0-100) set the probability of inserting valid/ready bubbles.
+    """
+    def __init__(self, bus, transactions, max_outstanding=4, valid_rand=0, ready_rand=0, seed=42,
+        name="master"):
+        self.bus             = bus
+        self.name            = name
+        self.full            = _is_axi_full(bus)
+        self.transactions    = transactions
+        self.writes          = [t for t in transactions if t.write]
+        self.reads           = [t for t in transactions if not t.write]
+        self.max_outstanding = max_outstanding
+        self.valid_rand      = valid_rand
+        self.ready_rand      = ready_rand
+        self.prng            = random.Random(seed)
+        self.word_bytes      = len(bus.w.data)//8
+        self.cycle           = 0
+
+        self._wr_outstanding = 0
+        self._rd_outstanding = 0
+        self._w_queue        = []
+        self._b_pending      = {}
+        self._r_pending      = {}
+
+    def generators(self):
+        return [self._timer(), self._aw(), self._w(), self._b(), self._ar(), self._r()]
+
+    @passive
+    def _timer(self):
+        while True:
+            self.cycle += 1
+            yield
+
+    def _bubble(self, rand):
+        return self.prng.randrange(100) < rand
+
+    def _ax(self, ax, transactions, pending, queue=None):
+        for t in transactions:
+            while (self._outstanding(ax) >= self.max_outstanding) or self._bubble(self.valid_rand):
+                yield ax.valid.eq(0)
+                yield
+            yield ax.valid.eq(1)
+            yield ax.addr.eq(t.addr)
+            if self.full:
+                yield ax.len.eq(t.len)
+                yield ax.size.eq(log2_int(self.word_bytes))
+                yield ax.burst.eq(0b01) # INCR.
+                yield ax.id.eq(t.id)
+            t.issue = self.cycle
+            # Data/responses tracking starts with the request (W may be required before AW ready).
+            pending.setdefault(t.id, []).append(t)
+            if queue is not None:
+                queue.append(t)
+            self._add_outstanding(ax, 1)
+            yield
+            while not (yield ax.ready):
+                yield
+        yield ax.valid.eq(0)
+
+    def _outstanding(self, ax):
+        return self._wr_outstanding if ax is self.bus.aw else self._rd_outstanding
+
+    def _add_outstanding(self, ax, n):
+        if ax is self.bus.aw:
+            self._wr_outstanding += n
+        else:
+            self._rd_outstanding += n
+
+    def _aw(self):
+        yield from self._ax(self.bus.aw, self.writes, self._b_pending, self._w_queue)
+
+    def _ar(self):
+        yield from self._ax(self.bus.ar, self.reads, self._r_pending)
+
+    def _w(self):
+        w = self.bus.w
+        for i in range(len(self.writes)):
+            while not self._w_queue:
+                yield
+            t = self._w_queue.pop(0)
+            for n, data in enumerate(t.data):
+                while self._bubble(self.valid_rand):
+                    yield w.valid.eq(0)
+                    yield
+                yield w.valid.eq(1)
+                yield w.data.eq(data)
+                yield w.strb.eq(2**len(w.strb) - 1)
+                if self.full:
+                    yield w.last.eq(n == t.len)
+                    yield w.id.eq(t.id)
+                yield
+                while not (yield w.ready):
+                    yield
+            yield w.valid.eq(0)
+
+    def _responses(self, channel, transactions, pending, write):
+        done = 0
+        while done < len(transactions):
+            ready = not self._bubble(self.ready_rand)
+            yield channel.ready.eq(ready)
+            yield
+            if ready and (yield channel.valid):
+                id = (yield channel.id) if self.full else 0
+                t  = pending[id][0]
+                t.resp = (yield channel.resp)
+                if not write:
+                    t.rdata.append((yield channel.data))
+                if write or (not self.full) or (yield channel.last):
+                    t.complete = self.cycle
+                    pending[id].pop(0)
+                    self._add_outstanding(self.bus.aw if write else self.bus.ar, -1)
+                    done += 1
+        yield channel.ready.eq(0)
+
+    def _b(self):
+        yield from self._responses(self.bus.b, self.writes, self._b_pending, write=True)
+
+    def _r(self):
+        yield from self._responses(self.bus.r, self.reads, self._r_pending, write=False)
+
+    # Stats ----------------------------------------------------------------------------------------
+
+    def get_stats(self):
+        done = [t for t in self.transactions if t.complete is not None]
+        r = {"name": self.name}
+        for kind, transactions in [("write", self.writes), ("read", self.reads)]:
+            transactions = [t for t in transactions if t.complete is not None]
+            nbytes = sum((t.len + 1)*self.word_bytes for t in transactions)
+            r[kind] = {
+                "transactions" : len(transactions),
+                "bytes"        : nbytes,
+                "latency"      : _latency_stats([t.latency for t in transactions]),
+            }
+        r["cycles"] = 0
+        if done:
+            r["cycles"] = max(t.complete for t in done) - min(t.issue for t in done)
+        nbytes = r["write"]["bytes"] + r["read"]["bytes"]
+        r["bandwidth"] = nbytes/r["cycles"] if r["cycles"] else 0 # Bytes/cycle.
+        return r
+
+    def report(self):
+        s = self.get_stats()
+        r = "{}: {} cycles, {:.2f} bytes/cycle\n".format(s["name"], s["cycles"], s["bandwidth"])
+        for kind in ["write", "read"]:
+            k = s[kind]
+            l = k["latency"]
+            r += "  {:5}: {:6d} transactions {:8d} bytes".format(kind, k["transactions"], k["bytes"])
+            if l["count"]:
+                r += " latency p50/p90/p99/max: {}/{}/{}/{}".format(l["p50"], l["p90"], l["p99"], l["max"])
+            r += "\n"
+        return r
+
+# AXI Memory Slave BFM -----------------------------------------------------------------------------
+
+class AXIMemorySlaveBFM:
+    """AXI/AXI-Lite Memory Slave BFM
+
+    Accepts up to max_outstanding writes/reads, responds after latency cycles (in order) from a
+    word-addressed memory (dict). ready_rand/valid_rand (0-100) set the probability of inserting
+    ready/valid bubbles.
+    """
+    def __init__(self, bus, mem=None, latency=0, max_outstanding=8, ready_rand=0, valid_rand=0,
+        seed=42, name="slave"):
+        self.bus             = bus
+        self.name            = name
+        self.full            = _is_axi_full(bus)
+        self.mem             = {} if mem is None else mem
+        self.latency         = latency
+        self.max_outstanding = max_outstanding
+        self.ready_rand      = ready_rand
+        self.valid_rand      = valid_rand
+        self.prng            = random.Random(seed)
+        self.word_bytes      = len(bus.w.data)//8
+        self.cycle           = 0
+        self.writes          = 0
+        self.reads           = 0
+        self.beats           = 0
+
+        self._aw_queue = []
+        self._b_queue  = []
+        self._r_queue  = []
+
+    def generators(self):
+        return [self._timer(), self._aw(), self._w(), self._b(), self._ar(), self._r()]
+
+    @passive
+    def _timer(self):
+        while True:
+            self.cycle += 1
+            yield
+
+    def _bubble(self, rand):
+        return self.prng.randrange(100) < rand
+
+    def _get_ax(self, ax):
+        addr = (yield ax.addr)
+        if self.full:
+            return addr, (yield ax.len), (yield ax.id)
+        return addr, 0, 0
+
+    def _accept(self, ax, queue):
+        while True:
+            ready = (len(queue) < self.max_outstanding) and not self._bubble(self.ready_rand)
+            yield ax.ready.eq(ready)
+            yield
+            if ready and (yield ax.valid):
+                addr, length, id = yield from self._get_ax(ax)
+                # Queue entries: (id, addr, len, response cycle).
+                queue.append((id, addr, length, self.cycle + self.latency))
+
+    @passive
+    def _aw(self):
+        yield from self._accept(self.bus.aw, self._aw_queue)
+
+    @passive
+    def _ar(self):
+        yield from self._accept(self.bus.ar, self._r_queue)
+
+    @passive
+    def _w(self):
+        w    = self.bus.w
+        beat = 0
+        while True:
+            ready = (len(self._aw_queue) > 0) and not self._bubble(self.ready_rand)
+            yield w.ready.eq(ready)
+            yield
+            if ready and (yield w.valid):
+                id, addr, length, cycle = self._aw_queue[0]
+                word = addr//self.word_bytes + beat
+                data = (yield w.data)
+                strb = (yield w.strb)
+                mask = 0
+                for i in range(self.word_bytes):
+                    if (strb >> i) & 0b1:
+                        mask |= 0xff << (8*i)
+                self.mem[word] = (self.mem.get(word, 0) & ~mask) | (data & mask)
+                self.beats += 1
+                if beat == length:
+                    self._aw_queue.pop(0)
+                    self._b_queue.append((id, addr, length, max(cycle, self.cycle)))
+                    self.writes += 1
+                    beat = 0
+                else:
+                    beat += 1
+
+    def _respond(self, channel, queue, beats):
+        while True:
+            if queue and (queue[0][-1] <= self.cycle) and not self._bubble(self.valid_rand):
+                entry  = queue[0]
+                id     = entry[0]
+                values = beats(entry)
+                for n, value in enumerate(values):
+                    yield channel.valid.eq(1)
+                    if self.full:
+                        yield channel.id.eq(id)
+                    yield channel.resp.eq(RESP_OKAY)
+                    if value is not None:
+                        yield channel.data.eq(value)
+                        if self.full:
+                            yield channel.last.eq(n == len(values) - 1)
+                    yield
+                    while not (yield channel.ready):
+                        yield
+                queue.pop(0)
+            else:
+                yield channel.valid.eq(0)
+                yield
+
+    @passive
+    def _b(self):
+        yield from self._respond(self.bus.b, self._b_queue, lambda entry: [None])
+
+    @passive
+    def _r(self):
+        def beats(entry):
+            id, addr, length, cycle = entry
+            self.reads += 1
+            self.beats += length + 1
+            return [self.mem.get(addr//self.word_bytes + i, 0) for i in range(length + 1)]
+        yield from self._respond(self.bus.r, self._r_queue, beats)
+
+    # Stats ----------------------------------------------------------------------------------------
+
+    def get_stats(self):
+        return {
+            "name"   : self.name,
+            "writes" : self.writes,
+            "reads"  : self.reads,
+            "beats"  : self.beats,
+            "bytes"  : self.beats*self.word_bytes,
+        }
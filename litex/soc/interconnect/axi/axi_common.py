@@ -104,3 +104,70 @@ def axi_layout_flat(axi):
                 for subgroup in subgroups:
                     name, _, direction = subgroup
                     yield ch, name, get_dir(ch, direction)
+
+# AXI Buffer ---------------------------------------------------------------------------------------
+
+class AXIBuffer(Module):
+    """AXI/AXI-Lite buffer (register slice)
+
+    Cuts timing paths between master and slave on each of the selected channels: pipe_valid
+    registers valid/payload, pipe_ready registers ready, both give a full skid buffer.
+    """
+    def __init__(self, master, slave, pipe_valid=True, pipe_ready=False, channels=["aw", "w", "b", "ar", "r"]):
+        self.master = master
+        self.slave  = slave
+
+        # # #
+
+        for channel in ["aw", "w", "b", "ar", "r"]:
+            sink, source = getattr(master, channel), getattr(slave, channel)
+            if channel in ["b", "r"]:
+                sink, source = source, sink
+            pipes = []
+            if (channel in channels) and pipe_ready:
+                pipes.append(stream.PipeReady(sink.description))
+            if (channel in channels) and pipe_valid:
+                pipes.append(stream.PipeValid(sink.description))
+            self.submodules += pipes
+            for pipe in pipes:
+                self.comb += sink.connect(pipe.sink)
+                sink = pipe.source
+            self.comb += sink.connect(source)
+
+# AXI Interconnect Helpers -------------------------------------------------------------------------
+
+class _AXIRequestRegister(Module):
+    """Registers AW/AR requests along with their slave selection (decoded from their address)."""
+    def __init__(self, master, decoders, interface):
+        self.master = interface # Registered master (same parameters than master).
+        self.sel = {ax: Signal(len(decoders)) for ax in ["aw", "ar"]}
+
+        # # #
+
+        addr_shift = log2_int(master.data_width//8)
+        self.comb += [
+            master.w.connect(self.master.w),
+            self.master.b.connect(master.b),
+            self.master.r.connect(master.r),
+        ]
+        for ax in ["aw", "ar"]:
+            sink = getattr(master, ax)
+            pipe = stream.PipeValid(sink.description)
+            self.submodules += pipe
+            self.comb += [
+                sink.connect(pipe.sink),
+                pipe.source.connect(getattr(self.master, ax)),
+            ]
+            # Decode request on its way to the register.
+            self.sync += If(pipe.sink.ready,
+                self.sel[ax].eq(Cat(*[decoder(sink.addr[addr_shift:]) for decoder in decoders]))
+            )
+
+def _get_port_buffers(buffers, n):
+    # Buffer parameters of each of the n ports (None: no buffer, True: default buffer).
+    def get_buffer(buffer):
+        return {True: {}, False: None}[buffer] if isinstance(buffer, bool) else buffer
+    if (buffers is None) or isinstance(buffers, (bool, dict)):
+        return [get_buffer(buffers)]*n
+    assert len(buffers) == n
+    return [get_buffer(buffer) for buffer in buffers]
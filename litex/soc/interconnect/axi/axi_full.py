@@ -15,6 +15,7 @@ from litex.soc.interconnect import stream
 from litex.build.generic_platform import *
 
 from litex.soc.interconnect.axi.axi_common import *
+from litex.soc.interconnect.axi.axi_common import _AXIRequestRegister, _get_port_buffers
 
 # AXI Definition -----------------------------------------------------------------------------------
 
@@ -378,7 +379,7 @@ class AXIArbiter(Module):
                 source = get_sig(target, channel, name)
                 for i, m in enumerate(masters):
                     dest = get_sig(m, channel, name)
-                    if name == "ready":
+                    if name in ["valid", "ready"]:
                         self.comb += dest.eq(source & (rr.grant == i))
                     else:
                         self.comb += dest.eq(source)
@@ -414,11 +415,24 @@ class AXIDecoder(Module):
         List of slaves with address decoders, where `decoder` is a function:
             decoder(Signal(address_width - log2(data_width//8))) -> Signal(1)
         that returns 1 when the slave is selected and 0 otherwise.
+
+    register: Register requests (AW/AR) along with their decoded slave selection, cutting the path
+        from master address/valid through the decoders. Adds a cycle of latency to the requests.
     """
     def __init__(self, master, slaves, register=False):
-        # TODO: unused register argument
         addr_shift = log2_int(master.data_width//8)
 
+        # Register requests along with their slave selection.
+        if register:
+            self.submodules.request_register = request_register = _AXIRequestRegister(
+                master    = master,
+                decoders  = [decoder for decoder, _ in slaves],
+                interface = AXIInterface(
+                    data_width    = master.data_width,
+                    address_width = master.address_width,
+                    id_width      = master.id_width))
+            master = request_register.master
+
         channels = {
             "write": {"aw", "w", "b"},
             "read":  {"ar", "r"},
@@ -453,11 +467,17 @@ class AXIDecoder(Module):
         # # #
 
         # Decode slave addresses.
-        for i, (decoder, bus) in enumerate(slaves):
+        if register:
             self.comb += [
-                slave_sel_dec["write"][i].eq(decoder(master.aw.addr[addr_shift:])),
-                slave_sel_dec["read"][i].eq(decoder(master.ar.addr[addr_shift:])),
+                slave_sel_dec["write"].eq(request_register.sel["aw"]),
+                slave_sel_dec["read"].eq(request_register.sel["ar"]),
             ]
+        else:
+            for i, (decoder, bus) in enumerate(slaves):
+                self.comb += [
+                    slave_sel_dec["write"][i].eq(decoder(master.aw.addr[addr_shift:])),
+                    slave_sel_dec["read"][i].eq(decoder(master.ar.addr[addr_shift:])),
+                ]
 
         # Change the current selection only when we've got all responses.
         for channel in locks.keys():
@@ -472,6 +492,27 @@ class AXIDecoder(Module):
                 )
             ]
 
+        # Stall requests to another slave until all responses of the current one come back, and
+        # write data until its request is presented/accepted.
+        stall = {ch: Signal() for ch in ["aw", "w", "ar"]}
+        # w_pending: write requests accepted - write data done. W data can be forwarded along with
+        # a presented AW and complete before the AW is accepted (slaves can wait for W before
+        # accepting AW), w_pending is then -1 until the AW is accepted (and W stalled meanwhile).
+        w_pending = Signal(min=-1, max=256)
+        w_done    = master.w.valid & master.w.ready & master.w.last
+        self.sync += [
+            If(master.aw.valid & master.aw.ready & ~w_done,
+                w_pending.eq(w_pending + 1)
+            ).Elif(w_done & ~(master.aw.valid & master.aw.ready),
+                w_pending.eq(w_pending - 1)
+            )
+        ]
+        self.comb += [
+            stall["aw"].eq(~locks["write"].ready & (slave_sel_dec["write"] != slave_sel_reg["write"])),
+            stall["ar"].eq(~locks["read"].ready  & (slave_sel_dec["read"]  != slave_sel_reg["read"])),
+            stall["w"].eq(~((w_pending > 0) | ((w_pending == 0) & master.aw.valid & ~stall["aw"]))),
+        ]
+
         # Connect master->slaves signals except valid/ready.
         for i, (_, slave) in enumerate(slaves):
             for channel, name, direction in master.layout_flat():
@@ -481,6 +522,8 @@ class AXIDecoder(Module):
                     # Mask master control signals depending on slave selection.
                     if name in ["valid", "ready"]:
                         src = src & slave_sel[directions[channel]][i]
+                    if (name == "valid") and (channel in stall):
+                        src = src & ~stall[channel]
                     self.comb += dst.eq(src)
 
         # Connect slave->master signals masking not selected slaves.
@@ -493,7 +536,308 @@ class AXIDecoder(Module):
                     # Mask depending on channel.
                     mask = Replicate(slave_sel[directions[channel]][i], len(dst))
                     masked.append(src & mask)
-                self.comb += dst.eq(reduce(or_, masked))
+                if (name == "ready") and (channel in stall):
+                    self.comb += dst.eq(reduce(or_, masked) & ~stall[channel])
+                else:
+                    self.comb += dst.eq(reduce(or_, masked))
+
+# AXI Non-Blocking Interconnect Components ---------------------------------------------------------
+
+class _AXIIDTracker(Module):
+    """Tracks outstanding transactions per ID along with the port (slave or master) of each ID.
+
+    A new transaction is stalled when its ID has transactions outstanding on another port (to keep
+    AXI ordering within an ID) or when its ID counter is full. IDs are tracked on their id_width LSBs
+    (aliased IDs are just ordered together).
+    """
+    def __init__(self, request, request_id, request_port, response, response_id, n_ports,
+        id_width        = 4,
+        max_outstanding = 8):
+        self.response_port = Signal(max=max(2, n_ports))
+
+        # # #
+
+        counters = [_AXIRequestCounter(
+            request      = request  & (request_id[:id_width]  == i),
+            response     = response & (response_id[:id_width] == i),
+            max_requests = max_outstanding + 1) for i in range(2**id_width)]
+        self.submodules += counters
+        self._id_width = id_width
+        self._empty    = Array(c.empty for c in counters)
+        self._full     = Array(c.full  for c in counters)
+        self._ports    = Array(Signal(max=max(2, n_ports)) for c in counters)
+
+        self.sync += If(request, self._ports[request_id[:id_width]].eq(request_port))
+        self.comb += self.response_port.eq(self._ports[response_id[:id_width]])
+
+    def stall(self, id, port):
+        id = id[:self._id_width]
+        return self._full[id] | (~self._empty[id] & (self._ports[id] != port))
+
+class _AXIWriteOrder(Module):
+    """Keeps W data in the order of the accepted write requests.
+
+    W data is routed to the port of the oldest accepted write request with W data not done or, when
+    there is none, along with the presented write request (W data can precede AW acceptance).
+    """
+    def __init__(self, aw_valid, aw_accept, aw_port, w_done, n_ports, depth=8):
+        self.full    = Signal()
+        self.w_port  = Signal(max=max(2, n_ports))
+        self.w_valid = Signal()
+
+        # # #
+
+        self.submodules.fifo = fifo = stream.SyncFIFO([("port", len(self.w_port))], max(depth, 2))
+        w_ahead  = Signal() # W data of the presented write request already done.
+        w_direct = Signal()
+        self.comb += [
+            w_direct.eq(~fifo.source.valid & ~w_ahead),
+            fifo.sink.valid.eq(aw_accept & ~w_ahead & ~(w_direct & w_done)),
+            fifo.sink.port.eq(aw_port),
+            fifo.source.ready.eq(w_done),
+            self.full.eq(~fifo.sink.ready),
+            If(fifo.source.valid,
+                self.w_port.eq(fifo.source.port),
+                self.w_valid.eq(1)
+            ).Else(
+                self.w_port.eq(aw_port),
+                self.w_valid.eq(aw_valid & ~w_ahead)
+            )
+        ]
+        self.sync += [
+            If(aw_accept,
+                w_ahead.eq(0)
+            ).Elif(w_done & w_direct,
+                w_ahead.eq(1)
+            )
+        ]
+
+def _axi_connect_channel(module, sources, sel, valid, dest, channel, omit=[]):
+    # Connect channel of sources[sel] to dest (except ready and omit), with valid qualified by valid.
+    for _channel, name, direction in dest.layout_flat():
+        if _channel != channel or name in ["ready"] + omit:
+            continue
+        if direction != (DIR_S_TO_M if channel in ["b", "r"] else DIR_M_TO_S):
+            continue
+        src = Array(getattr(getattr(s, channel), name) for s in sources)[sel]
+        if name == "valid":
+            src = src & valid
+        module.comb += getattr(getattr(dest, channel), name).eq(src)
+
+class AXINonBlockingArbiter(Module):
+    """AXI non-blocking arbiter
+
+    Arbitrate between master interfaces and connect them to the target request by request.
+
+    When the target ID is wide enough to hold the masters IDs extended with the master index
+    (id_width >= masters id_width + log2(len(masters))), the master index is added as ID MSBs:
+    masters can have transactions outstanding on the target at the same time whatever their IDs
+    and responses are routed back to the masters by these ID MSBs.
+
+    Otherwise, masters can only have transactions outstanding on the target at the same time as
+    long as they use different IDs (transactions of an ID are kept on a single master until all are
+    responded to, IDs being tracked on their 4 LSBs): masters using the same IDs (ex: all using ID
+    0) are serialized. Responses are routed back to the masters by ID.
+
+    W data follows the accepted write requests order. Arbitration for write and read channels is
+    done separately.
+    """
+    def __init__(self, masters, target, max_outstanding=8):
+        self.submodules.rr_write = rr_write = roundrobin.RoundRobin(len(masters), roundrobin.SP_CE)
+        self.submodules.rr_read  = rr_read  = roundrobin.RoundRobin(len(masters), roundrobin.SP_CE)
+
+        # # #
+
+        channels = [
+            # Request, Response, Round-Robin, Response last.
+            ("aw",     "b",      rr_write,    C(1)),
+            ("ar",     "r",      rr_read,     target.r.last),
+        ]
+        id_width     = min(len(target.aw.id), 4)
+        m_id_width   = max(len(m.aw.id) for m in masters)
+        port_bits    = log2_int(len(masters), need_pow2=False)
+        id_extension = (len(masters) > 1) and (len(target.aw.id) >= m_id_width + port_bits)
+
+        # Requests (without ID extension, stalled when their ID is outstanding from another master).
+        trackers = {}
+        requests = {}
+        for ax, resp, rr, last in channels:
+            target_ax   = getattr(target, ax)
+            target_resp = getattr(target, resp)
+            requests[ax] = Array(Signal() for m in masters)
+            if id_extension:
+                for i, m in enumerate(masters):
+                    self.comb += requests[ax][i].eq(getattr(m, ax).valid)
+                continue
+            trackers[ax] = _AXIIDTracker(
+                request         = target_ax.valid & target_ax.ready,
+                request_id      = target_ax.id,
+                request_port    = rr.grant,
+                response        = target_resp.valid & target_resp.ready & last,
+                response_id     = target_resp.id,
+                n_ports         = len(masters),
+                id_width        = id_width,
+                max_outstanding = max_outstanding)
+            for i, m in enumerate(masters):
+                m_ax = getattr(m, ax)
+                self.comb += requests[ax][i].eq(m_ax.valid & ~trackers[ax].stall(m_ax.id, i))
+        self.submodules += trackers.values()
+
+        # Write data, in the order of the accepted write requests.
+        self.submodules.w_order = w_order = _AXIWriteOrder(
+            aw_valid  = requests["aw"][rr_write.grant],
+            aw_accept = target.aw.valid & target.aw.ready,
+            aw_port   = rr_write.grant,
+            w_done    = target.w.valid & target.w.ready & target.w.last,
+            n_ports   = len(masters),
+            depth     = max_outstanding)
+        if id_extension:
+            w_id = Signal(m_id_width)
+            _axi_connect_channel(self, masters, w_order.w_port, w_order.w_valid, target, "w", omit=["id"])
+            self.comb += [
+                w_id.eq(Array(m.w.id for m in masters)[w_order.w_port]),
+                target.w.id.eq(Cat(w_id, w_order.w_port)),
+            ]
+        else:
+            _axi_connect_channel(self, masters, w_order.w_port, w_order.w_valid, target, "w")
+        for i, m in enumerate(masters):
+            self.comb += m.w.ready.eq(target.w.ready & w_order.w_valid & (w_order.w_port == i))
+
+        for ax, resp, rr, last in channels:
+            target_ax   = getattr(target, ax)
+            target_resp = getattr(target, resp)
+            valid       = Signal()
+            self.comb += valid.eq(requests[ax][rr.grant] & ~(w_order.full if ax == "aw" else C(0)))
+
+            # Connect granted master's request, keep grant until request is accepted.
+            if id_extension:
+                m_id = Signal(m_id_width)
+                _axi_connect_channel(self, masters, rr.grant, valid, target, ax, omit=["id"])
+                self.comb += [
+                    m_id.eq(Array(getattr(m, ax).id for m in masters)[rr.grant]),
+                    target_ax.id.eq(Cat(m_id, rr.grant)),
+                ]
+            else:
+                _axi_connect_channel(self, masters, rr.grant, valid, target, ax)
+            self.comb += [
+                rr.request.eq(Cat(*requests[ax])),
+                rr.ce.eq(~requests[ax][rr.grant] | (target_ax.valid & target_ax.ready)),
+            ]
+            for i, m in enumerate(masters):
+                self.comb += getattr(m, ax).ready.eq(target_ax.ready & valid & (rr.grant == i))
+
+            # Route responses by ID (master index MSBs with ID extension).
+            if id_extension:
+                port = target_resp.id[m_id_width:m_id_width + port_bits]
+            else:
+                port = trackers[ax].response_port
+            for i, m in enumerate(masters):
+                _axi_connect_channel(self, [target], 0, port == i, m, resp)
+            self.comb += target_resp.ready.eq(Array(getattr(m, resp).ready for m in masters)[port])
+
+class AXINonBlockingDecoder(Module):
+    """AXI non-blocking decoder
+
+    Decode master accesses to particular slaves based on their decoder functions (see AXIDecoder),
+    request by request: the master can have transactions outstanding to several slaves at the same
+    time as long as they use different IDs (transactions of an ID are kept on a single slave until
+    all are responded to). Responses from the slaves are arbitrated (R bursts are not interleaved)
+    and W data follows the accepted write requests order.
+
+    register: Register requests (AW/AR) along with their decoded slave selection (see AXIDecoder).
+    """
+    def __init__(self, master, slaves, max_outstanding=8, register=False):
+        self.submodules.rr_write = rr_write = roundrobin.RoundRobin(len(slaves), roundrobin.SP_CE)
+        self.submodules.rr_read  = rr_read  = roundrobin.RoundRobin(len(slaves), roundrobin.SP_CE)
+
+        # # #
+
+        # Register requests along with their slave selection.
+        if register:
+            self.submodules.request_register = request_register = _AXIRequestRegister(
+                master    = master,
+                decoders  = [decoder for decoder, _ in slaves],
+                interface = AXIInterface(
+                    data_width    = master.data_width,
+                    address_width = master.address_width,
+                    id_width      = master.id_width))
+            master = request_register.master
+
+        addr_shift = log2_int(master.data_width//8)
+        channels   = [
+            # Request, Response, Round-Robin, Response last.
+            ("aw",     "b",      rr_write,    C(1)),
+            ("ar",     "r",      rr_read,     master.r.last),
+        ]
+        id_width   = min(len(master.aw.id), 4)
+        busses     = [bus for _, bus in slaves]
+
+        # Decode slave addresses.
+        slave_sel  = {}
+        slave_port = {}
+        for ax, _, _, _ in channels:
+            slave_sel[ax]  = Signal(len(slaves))
+            slave_port[ax] = Signal(max=max(2, len(slaves)))
+            for i, (decoder, bus) in enumerate(slaves):
+                if register:
+                    self.comb += slave_sel[ax][i].eq(request_register.sel[ax][i])
+                else:
+                    self.comb += slave_sel[ax][i].eq(decoder(getattr(master, ax).addr[addr_shift:]))
+                self.comb += If(slave_sel[ax][i], slave_port[ax].eq(i))
+
+        # Requests (stalled when their ID is outstanding to another slave).
+        trackers = {}
+        valids   = {}
+        for ax, resp, rr, last in channels:
+            master_ax   = getattr(master, ax)
+            master_resp = getattr(master, resp)
+            trackers[ax] = _AXIIDTracker(
+                request         = master_ax.valid & master_ax.ready,
+                request_id      = master_ax.id,
+                request_port    = slave_port[ax],
+                response        = master_resp.valid & master_resp.ready & last,
+                response_id     = master_resp.id,
+                n_ports         = len(slaves),
+                id_width        = id_width,
+                max_outstanding = max_outstanding)
+            valids[ax] = Signal()
+        self.submodules += trackers.values()
+
+        # Write data, in the order of the accepted write requests.
+        self.submodules.w_order = w_order = _AXIWriteOrder(
+            aw_valid  = valids["aw"],
+            aw_accept = master.aw.valid & master.aw.ready,
+            aw_port   = slave_port["aw"],
+            w_done    = master.w.valid & master.w.ready & master.w.last,
+            n_ports   = len(slaves),
+            depth     = max_outstanding)
+        for i, bus in enumerate(busses):
+            _axi_connect_channel(self, [master], 0, w_order.w_valid & (w_order.w_port == i), bus, "w")
+        self.comb += master.w.ready.eq(Array(bus.w.ready for bus in busses)[w_order.w_port] & w_order.w_valid)
+
+        for ax, resp, rr, last in channels:
+            master_ax   = getattr(master, ax)
+            master_resp = getattr(master, resp)
+            self.comb += valids[ax].eq(master_ax.valid & (slave_sel[ax] != 0) &
+                ~trackers[ax].stall(master_ax.id, slave_port[ax]) &
+                ~(w_order.full if ax == "aw" else C(0)))
+
+            # Connect request to the selected slave.
+            for i, bus in enumerate(busses):
+                _axi_connect_channel(self, [master], 0, valids[ax] & (slave_port[ax] == i), bus, ax)
+            self.comb += master_ax.ready.eq(Array(getattr(bus, ax).ready for bus in busses)[slave_port[ax]] & valids[ax])
+
+            # Arbitrate responses, keep grant until the end of the response.
+            in_burst = Signal()
+            accept   = master_resp.valid & master_resp.ready
+            _axi_connect_channel(self, busses, rr.grant, 1, master, resp)
+            self.comb += [
+                rr.request.eq(Cat(*[getattr(bus, resp).valid for bus in busses])),
+                rr.ce.eq((~master_resp.valid & ~in_burst) | (accept & last)),
+            ]
+            self.sync += If(accept, in_burst.eq(~last))
+            for i, bus in enumerate(busses):
+                self.comb += getattr(bus, resp).ready.eq(master_resp.ready & (rr.grant == i))
 
 # AXI Interconnect ---------------------------------------------------------------------------------
 
@@ -505,9 +849,12 @@ class AXIInterconnectPointToPoint(Module):
 class AXIInterconnectShared(Module):
     """AXI shared interconnect"""
     def __init__(self, masters, slaves, register=False, timeout_cycles=1e6):
-        shared = AXIInterface(data_width=masters[0].data_width)
+        shared = AXIInterface(
+            data_width    = masters[0].data_width,
+            address_width = masters[0].address_width,
+            id_width      = masters[0].id_width)
         self.submodules.arbiter = AXIArbiter(masters, shared)
-        self.submodules.decoder = AXIDecoder(shared, slaves)
+        self.submodules.decoder = AXIDecoder(shared, slaves, register)
         if timeout_cycles is not None:
             self.submodules.timeout = AXITimeout(shared, timeout_cycles)
 
@@ -515,15 +862,58 @@ class AXICrossbar(Module):
     """AXI crossbar
 
     MxN crossbar for M masters and N slaves.
+
+    With non_blocking=True, masters/slaves are no longer locked until all responses come back: each
+    master can have up to max_outstanding transactions per ID in flight to different slaves and
+    slaves can have transactions from different masters in flight, responses being routed back by
+    ID. Transactions from different masters with the same ID are only in flight together on slaves
+    with IDs wide enough for the masters IDs extended with the master index (see
+    AXINonBlockingArbiter), they are serialized otherwise.
+
+    master_buffers/slave_buffers: Buffers (register slices) to insert on the masters/slaves ports:
+        None, AXIBuffer parameters (dict) for all the ports or a list with the AXIBuffer parameters
+        (or None) of each port, ex: [None, {"pipe_ready": True, "channels": ["aw", "ar"]}].
     """
-    def __init__(self, masters, slaves, register=False, timeout_cycles=1e6):
+    def __init__(self, masters, slaves, register=False, timeout_cycles=1e6, non_blocking=False,
+        max_outstanding = 8,
+        master_buffers  = None,
+        slave_buffers   = None):
+        # Insert buffers on masters/slaves ports.
+        masters = list(masters)
+        for i, buffer in enumerate(_get_port_buffers(master_buffers, len(masters))):
+            if buffer is not None:
+                master = AXIInterface(
+                    data_width    = masters[i].data_width,
+                    address_width = masters[i].address_width,
+                    id_width      = masters[i].id_width)
+                self.submodules += AXIBuffer(masters[i], master, **buffer)
+                masters[i] = master
+        slaves = list(slaves)
+        for i, buffer in enumerate(_get_port_buffers(slave_buffers, len(slaves))):
+            if buffer is not None:
+                decoder, slave = slaves[i]
+                slaves[i] = (decoder, AXIInterface(
+                    data_width    = slave.data_width,
+                    address_width = slave.address_width,
+                    id_width      = slave.id_width))
+                self.submodules += AXIBuffer(slaves[i][1], slave, **buffer)
+
         matches, busses = zip(*slaves)
-        access_m_s = [[AXIInterface() for j in slaves] for i in masters]  # a[master][slave]
+        access_m_s = [[AXIInterface(
+            data_width    = master.data_width,
+            address_width = master.address_width,
+            id_width      = master.id_width) for j in slaves] for master in masters]  # a[master][slave]
         access_s_m = list(zip(*access_m_s))  # a[slave][master]
         # Decode each master into its access row.
         for slaves, master in zip(access_m_s, masters):
             slaves = list(zip(matches, slaves))
-            self.submodules += AXIDecoder(master, slaves, register)
+            if non_blocking:
+                self.submodules += AXINonBlockingDecoder(master, slaves, max_outstanding, register)
+            else:
+                self.submodules += AXIDecoder(master, slaves, register)
         # Arbitrate each access column onto its slave.
         for masters, bus in zip(access_s_m, busses):
-            self.submodules += AXIArbiter(masters, bus)
+            if non_blocking:
+                self.submodules += AXINonBlockingArbiter(masters, bus, max_outstanding)
+            else:
+                self.submodules += AXIArbiter(masters, bus)
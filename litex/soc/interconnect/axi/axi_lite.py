@@ -15,6 +15,7 @@ from litex.soc.interconnect import stream
 from litex.build.generic_platform import *
 
 from litex.soc.interconnect.axi.axi_common import *
+from litex.soc.interconnect.axi.axi_common import _AXIRequestRegister, _get_port_buffers
 
 # AXI-Lite Definition ------------------------------------------------------------------------------
 
@@ -509,6 +510,10 @@ class AXILiteClockDomainCrossing(Module):
                 r_cdc.source.connect(master.r),
             ]
 
+# AXI-Lite Buffer ----------------------------------------------------------------------------------
+
+AXILiteBuffer = AXIBuffer # Same register slice than AXI (channels have the same handshake).
+
 # AXI-Lite Timeout ---------------------------------------------------------------------------------
 
 class AXILiteTimeout(Module):
@@ -622,7 +627,7 @@ class AXILiteArbiter(Module):
                 source = get_sig(target, channel, name)
                 for i, m in enumerate(masters):
                     dest = get_sig(m, channel, name)
-                    if name == "ready":
+                    if name in ["valid", "ready"]:
                         self.comb += dest.eq(source & (rr.grant == i))
                     else:
                         self.comb += dest.eq(source)
@@ -658,11 +663,23 @@ class AXILiteDecoder(Module):
         List of slaves with address decoders, where `decoder` is a function:
             decoder(Signal(address_width - log2(data_width//8))) -> Signal(1)
         that returns 1 when the slave is selected and 0 otherwise.
+
+    register: Register requests (AW/AR) along with their decoded slave selection, cutting the path
+        from master address/valid through the decoders. Adds a cycle of latency to the requests.
     """
     def __init__(self, master, slaves, register=False):
-        # TODO: unused register argument
         addr_shift = log2_int(master.data_width//8)
 
+        # Register requests along with their slave selection.
+        if register:
+            self.submodules.request_register = request_register = _AXIRequestRegister(
+                master    = master,
+                decoders  = [decoder for decoder, _ in slaves],
+                interface = AXILiteInterface(
+                    data_width    = master.data_width,
+                    address_width = master.address_width))
+            master = request_register.master
+
         channels = {
             "write": {"aw", "w", "b"},
             "read":  {"ar", "r"},
@@ -697,11 +714,17 @@ class AXILiteDecoder(Module):
         # # #
 
         # Decode slave addresses.
-        for i, (decoder, bus) in enumerate(slaves):
+        if register:
             self.comb += [
-                slave_sel_dec["write"][i].eq(decoder(master.aw.addr[addr_shift:])),
-                slave_sel_dec["read"][i].eq(decoder(master.ar.addr[addr_shift:])),
+                slave_sel_dec["write"].eq(request_register.sel["aw"]),
+                slave_sel_dec["read"].eq(request_register.sel["ar"]),
             ]
+        else:
+            for i, (decoder, bus) in enumerate(slaves):
+                self.comb += [
+                    slave_sel_dec["write"][i].eq(decoder(master.aw.addr[addr_shift:])),
+                    slave_sel_dec["read"][i].eq(decoder(master.ar.addr[addr_shift:])),
+                ]
 
         # Change the current selection only when we've got all responses.
         for channel in locks.keys():
@@ -716,6 +739,27 @@ class AXILiteDecoder(Module):
                 )
             ]
 
+        # Stall requests to another slave until all responses of the current one come back, and
+        # write data until its request is presented/accepted.
+        stall = {ch: Signal() for ch in ["aw", "w", "ar"]}
+        # w_pending: write requests accepted - write data done. W data can be forwarded along with
+        # a presented AW and complete before the AW is accepted (slaves can wait for W before
+        # accepting AW), w_pending is then -1 until the AW is accepted (and W stalled meanwhile).
+        w_pending = Signal(min=-1, max=256)
+        w_done    = master.w.valid & master.w.ready
+        self.sync += [
+            If(master.aw.valid & master.aw.ready & ~w_done,
+                w_pending.eq(w_pending + 1)
+            ).Elif(w_done & ~(master.aw.valid & master.aw.ready),
+                w_pending.eq(w_pending - 1)
+            )
+        ]
+        self.comb += [
+            stall["aw"].eq(~locks["write"].ready & (slave_sel_dec["write"] != slave_sel_reg["write"])),
+            stall["ar"].eq(~locks["read"].ready  & (slave_sel_dec["read"]  != slave_sel_reg["read"])),
+            stall["w"].eq(~((w_pending > 0) | ((w_pending == 0) & master.aw.valid & ~stall["aw"]))),
+        ]
+
         # Connect master->slaves signals except valid/ready.
         for i, (_, slave) in enumerate(slaves):
             for channel, name, direction in master.layout_flat():
@@ -725,6 +769,8 @@ class AXILiteDecoder(Module):
                     # Mask master control signals depending on slave selection.
                     if name in ["valid", "ready"]:
                         src = src & slave_sel[directions[channel]][i]
+                    if (name == "valid") and (channel in stall):
+                        src = src & ~stall[channel]
                     self.comb += dst.eq(src)
 
         # Connect slave->master signals masking not selected slaves.
@@ -737,7 +783,10 @@ class AXILiteDecoder(Module):
                     # Mask depending on channel.
                     mask = Replicate(slave_sel[directions[channel]][i], len(dst))
                     masked.append(src & mask)
-                self.comb += dst.eq(reduce(or_, masked))
+                if (name == "ready") and (channel in stall):
+                    self.comb += dst.eq(reduce(or_, masked) & ~stall[channel])
+                else:
+                    self.comb += dst.eq(reduce(or_, masked))
 
 # AXI-Lite Interconnect ----------------------------------------------------------------------------
 
@@ -749,9 +798,11 @@ class AXILiteInterconnectPointToPoint(Module):
 class AXILiteInterconnectShared(Module):
     """AXI Lite shared interconnect"""
     def __init__(self, masters, slaves, register=False, timeout_cycles=1e6):
-        shared = AXILiteInterface(data_width=masters[0].data_width)
+        shared = AXILiteInterface(
+            data_width    = masters[0].data_width,
+            address_width = masters[0].address_width)
         self.submodules.arbiter = AXILiteArbiter(masters, shared)
-        self.submodules.decoder = AXILiteDecoder(shared, slaves)
+        self.submodules.decoder = AXILiteDecoder(shared, slaves, register)
         if timeout_cycles is not None:
             self.submodules.timeout = AXILiteTimeout(shared, timeout_cycles)
 
@@ -759,10 +810,36 @@ class AXILiteCrossbar(Module):
     """AXI Lite crossbar
 
     MxN crossbar for M masters and N slaves.
+
+    master_buffers/slave_buffers: Buffers (register slices) to insert on the masters/slaves ports:
+        None, AXILiteBuffer parameters (dict) for all the ports or a list with the AXILiteBuffer
+        parameters (or None) of each port, ex: [None, {"pipe_ready": True, "channels": ["aw", "ar"]}].
     """
-    def __init__(self, masters, slaves, register=False, timeout_cycles=1e6):
+    def __init__(self, masters, slaves, register=False, timeout_cycles=1e6,
+        master_buffers = None,
+        slave_buffers  = None):
+        # Insert buffers on masters/slaves ports.
+        masters = list(masters)
+        for i, buffer in enumerate(_get_port_buffers(master_buffers, len(masters))):
+            if buffer is not None:
+                master = AXILiteInterface(
+                    data_width    = masters[i].data_width,
+                    address_width = masters[i].address_width)
+                self.submodules += AXILiteBuffer(masters[i], master, **buffer)
+                masters[i] = master
+        slaves = list(slaves)
+        for i, buffer in enumerate(_get_port_buffers(slave_buffers, len(slaves))):
+            if buffer is not None:
+                decoder, slave = slaves[i]
+                slaves[i] = (decoder, AXILiteInterface(
+                    data_width    = slave.data_width,
+                    address_width = slave.address_width))
+                self.submodules += AXILiteBuffer(slaves[i][1], slave, **buffer)
+
         matches, busses = zip(*slaves)
-        access_m_s = [[AXILiteInterface() for j in slaves] for i in masters]  # a[master][slave]
+        access_m_s = [[AXILiteInterface(
+            data_width    = master.data_width,
+            address_width = master.address_width) for j in slaves] for master in masters]  # a[master][slave]
         access_s_m = list(zip(*access_m_s))  # a[slave][master]
         # Decode each master into its access row.
         for slaves, master in zip(access_m_s, masters):
@@ -84,6 +84,56 @@ class InterconnectShared(Module):
             self.comb += masters[i].dat_r.eq(intermediate.dat_r)
         self.comb += intermediate.connect(*slaves)
 
+
+class InterconnectHierarchical(Module):
+    """Hierarchical CSR Interconnect
+
+    Splits the slaves in groups over levels of intermediate buses (with optional registered requests)
+    and ORs the read data of each group in a register, avoiding the large address/dat_r fanout/fanin
+    of InterconnectShared on designs with many CSR banks. Read data is returned read_latency cycles
+    after the request (same latency for all slaves).
+    """
+    def __init__(self, masters, slaves, levels=1, register=True):
+        self.read_latency = self.get_read_latency(levels, register)
+
+        # # #
+
+        bus = Interface.like(masters[0])
+        self.submodules += InterconnectShared(masters, [bus])
+        self.connect_groups(bus, slaves, levels, register)
+
+    @staticmethod
+    def get_read_latency(levels=1, register=True):
+        # Slave (CSRBank) read latency + dat_r register (+ request register) of each level.
+        return 1 + levels*(1 + int(register))
+
+    def connect_groups(self, bus, slaves, levels, register):
+        if levels == 0:
+            self.comb += bus.connect(*slaves)
+            return
+        # Smallest number of groups per level covering the slaves over the remaining levels.
+        n = 1
+        while n**(levels + 1) < len(slaves):
+            n += 1
+        group_size = (len(slaves) + n - 1)//n
+        dat_rs = []
+        for i in range(0, len(slaves), group_size):
+            group = Interface.like(bus)
+            dat_r = Signal.like(bus.dat_r)
+            request = [
+                group.adr.eq(bus.adr),
+                group.we.eq(bus.we),
+                group.dat_w.eq(bus.dat_w),
+            ]
+            if register:
+                self.sync += request
+            else:
+                self.comb += request
+            self.sync += dat_r.eq(group.dat_r)
+            dat_rs.append(dat_r)
+            self.connect_groups(group, slaves[i:i + group_size], levels - 1, register)
+        self.comb += bus.dat_r.eq(reduce(or_, dat_rs))
+
 # CSR SRAM -----------------------------------------------------------------------------------------
 
 class SRAM(Module):
@@ -7,6 +7,7 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import math
+import json
 
 from migen import *
 from migen.util.misc import xdir
@@ -243,8 +244,10 @@ class AsyncFIFO(_FIFOWrapper):
 
 class ClockDomainCrossing(Module):
     def __init__(self, layout, cd_from="sys", cd_to="sys", depth=None, with_common_rst=False):
-        self.sink   = Endpoint(layout)
-        self.source = Endpoint(layout)
+        self.sink    = Endpoint(layout)
+        self.source  = Endpoint(layout)
+        self.cd_from = cd_from
+        self.cd_to   = cd_to
 
         # # #
 
@@ -887,9 +890,30 @@ class Pack(Module):
 # Pipeline -----------------------------------------------------------------------------------------
 
 class Pipeline(Module):
-    def __init__(self, *modules):
+    """Pipeline
+
+    Connects modules/Endpoints source -> sink. Register slices can optionally be inserted
+    automatically between stages to cut combinational paths:
+    - register_every  : Insert a slice every N connections.
+    - register_budget : Insert a slice when more than N consecutive combinational stages would be
+                        chained (modules are considered combinational unless their outputs are
+                        registered: PipelinedActor, PipeValid/Buffer, FIFOs; a module can also
+                        declare it with a comb_stages attribute).
+    - register_mode   : "valid" (PipeValid, cuts valid/payload, +1 cycle latency), "ready"
+                        (PipeReady, cuts ready, no added latency) or "both".
+    Inserted slices are listed in register_slices as (source_stage, sink_stage) indexes and the
+    total latency they add is reported in added_latency. The latency they add on the path from the
+    first stage to each stage is reported in stage_latency (a list aligned with the stages, ex: to
+    delay side signals of a stage).
+    """
+    def __init__(self, *modules, register_every=None, register_budget=None, register_mode="valid"):
+        assert register_mode in ["valid", "ready", "both"]
+        self.register_slices = []
+        self.added_latency   = 0
+        self.stage_latency   = [0]
         n = len(modules)
         m = modules[0]
+        comb_stages = self._comb_stages(m)
         # Expose sink of first module if available.
         if hasattr(m, "sink"):
             self.sink = m.sink
@@ -902,13 +926,61 @@ class Pipeline(Module):
             sink = m_n if isinstance(m_n, Endpoint) else m_n.sink
             # Connect Source to Sink (when m is not m_n).
             if m is not m_n:
+                register = False
+                if register_every is not None:
+                    register |= (i % register_every) == 0
+                if register_budget is not None:
+                    register |= (comb_stages + self._comb_stages(m_n)) > register_budget
+                if register:
+                    source = self._add_register_slice(source, register_mode)
+                    self.register_slices.append((i - 1, i))
+                    comb_stages = 0
                 self.comb += source.connect(sink)
+            self.stage_latency.append(self.added_latency)
+            comb_stages += self._comb_stages(m_n)
+            if self._is_registered(m_n):
+                comb_stages = 0
             # Update m.
             m = m_n
         # Expose source of last module if available.
         if hasattr(m, "source"):
             self.source = m.source
 
+    @staticmethod
+    def _is_registered(m):
+        if hasattr(m, "comb_stages"):
+            return m.comb_stages == 0
+        if isinstance(m, SyncFIFO):
+            return m.depth != 0
+        if isinstance(m, ClockDomainCrossing):
+            return m.cd_from != m.cd_to # Same Clk Domains: direct connection.
+        return isinstance(m, (PipelinedActor, PipeValid, _FIFOWrapper))
+
+    @staticmethod
+    def _comb_stages(m):
+        if isinstance(m, Endpoint):
+            return 0
+        if isinstance(m, ClockDomainCrossing) and (m.cd_from == m.cd_to):
+            return 0
+        if hasattr(m, "comb_stages"):
+            return m.comb_stages
+        return 0 if Pipeline._is_registered(m) else 1
+
+    def _add_register_slice(self, source, mode):
+        slices = {
+            "valid" : [PipeValid],
+            "ready" : [PipeReady],
+            "both"  : [PipeValid, PipeReady],
+        }[mode]
+        for cls in slices:
+            register_slice = cls(source.description)
+            self.submodules += register_slice
+            self.comb += source.connect(register_slice.sink)
+            source = register_slice.source
+            if cls is PipeValid:
+                self.added_latency += 1
+        return source
+
 # BufferizeEndpoints -------------------------------------------------------------------------------
 
 # Add buffers on Endpoints (can be used to improve timings)
@@ -933,3 +1005,125 @@ class BufferizeEndpoints(ModuleTransformer):
                 setattr(submodule, name, buf.source)
             else:
                 raise ValueError
+
+# Simulation Profiler ------------------------------------------------------------------------------
+
+class _EndpointProfile:
+    def __init__(self, name, endpoint):
+        self.name      = name
+        self.endpoint  = endpoint
+        self.cycles    = 0
+        self.transfers = 0
+        self.stalls    = 0 # valid & ~ready.
+        self.starves   = 0 # ~valid & ready.
+        self.packets   = 0
+        self.latencies = [] # Cycles between first and last transfers of each packet.
+        self._start    = None
+
+    def update(self, valid, ready, first, last):
+        self.cycles += 1
+        if valid and ready:
+            self.transfers += 1
+            if first or self._start is None:
+                self._start = self.cycles
+            if last:
+                self.packets += 1
+                self.latencies.append(self.cycles - self._start)
+                self._start = None
+        elif valid:
+            self.stalls += 1
+        elif ready:
+            self.starves += 1
+
+    def to_dict(self):
+        latencies = self.latencies
+        return {
+            "cycles"      : self.cycles,
+            "transfers"   : self.transfers,
+            "stalls"      : self.stalls,
+            "starves"     : self.starves,
+            "throughput"  : self.transfers/self.cycles if self.cycles else 0.0,
+            "packets"     : self.packets,
+            "latency_min" : min(latencies) if latencies else None,
+            "latency_max" : max(latencies) if latencies else None,
+            "latency_avg" : sum(latencies)/len(latencies) if latencies else None,
+        }
+
+
+class StreamProfiler:
+    """Stream Profiler
+
+    Simulation-side equivalent of Monitor: attaches to every Endpoint of a module tree (found with
+    get_endpoints) and counts, for each of them, transfer (valid & ready), stall (valid & ~ready)
+    and starve (~valid & ready) cycles, packets and packet latency (first to last transfer).
+
+    Add profiler.generator() to the generators of the clock domain the endpoints are running in:
+
+        profiler = StreamProfiler(dut)
+        run_simulation(dut, [generator(dut), profiler.generator()])
+        print(profiler.report())
+        profiler.export_json("profile.json")
+    """
+    def __init__(self, module, name="top"):
+        self.module   = module
+        self.name     = name
+        self.profiles = None
+
+    def _collect(self):
+        # Breadth-first walk of the module tree so that endpoints shared between modules (ex:
+        # Pipeline exposing sink/source of its first/last modules) get their shortest name.
+        profiles = []
+        seen     = set()
+        modules  = [(self.name, self.module)]
+        while modules:
+            next_modules = []
+            for prefix, module in modules:
+                for name, endpoint in sorted(get_endpoints(module).items()):
+                    if id(endpoint) not in seen:
+                        seen.add(id(endpoint))
+                        profiles.append(_EndpointProfile(prefix + "." + name, endpoint))
+                for n, (name, submodule) in enumerate(getattr(module, "_submodules", [])):
+                    if name is None:
+                        name = "{}{}".format(submodule.__class__.__name__.lower(), n)
+                    next_modules.append((prefix + "." + name, submodule))
+            modules = next_modules
+        return profiles
+
+    @passive
+    def generator(self):
+        # Collect endpoints on first cycle: the module tree is only complete once finalized.
+        if self.profiles is None:
+            self.profiles = self._collect()
+        signals = [[p.endpoint.valid, p.endpoint.ready, p.endpoint.first, p.endpoint.last]
+            for p in self.profiles]
+        while True:
+            values = yield signals
+            for profile, (valid, ready, first, last) in zip(self.profiles, values):
+                profile.update(valid, ready, first, last)
+            yield
+
+    def get_stats(self):
+        return {p.name: p.to_dict() for p in (self.profiles or [])}
+
+    def report(self, sort_by="stalls", n=None):
+        stats = sorted(self.get_stats().items(), key=lambda kv: kv[1][sort_by], reverse=True)
+        if n is not None:
+            stats = stats[:n]
+        name_width = max([len("Endpoint")] + [len(name) for name, _ in stats])
+        r = "{:<{w}} {:>10} {:>10} {:>10} {:>10} {:>8} {:>8} {:>10}\n".format(
+            "Endpoint", "Transfers", "Stalls", "Starves", "Cycles", "Thrput", "Packets", "Latency",
+            w=name_width)
+        for name, s in stats:
+            latency = "-" if s["latency_avg"] is None else "{:.1f}".format(s["latency_avg"])
+            r += "{:<{w}} {:>10} {:>10} {:>10} {:>10} {:>7.1f}% {:>8} {:>10}\n".format(
+                name, s["transfers"], s["stalls"], s["starves"], s["cycles"],
+                100*s["throughput"], s["packets"], latency,
+                w=name_width)
+        return r
+
+    def export_json(self, filename=None):
+        stats = json.dumps(self.get_stats(), indent=4)
+        if filename is not None:
+            with open(filename, "w") as f:
+                f.write(stats)
+        return stats
@@ -12,7 +12,7 @@
 from math import log2
 
 from functools import reduce
-from operator import or_
+from operator import or_, and_
 
 from migen import *
 from migen.genlib import roundrobin
@@ -249,6 +249,10 @@ class DownConverter(Module):
         Read from master are splitted in N reads to the the slave. Read datas from
         the slave are cached before being presented concatenated on the last access.
 
+    Bursts:
+        The N accesses to the slave are done as an incrementing burst. For master incrementing
+        bursts, the slave burst continues over the master accesses (linear bursts or wrapping bursts
+        when the slave wrap size exists), otherwise ends with the master access.
     """
     def __init__(self, master, slave):
         dw_from = len(master.dat_w)
@@ -259,6 +263,24 @@ class DownConverter(Module):
 
         skip    = Signal()
         counter = Signal(max=ratio)
+        last    = Signal()
+
+        # Burst Control: master wraps of 4/8/16 accesses (bte 1/2/3) are slave wraps of ratio times
+        # more accesses.
+        burst    = Signal()
+        bte      = Signal(2)
+        bte_ok   = Signal()
+        bte_map  = {0: 0}
+        bte_size = {1: 4, 2: 8, 3: 16}
+        for master_bte, size in bte_size.items():
+            for slave_bte, slave_size in bte_size.items():
+                if slave_size == size*ratio:
+                    bte_map[master_bte] = slave_bte
+        self.comb += [
+            last.eq(counter == (ratio - 1)),
+            Case(master.bte, {k: [bte.eq(v), bte_ok.eq(1)] for k, v in bte_map.items()}),
+            burst.eq((master.cti == CTI_BURST_INCREMENTING) & bte_ok),
+        ]
 
         # Control Path
         fsm = FSM(reset_state="IDLE")
@@ -274,6 +296,8 @@ class DownConverter(Module):
         fsm.act("CONVERT",
             slave.adr.eq(Cat(counter, master.adr)),
             Case(counter, {i: slave.sel.eq(master.sel[i*dw_to//8:]) for i in range(ratio)}),
+            slave.cti.eq(Mux(last & ~burst, CTI_BURST_END, CTI_BURST_INCREMENTING)),
+            slave.bte.eq(bte),
             If(master.stb & master.cyc,
                 skip.eq(slave.sel == 0),
                 slave.we.eq(master.we),
@@ -281,9 +305,13 @@ class DownConverter(Module):
                 slave.stb.eq(~skip),
                 If(slave.ack | skip,
                     NextValue(counter, counter + 1),
-                    If(counter == (ratio - 1),
+                    If(last,
                         master.ack.eq(1),
-                        NextState("IDLE")
+                        NextValue(counter, 0),
+                        # Stay in CONVERT to continue the slave burst with the next master access.
+                        If(~burst,
+                            NextState("IDLE")
+                        )
                     )
                 )
             )
@@ -298,24 +326,127 @@ class DownConverter(Module):
         self.sync += If(slave.ack | skip, dat_r.eq(master.dat_r))
 
 class UpConverter(Module):
-    """UpConverter"""
+    """UpConverter
+
+    This module converts Wishbone accesses from a master interface to a larger slave interface.
+
+    Writes:
+        Writes of master incrementing bursts are merged in a write buffer and acked immediately
+        until the last master data word of the slave data word (or the end of the burst), which is
+        then written to the slave in a single access (with the merged sel). The write buffer is
+        also flushed to the slave when the master releases the bus (cyc) or does an access that
+        can't be merged (read, write to another slave data word) before the end of the burst.
+        Since buffered (posted) writes are already acked to the master, a slave error on their
+        flush is lost.
+
+    Reads:
+        Reads of master incrementing bursts are done on the full slave data width and the slave
+        data word is buffered: the next reads of the burst in the same slave data word are acked
+        immediately from the buffer.
+
+    Other accesses are done as single accesses to the slave.
+    """
     def __init__(self, master, slave):
         dw_from = len(master.dat_w)
         dw_to   = len(slave.dat_w)
         ratio   = dw_to//dw_from
+        lanes   = log2_int(ratio)
 
         # # #
 
-        self.comb += master.connect(slave, omit={"adr", "sel", "dat_w", "dat_r"})
-        cases = {}
-        for i in range(ratio):
-            cases[i] = [
-                slave.adr.eq(master.adr[int(log2(ratio)):]),
-                slave.sel[i*dw_from//8:(i+1)*dw_from//8].eq(master.sel),
-                slave.dat_w[i*dw_from:(i+1)*dw_from].eq(master.dat_w),
-                master.dat_r.eq(slave.dat_r[i*dw_from:(i+1)*dw_from]),
+        lane  = Signal(lanes)
+        adr   = Signal(len(slave.adr))
+        burst = Signal()
+        self.comb += [
+            lane.eq(master.adr[:lanes]),
+            adr.eq(master.adr[lanes:]),
+            burst.eq(master.cti == CTI_BURST_INCREMENTING),
+        ]
+
+        # Write Buffer.
+        wr_dat      = Signal(dw_to, reset_less=True)
+        wr_adr      = Signal(len(slave.adr), reset_less=True)
+        wr_sel      = Signal(dw_to//8)
+        wr_dat_next = Signal(dw_to)
+        wr_sel_next = Signal(dw_to//8)
+        wr_posted   = Signal()
+        wr_flush    = Signal()
+        self.comb += [
+            wr_dat_next.eq(wr_dat),
+            wr_sel_next.eq(wr_sel),
+            Case(lane, {i: [
+                wr_dat_next[i*dw_from:(i+1)*dw_from].eq(master.dat_w),
+                wr_sel_next[i*dw_from//8:(i+1)*dw_from//8].eq(master.sel),
+            ] for i in range(ratio)}),
+            wr_posted.eq(burst & (lane != (ratio - 1))),
+            # Flush pending (posted) writes when they can't be merged with the current access.
+            wr_flush.eq((wr_sel != 0) & (~master.cyc | (master.stb & ~(master.we & (adr == wr_adr))))),
+        ]
+
+        # Read Buffer.
+        rd_dat   = Signal(dw_to, reset_less=True)
+        rd_adr   = Signal(len(slave.adr), reset_less=True)
+        rd_valid = Signal()
+        rd_hit   = Signal()
+        rd_sel   = Signal(dw_to//8)
+        dat_r    = Signal(dw_to)
+        self.comb += [
+            rd_hit.eq(rd_valid & (rd_adr == adr)),
+            Case(lane, {i: rd_sel[i*dw_from//8:(i+1)*dw_from//8].eq(master.sel) for i in range(ratio)}),
+            If(burst, rd_sel.eq(2**len(rd_sel) - 1)),
+            dat_r.eq(Mux(rd_hit, rd_dat, slave.dat_r)),
+            Case(lane, {i: master.dat_r.eq(dat_r[i*dw_from:(i+1)*dw_from]) for i in range(ratio)}),
+        ]
+
+        # Control Path.
+        self.comb += [
+            slave.adr.eq(adr),
+            slave.we.eq(master.we),
+            slave.dat_w.eq(wr_dat_next),
+            slave.sel.eq(Mux(master.we, wr_sel_next, rd_sel)),
+            If(wr_flush,
+                slave.adr.eq(wr_adr),
+                slave.we.eq(1),
+                slave.dat_w.eq(wr_dat),
+                slave.sel.eq(wr_sel),
+                slave.cyc.eq(1),
+                slave.stb.eq(1),
+            ).Elif(master.cyc & master.stb,
+                If(master.we & wr_posted,
+                    master.ack.eq(1)
+                ).Elif(~master.we & rd_hit,
+                    master.ack.eq(1)
+                ).Else(
+                    slave.cyc.eq(1),
+                    slave.stb.eq(1),
+                    master.ack.eq(slave.ack),
+                    master.err.eq(slave.err),
+                )
+            )
+        ]
+        self.sync += [
+            If(wr_flush,
+                If(slave.ack | slave.err,
+                    wr_sel.eq(0),
+                )
+            ).Elif(master.cyc & master.stb & (master.ack | master.err),
+                If(master.we,
+                    wr_dat.eq(wr_dat_next),
+                    wr_adr.eq(adr),
+                    wr_sel.eq(Mux(wr_posted, wr_sel_next, 0)),
+                    rd_valid.eq(0),
+                ).Else(
+                    If(~rd_hit,
+                        rd_dat.eq(slave.dat_r),
+                        rd_adr.eq(adr),
+                    ),
+                    rd_valid.eq(burst & master.ack),
+                )
+            ),
+            If(~master.cyc,
+                rd_valid.eq(0),
+            )
         ]
-        self.comb += Case(master.adr[:int(log2(ratio))], cases)
 
 class Converter(Module):
     """Converter
@@ -465,7 +596,14 @@ class SRAM(Module):
 # Wishbone To CSR ----------------------------------------------------------------------------------
 
 class Wishbone2CSR(Module):
-    def __init__(self, bus_wishbone=None, bus_csr=None, register=True):
+    """Wishbone to CSR bridge
+
+    register: Drive the CSR bus from registers.
+    pipelined: Issue accesses on the CSR bus as soon as presented, ack writes immediately (posted
+        writes, one access per cycle) and reads when their data comes back after read_latency cycles
+        (CSR interconnect read latency, see csr_bus.InterconnectHierarchical).
+    """
+    def __init__(self, bus_wishbone=None, bus_csr=None, register=True, pipelined=False, read_latency=1):
         self.csr = bus_csr
         if self.csr is None:
             # If no CSR bus provided, create it with default parameters.
@@ -477,7 +615,29 @@ class Wishbone2CSR(Module):
 
         # # #
 
-        if register:
+        if pipelined:
+            issue   = Signal()
+            pending = Signal(read_latency + int(register)) # Read in flight, shifted until its data.
+            self.comb += [
+                issue.eq(self.wishbone.cyc & self.wishbone.stb & (pending == 0)),
+                self.wishbone.ack.eq((issue & self.wishbone.we) | pending[-1]),
+                self.wishbone.dat_r.eq(self.csr.dat_r),
+            ]
+            self.sync += pending.eq(Cat(issue & ~self.wishbone.we, pending))
+            request = [
+                self.csr.adr.eq(0),
+                self.csr.we.eq(0),
+                self.csr.dat_w.eq(self.wishbone.dat_w),
+                If(issue,
+                    self.csr.adr.eq(self.wishbone.adr),
+                    self.csr.we.eq(self.wishbone.we & (self.wishbone.sel != 0)),
+                )
+            ]
+            if register:
+                self.sync += request
+            else:
+                self.comb += request
+        elif register:
             fsm = FSM(reset_state="IDLE")
             self.submodules += fsm
             fsm.act("IDLE",
@@ -670,3 +830,290 @@ class Cache(Module):
                 )
             )
         )
+
+# Wishbone Set-Associative Cache -------------------------------------------------------------------
+
+class SetAssociativeCache(Module):
+    """SetAssociativeCache
+
+    This module is a N-way set-associative write-back wishbone cache that can be used as a L2 cache
+    in place of Cache when lines aliasing on the same set thrash the direct-mapped version.
+    Cachesize (in 32-bit words) is the size of the data store and must be a power of 2, ways must
+    be a power of 2 and policy selects the replacement policy:
+    - "lru"    : True Least-Recently-Used (per-way age counters).
+    - "plru"   : Tree Pseudo-LRU.
+    - "random" : Pseudo-Random (LFSR).
+    Invalid ways are always refilled first. When the slave is at least as wide as the master, read
+    misses are acked directly from the refill data (early restart) without a new tag lookup.
+    The cache has no flush port: with "lru"/"plru", reading ways distinct lines per set evicts
+    (and writes back) every way, but with "random" no access sequence guarantees it (software
+    flushes by sweeping memory, such as flush_l2_cache, are best effort only).
+    """
+    def __init__(self, cachesize, master, slave, ways=2, policy="lru", reverse=True):
+        self.master = master
+        self.slave  = slave
+
+        # # #
+
+        if policy not in ["lru", "plru", "random"]:
+            raise ValueError("Unsupported replacement policy {}, supported: lru, plru, random".format(policy))
+        if (ways < 1) or (ways & (ways - 1)):
+            raise ValueError("Ways must be a power of 2, got {}".format(ways))
+
+        dw_from = len(master.dat_r)
+        dw_to   = len(slave.dat_r)
+        if dw_to > dw_from and (dw_to % dw_from) != 0:
+            raise ValueError("Slave data width must be a multiple of {dw}".format(dw=dw_from))
+        if dw_to < dw_from and (dw_from % dw_to) != 0:
+            raise ValueError("Master data width must be a multiple of {dw}".format(dw=dw_to))
+
+        # Split address:
+        # TAG | SET NUMBER | LINE OFFSET
+        waybits     = log2_int(ways)
+        offsetbits  = log2_int(max(dw_to//dw_from, 1))
+        addressbits = len(slave.adr) + offsetbits
+        setbits     = log2_int(cachesize) - offsetbits - waybits
+        tagbits     = addressbits - setbits
+        wordbits    = log2_int(max(dw_from//dw_to, 1))
+        if setbits < 1:
+            raise ValueError("Cache size too small for {} ways".format(ways))
+        adr_offset, adr_set, adr_tag = split(master.adr, offsetbits, setbits, tagbits)
+        word = Signal(wordbits) if wordbits else None
+
+        if adr_offset is None:
+            adr_offset_r = None
+        else:
+            adr_offset_r = Signal(offsetbits, reset_less=True)
+            self.sync += adr_offset_r.eq(adr_offset)
+
+        # Way selection
+        hit        = Signal(ways)
+        hit_way    = Signal(max=max(ways, 2))
+        victim_sel = Signal(max=max(ways, 2))
+        victim     = Signal(max=max(ways, 2))
+        way        = Signal(max=max(ways, 2))
+        test_hit   = Signal()
+        self.comb += [
+            If(test_hit & (hit != 0),
+                way.eq(hit_way)
+            ).Elif(test_hit,
+                way.eq(victim_sel)
+            ).Else(
+                way.eq(victim)
+            ),
+            [If(hit[i], hit_way.eq(i)) for i in range(ways)]
+        ]
+
+        # Data/Tag memories (one of each per way)
+        write_from_slave  = Signal()
+        write_from_master = Signal()
+        restart           = Signal()
+        tag_we            = Signal()
+        tag_layout        = [("tag", tagbits), ("dirty", 1), ("valid", 1)]
+        tag_di            = Record(tag_layout)
+        tag_dos           = []
+        data_ports        = []
+        self.comb += [
+            write_from_master.eq(master.cyc & master.stb & master.we & master.ack),
+            tag_di.tag.eq(adr_tag),
+            tag_di.valid.eq(1),
+        ]
+        for i in range(ways):
+            data_mem  = Memory(dw_to*2**wordbits, 2**setbits)
+            data_port = data_mem.get_port(write_capable=True, we_granularity=8)
+            tag_mem   = Memory(layout_len(tag_layout), 2**setbits)
+            tag_port  = tag_mem.get_port(write_capable=True)
+            self.specials += data_mem, data_port, tag_mem, tag_port
+            tag_do = Record(tag_layout)
+            self.comb += [
+                data_port.adr.eq(adr_set),
+                If(write_from_slave,
+                    displacer(slave.dat_r, word, data_port.dat_w),
+                    If(way == i,
+                        displacer(Replicate(1, dw_to//8), word, data_port.we)
+                    )
+                ).Else(
+                    data_port.dat_w.eq(Replicate(master.dat_w, max(dw_to//dw_from, 1))),
+                    If(write_from_master & (way == i),
+                        displacer(master.sel, adr_offset, data_port.we, 2**offsetbits, reverse=reverse)
+                    )
+                ),
+                tag_port.adr.eq(adr_set),
+                tag_port.we.eq(tag_we & (way == i)),
+                tag_port.dat_w.eq(tag_di.raw_bits()),
+                tag_do.raw_bits().eq(tag_port.dat_r),
+                hit[i].eq(tag_do.valid & (tag_do.tag == adr_tag)),
+            ]
+            tag_dos.append(tag_do)
+            data_ports.append(data_port)
+
+        data_r    = Signal(dw_to*2**wordbits)
+        way_tag   = Signal(tagbits)
+        way_dirty = Signal()
+        way_valid = Signal()
+        self.comb += [
+            data_r.eq(Array(port.dat_r for port in data_ports)[way]),
+            way_tag.eq(Array(tag_do.tag for tag_do in tag_dos)[way]),
+            way_dirty.eq(Array(tag_do.dirty for tag_do in tag_dos)[way]),
+            way_valid.eq(Array(tag_do.valid for tag_do in tag_dos)[way]),
+            chooser(data_r, word, slave.dat_w),
+            slave.sel.eq(2**(dw_to//8)-1),
+            If(restart,
+                chooser(slave.dat_r, adr_offset_r, master.dat_r, reverse=reverse)
+            ).Else(
+                chooser(data_r, adr_offset_r, master.dat_r, reverse=reverse)
+            )
+        ]
+
+        # Replacement policy
+        repl_we = Signal()
+        if ways > 1:
+            if policy == "random":
+                lfsr = Signal(16, reset=1)
+                self.sync += lfsr.eq(Cat(lfsr[1:], lfsr[0] ^ lfsr[2] ^ lfsr[3] ^ lfsr[5]))
+                self.comb += victim_sel.eq(lfsr[:waybits])
+            else:
+                if policy == "lru":
+                    # Per-way ages, 0: most recently used, ways-1: least recently used.
+                    repl_bits = ways*waybits
+                    repl_init = sum(i << (i*waybits) for i in range(ways))
+                else:
+                    # Binary tree, each node points to the next victim (0: left, 1: right).
+                    repl_bits = ways - 1
+                    repl_init = 0
+                repl_mem  = Memory(repl_bits, 2**setbits, init=[repl_init]*2**setbits)
+                repl_port = repl_mem.get_port(write_capable=True)
+                self.specials += repl_mem, repl_port
+                repl_do = repl_port.dat_r
+                repl_di = repl_port.dat_w
+                self.comb += [
+                    repl_port.adr.eq(adr_set),
+                    repl_port.we.eq(repl_we),
+                    repl_di.eq(repl_do),
+                ]
+                if policy == "lru":
+                    ages     = [repl_do[i*waybits:(i+1)*waybits] for i in range(ways)]
+                    ages_new = [repl_di[i*waybits:(i+1)*waybits] for i in range(ways)]
+                    self.comb += [If(ages[i] == (ways - 1), victim_sel.eq(i)) for i in range(ways)]
+                    cases = {}
+                    for i in range(ways):
+                        cases[i] = [ages_new[i].eq(0)]
+                        for j in range(ways):
+                            if j != i:
+                                cases[i].append(If(ages[j] < ages[i], ages_new[j].eq(ages[j] + 1)))
+                    self.comb += Case(way, cases)
+                else:
+                    def tree_path(i):
+                        path, node = [], 0
+                        for level in range(waybits):
+                            bit = (i >> (waybits - 1 - level)) & 1
+                            path.append((node, bit))
+                            node = 2*node + 1 + bit
+                        return path
+                    cases = {}
+                    for i in range(ways):
+                        path = tree_path(i)
+                        self.comb += If(reduce(and_, [repl_do[n] == b for n, b in path]), victim_sel.eq(i))
+                        cases[i] = [repl_di[n].eq(~b) for n, b in path]
+                    self.comb += Case(way, cases)
+        # Invalid ways are refilled first.
+        self.comb += [If(~tag_dos[i].valid, victim_sel.eq(i)) for i in reversed(range(ways))]
+
+        # Slave address
+        evict     = Signal()
+        slave_tag = Signal(tagbits)
+        self.comb += If(evict, slave_tag.eq(way_tag)).Else(slave_tag.eq(adr_tag))
+        if word is not None:
+            self.comb += slave.adr.eq(Cat(word, adr_set, slave_tag))
+        else:
+            self.comb += slave.adr.eq(Cat(adr_set, slave_tag))
+
+        # slave word computation, word_clr and word_inc will be simplified
+        # at synthesis when wordbits=0
+        word_clr = Signal()
+        word_inc = Signal()
+        if word is not None:
+            self.sync += \
+                If(word_clr,
+                    word.eq(0),
+                ).Elif(word_inc,
+                    word.eq(word+1)
+                )
+
+        def word_is_last(word):
+            if word is not None:
+                return word == 2**wordbits-1
+            else:
+                return 1
+
+        # Early restart is only possible when the refilled slave word contains the master word.
+        if word is None:
+            refill_done = [
+                If(~master.we,
+                    restart.eq(1),
+                    master.ack.eq(1),
+                    repl_we.eq(1),
+                    NextState("IDLE")
+                ).Else(
+                    NextState("TEST_HIT")
+                )
+            ]
+        else:
+            refill_done = [NextState("TEST_HIT")]
+
+        # Control FSM
+        self.submodules.fsm = fsm = FSM(reset_state="IDLE")
+        fsm.act("IDLE",
+            If(master.cyc & master.stb,
+                NextState("TEST_HIT")
+            )
+        )
+        fsm.act("TEST_HIT",
+            test_hit.eq(1),
+            word_clr.eq(1),
+            If(hit != 0,
+                master.ack.eq(1),
+                repl_we.eq(1),
+                If(master.we,
+                    tag_di.dirty.eq(1),
+                    tag_we.eq(1)
+                ),
+                NextState("IDLE")
+            ).Else(
+                NextValue(victim, victim_sel),
+                If(way_valid & way_dirty,
+                    NextState("EVICT")
+                ).Else(
+                    NextState("REFILL")
+                )
+            )
+        )
+        fsm.act("EVICT",
+            evict.eq(1),
+            slave.stb.eq(1),
+            slave.cyc.eq(1),
+            slave.we.eq(1),
+            If(slave.ack,
+                word_inc.eq(1),
+                If(word_is_last(word),
+                    word_clr.eq(1),
+                    NextState("REFILL")
+                )
+            )
+        )
+        fsm.act("REFILL",
+            slave.stb.eq(1),
+            slave.cyc.eq(1),
+            slave.we.eq(0),
+            If(slave.ack,
+                write_from_slave.eq(1),
+                word_inc.eq(1),
+                If(word_is_last(word),
+                    # Write the tag once the whole line has been refilled.
+                    tag_we.eq(1),
+                    *refill_done
+                ).Else(
+                    NextState("REFILL")
+                )
+            )
+        )
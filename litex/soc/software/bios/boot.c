@@ -25,6 +25,7 @@
 
 #include <libbase/console.h>
 #include <libbase/crc.h>
+#include <libbase/lz4.h>
 #include <libbase/jsmn.h>
 #include <libbase/progress.h>
 
@@ -584,6 +585,7 @@ void netboot(int nb_params, char **params)
 
 #ifdef FLASH_BOOT_ADDRESS
 
+#ifndef MAIN_RAM_BASE
 static unsigned int check_image_in_flash(unsigned int base_address)
 {
 	uint32_t length;
@@ -605,43 +607,283 @@ static unsigned int check_image_in_flash(unsigned int base_address)
 
 	return length;
 }
+#endif
+
+#define FLASH_COPY_BLOCK_SIZE 0x8000 /* 32KB blocks */
+
+#ifdef CSR_SPIFLASH_DMA_READER_BASE
+
+/* SPI Flash DMA (see add_spi_flash with_dma): copies bus words from the Flash to RAM. */
+#define FLASH_DMA_WORD_SIZE (CONFIG_BUS_DATA_WIDTH/8)
+
+static void flash_dma_start(unsigned long ram_address, unsigned long flash_address, uint32_t length)
+{
+	spiflash_dma_reader_enable_write(0);
+	spiflash_dma_writer_enable_write(0);
+	spiflash_dma_reader_base_write((uint64_t) flash_address);
+	spiflash_dma_reader_length_write(length);
+	spiflash_dma_writer_base_write((uint64_t) ram_address);
+	spiflash_dma_writer_length_write(length);
+	spiflash_dma_writer_enable_write(1);
+	spiflash_dma_reader_enable_write(1);
+}
+
+static void flash_dma_wait(void)
+{
+	while ((spiflash_dma_writer_done_read() & 0x1) == 0);
+#ifndef CONFIG_CPU_HAS_DMA_BUS
+	/* Flush caches */
+	flush_cpu_dcache();
+	flush_l2_cache();
+#endif
+}
+
+#endif
+
+/* Starts the copy of a block from Flash to RAM: with the DMA when available (the CPU only copying
+ * the unaligned tail after flash_copy_wait), with the CPU otherwise.
+ */
+static void flash_copy_start(unsigned long ram_address, unsigned long flash_address, uint32_t length, int dma)
+{
+#ifdef CSR_SPIFLASH_DMA_READER_BASE
+	if (dma) {
+		length &= ~(FLASH_DMA_WORD_SIZE - 1);
+		if (length > 0)
+			flash_dma_start(ram_address, flash_address, length);
+		return;
+	}
+#endif
+	memcpy((void *) ram_address, (void *) flash_address, length);
+}
+
+static void flash_copy_wait(unsigned long ram_address, unsigned long flash_address, uint32_t length, int dma)
+{
+#ifdef CSR_SPIFLASH_DMA_READER_BASE
+	uint32_t dma_length;
+	if (dma) {
+		dma_length = length & ~(FLASH_DMA_WORD_SIZE - 1);
+		if (dma_length > 0)
+			flash_dma_wait();
+		memcpy((void *) (ram_address + dma_length), (void *) (flash_address + dma_length), length - dma_length);
+	}
+#endif
+}
+
+#ifdef CSR_TIMER0_BASE
+static uint32_t flash_copy_timer_start(void)
+{
+	timer0_en_write(0);
+	timer0_reload_write(0);
+	timer0_load_write(0xffffffff);
+	timer0_en_write(1);
+	timer0_update_value_write(1);
+	return timer0_value_read();
+}
+
+static void flash_copy_print_speed(uint32_t start, uint32_t length)
+{
+	uint64_t cycles;
+	uint64_t speed;
+
+	timer0_update_value_write(1);
+	cycles = (uint64_t) start - (uint64_t) timer0_value_read();
+	if (cycles == 0)
+		return;
+	speed = ((uint64_t) length)*((uint64_t) CONFIG_CLOCK_FREQUENCY)/cycles; /* Bytes/s */
+	printf("Copied %d bytes in %lu ms (%lu.%02lu MB/s)\n", length,
+		(unsigned long) (cycles*1000/CONFIG_CLOCK_FREQUENCY),
+		(unsigned long) (speed/1000000),
+		(unsigned long) ((speed/10000)%100));
+}
+#endif
+
+/* Copies length bytes from Flash to RAM in a single pass and returns the CRC32 of the copied data.
+ *
+ * The Flash is copied by large blocks and the CRC is computed on the RAM copy (faster than re-reading
+ * the Flash). With the SPI Flash DMA, the CRC of a block is computed while the next one is copied.
+ */
+static uint32_t copy_from_flash(unsigned long ram_address, unsigned long flash_address, uint32_t length)
+{
+	uint32_t offset;
+	uint32_t chunk_length;
+	uint32_t crc;
+	int dma;
+#ifdef CSR_TIMER0_BASE
+	uint32_t start;
+
+	start = flash_copy_timer_start();
+#endif
+
+	dma = 0;
+#ifdef CSR_SPIFLASH_DMA_READER_BASE
+	/* DMA requires bus-word aligned addresses. */
+	dma = ((ram_address | flash_address) & (FLASH_DMA_WORD_SIZE - 1)) == 0;
+#endif
+
+	crc    = 0;
+	offset = 0;
+	init_progression_bar(length);
+	if (length > 0)
+		flash_copy_start(ram_address, flash_address, min(length, FLASH_COPY_BLOCK_SIZE), dma);
+	while (offset < length) {
+		chunk_length = min(length - offset, FLASH_COPY_BLOCK_SIZE);
+		flash_copy_wait(ram_address + offset, flash_address + offset, chunk_length, dma);
+		/* Start copy of the next block and compute CRC of the current one. */
+		if (offset + chunk_length < length)
+			flash_copy_start(ram_address + offset + chunk_length, flash_address + offset + chunk_length,
+				min(length - offset - chunk_length, FLASH_COPY_BLOCK_SIZE), dma);
+		crc = crc32_update(crc, (unsigned char *) (ram_address + offset), chunk_length);
+		offset += chunk_length;
+		show_progress(offset);
+	}
+	show_progress(offset);
+	printf("\n");
+#ifdef CSR_TIMER0_BASE
+	flash_copy_print_speed(start, length);
+#endif
+
+	return crc;
+}
+
+/* Checks that a payload fits in Main RAM (before writing it). */
+static int flash_boot_range_valid(unsigned long address, uint32_t size)
+{
+#ifdef MAIN_RAM_BASE
+	if ((address >= MAIN_RAM_BASE) &&
+		(size <= MAIN_RAM_SIZE) &&
+		((address - MAIN_RAM_BASE) <= (MAIN_RAM_SIZE - size)))
+		return 1;
+#endif
+	printf("Error: 0x%08lx-0x%08lx is outside Main RAM\n", address, address + size);
+	return 0;
+}
 
 #if defined(MAIN_RAM_BASE) && defined(FLASH_BOOT_ADDRESS)
 static int copy_image_from_flash_to_ram(unsigned int flash_address, unsigned long ram_address)
 {
 	uint32_t length;
+	uint32_t crc;
+	uint32_t got_crc;
+
+	/* Length is not covered by the CRC: check it before copying. */
+	length = MMPTR(flash_address);
+	if((length < 32) || (length > 16*1024*1024)) {
+		printf("Error: Invalid image length 0x%08x\n", length);
+		return 0;
+	}
+	if(!flash_boot_range_valid(ram_address, length))
+		return 0;
+
+	/* Copy and check CRC in a single pass over the Flash. */
+	printf("Copying 0x%08x to 0x%08lx (%d bytes)...\n", flash_address, ram_address, length);
+	crc     = MMPTR(flash_address + 4);
+	got_crc = copy_from_flash(ram_address, flash_address + 8, length);
+	if(crc != got_crc) {
+		printf("CRC failed (expected %08x, got %08x)\n", crc, got_crc);
+		return 0;
+	}
+
+	return 1;
+}
+#endif
+
+/* Multi-payload boot image (see mkmscimg.py --boot-image): header, entries and payloads (optionally
+ * LZ4 compressed), each payload being loaded to its address before booting with the header's args.
+ */
+
+#define BOOT_IMAGE_MAGIC        0x4c584249 /* "LXBI" */
+#define BOOT_IMAGE_FLAG_LZ4     (1 << 0)
+#define BOOT_IMAGE_MAX_PAYLOADS 16
+
+struct boot_image_header {
+	uint32_t magic;
+	uint32_t count;
+	uint32_t r1;
+	uint32_t r2;
+	uint32_t r3;
+	uint32_t addr;
+	uint32_t reserved;
+	uint32_t crc;
+};
+
+struct boot_image_entry {
 	uint32_t offset;
+	uint32_t length;
+	uint32_t size;
+	uint32_t address;
+	uint32_t crc;
+	uint32_t flags;
+};
+
+/* Returns 0 when no boot image is present, -1 on errors (does not return on success). */
+static int flashboot_image(unsigned long base_address)
+{
+	struct boot_image_header header;
+	struct boot_image_entry entry;
+	unsigned long entries_address;
+	unsigned int lz4_crc;
+	uint32_t crc;
+	uint32_t i;
 
-	length = check_image_in_flash(flash_address);
-	if(length > 0) {
-		printf("Copying 0x%08x to 0x%08lx (%d bytes)...\n", flash_address, ram_address, length);
-		offset = 0;
-		init_progression_bar(length);
-		while (length > 0) {
-			uint32_t chunk_length;
-			chunk_length = min(length, 0x8000); /* 32KB chunks */
-			memcpy((void *) ram_address + offset, (void*) flash_address + offset + 8, chunk_length);
-			offset += chunk_length;
-			length -= chunk_length;
-			show_progress(offset);
+	memcpy(&header, (void *) base_address, sizeof(header));
+	if (header.magic != BOOT_IMAGE_MAGIC)
+		return 0;
+	if (header.count > BOOT_IMAGE_MAX_PAYLOADS) {
+		printf("Error: Invalid boot image payloads count %d\n", header.count);
+		return -1;
+	}
+
+	/* Check Header/Entries */
+	entries_address = base_address + sizeof(header);
+	crc = crc32((unsigned char *) &header, sizeof(header) - sizeof(header.crc));
+	crc = crc32_update(crc, (unsigned char *) entries_address, header.count*sizeof(entry));
+	if (crc != header.crc) {
+		printf("Boot image header CRC failed (expected %08x, got %08x)\n", header.crc, crc);
+		return -1;
+	}
+
+	/* Load Payloads */
+	for (i=0; i<header.count; i++) {
+		memcpy(&entry, (void *) (entries_address + i*sizeof(entry)), sizeof(entry));
+		printf("Loading payload %d to 0x%08x (%d bytes%s)...\n", i, entry.address, entry.size,
+			(entry.flags & BOOT_IMAGE_FLAG_LZ4) ? ", LZ4" : "");
+		/* Payload executed in place (XIP) from Flash: only check CRC. */
+		if (!(entry.flags & BOOT_IMAGE_FLAG_LZ4) && (entry.address == base_address + entry.offset))
+			crc = crc32((unsigned char *) (base_address + entry.offset), entry.length);
+		else {
+			if (!flash_boot_range_valid(entry.address, entry.size))
+				return -1;
+			/* Decompress and check CRC in a single pass over the Flash. */
+			if (entry.flags & BOOT_IMAGE_FLAG_LZ4) {
+				lz4_crc = 0;
+				if (lz4_decompress_crc((unsigned char *) (base_address + entry.offset), entry.length,
+					(unsigned char *) (unsigned long) entry.address, entry.size, &lz4_crc) != (int) entry.size) {
+					printf("Decompression failed\n");
+					return -1;
+				}
+				crc = lz4_crc;
+			}
+			/* Copy and check CRC in a single pass over the Flash. */
+			else
+				crc = copy_from_flash(entry.address, base_address + entry.offset, entry.length);
+		}
+		if (crc != entry.crc) {
+			printf("CRC failed (expected %08x, got %08x)\n", entry.crc, crc);
+			return -1;
 		}
-		show_progress(offset);
-		printf("\n");
-		return 1;
 	}
 
-	return 0;
+	boot(header.r1, header.r2, header.r3, header.addr);
 }
-#endif
 
 void flashboot(void)
 {
-	uint32_t length;
+#ifdef MAIN_RAM_BASE
 	uint32_t result;
+#endif
 
 	printf("Booting from flash...\n");
-	length = check_image_in_flash(FLASH_BOOT_ADDRESS);
-	if(!length)
+	if (flashboot_image(FLASH_BOOT_ADDRESS) < 0)
 		return;
 
 #ifdef MAIN_RAM_BASE
@@ -654,6 +896,8 @@ void flashboot(void)
 #else
 	/* When Main RAM is not available, execute the code directly from Flash (XIP).
        The code starts after (a) length and (b) CRC -- both uint32_t */
+	if(!check_image_in_flash(FLASH_BOOT_ADDRESS))
+		return;
 	boot(0, 0, 0, (FLASH_BOOT_ADDRESS + 2 * sizeof(uint32_t)));
 #endif
 }
@@ -7,6 +7,8 @@ extern "C" {
 
 unsigned short crc16(const unsigned char *buffer, int len);
 unsigned int crc32(const unsigned char *buffer, unsigned int len);
+/* CRC-32 of buffer continuing crc (CRC-32 of the previous data, 0 initially). */
+unsigned int crc32_update(unsigned int crc, const unsigned char *buffer, unsigned int len);
 
 #ifdef __cplusplus
 }
@@ -66,10 +66,8 @@ static const unsigned int crc_table[256] = {
 #define DO4(buf)  DO2(buf); DO2(buf);
 #define DO8(buf)  DO4(buf); DO4(buf);
 
-unsigned int crc32(const unsigned char *buffer, unsigned int len)
+unsigned int crc32_update(unsigned int crc, const unsigned char *buffer, unsigned int len)
 {
-	unsigned int crc;
-	crc = 0;
 	crc = crc ^ 0xffffffffL;
 	while(len >= 8) {
 		DO8(buffer);
@@ -81,12 +79,12 @@ unsigned int crc32(const unsigned char *buffer, unsigned int len)
 	return crc ^ 0xffffffffL;
 }
 #else
-unsigned int crc32(const unsigned char *message, unsigned int len) {
+unsigned int crc32_update(unsigned int crc, const unsigned char *message, unsigned int len) {
    int i, j;
-   unsigned int byte, crc, mask;
+   unsigned int byte, mask;
 
    i = 0;
-   crc = 0xFFFFFFFF;
+   crc = ~crc;
    while (i < len) {
       byte = message[i];            // Get next byte.
       crc = crc ^ byte;
@@ -99,3 +97,8 @@ unsigned int crc32(const unsigned char *message, unsigned int len) {
    return ~crc;
 }
 #endif
+
+unsigned int crc32(const unsigned char *buffer, unsigned int len)
+{
+	return crc32_update(0, buffer, len);
+}
@@ -0,0 +1,99 @@
+// This file is part of LiteX.
+// License: BSD
+
+#include <string.h>
+
+#include "crc.h"
+#include "lz4.h"
+
+/* LZ4 block decompression:
+ * Sequences of: token (literals length:4, match length - 4:4), literals length extension bytes,
+ * literals, match offset (16-bit little endian), match length extension bytes. The last sequence
+ * only has literals.
+ */
+
+/* CRC-32 of the consumed source bytes (when requested), computed from local/destination copies so that
+ * the source is only read once.
+ */
+static void lz4_crc(unsigned int *crc, const unsigned char *buffer, unsigned int len)
+{
+	if (crc)
+		*crc = crc32_update(*crc, buffer, len);
+}
+
+static int lz4_get_length(const unsigned char **src, const unsigned char *src_end, unsigned int *length, unsigned int *crc)
+{
+	unsigned char b;
+	if (*length != 15)
+		return 0;
+	do {
+		if (*src >= src_end)
+			return -1;
+		b = *(*src)++;
+		lz4_crc(crc, &b, 1);
+		*length += b;
+	} while (b == 255);
+	return 0;
+}
+
+int lz4_decompress_crc(const unsigned char *src, unsigned int src_len, unsigned char *dst, unsigned int dst_len, unsigned int *crc)
+{
+	const unsigned char *src_end = src + src_len;
+	unsigned char *dst_start = dst;
+	unsigned char *dst_end   = dst + dst_len;
+	const unsigned char *match;
+	unsigned char token;
+	unsigned char offset_bytes[2];
+	unsigned int length;
+	unsigned int offset;
+
+	while (src < src_end) {
+		token = *src++;
+		lz4_crc(crc, &token, 1);
+
+		/* Literals */
+		length = token >> 4;
+		if (lz4_get_length(&src, src_end, &length, crc) < 0)
+			return -1;
+		if ((length > (unsigned int)(src_end - src)) || (length > (unsigned int)(dst_end - dst)))
+			return -1;
+		memcpy(dst, src, length);
+		lz4_crc(crc, dst, length);
+		dst += length;
+		src += length;
+		if (src == src_end)
+			break; /* Last sequence */
+
+		/* Match */
+		if ((src_end - src) < 2)
+			return -1;
+		offset_bytes[0] = *src++;
+		offset_bytes[1] = *src++;
+		lz4_crc(crc, offset_bytes, 2);
+		offset = offset_bytes[0] | (offset_bytes[1] << 8);
+		if ((offset == 0) || (offset > (unsigned int)(dst - dst_start)))
+			return -1;
+		length = token & 0xf;
+		if (lz4_get_length(&src, src_end, &length, crc) < 0)
+			return -1;
+		length += 4;
+		if (length > (unsigned int)(dst_end - dst))
+			return -1;
+		match = dst - offset;
+		if (offset >= length) {
+			memcpy(dst, match, length);
+			dst += length;
+		} else {
+			/* Overlapping match: repeat the last offset bytes. */
+			while (length--)
+				*dst++ = *match++;
+		}
+	}
+
+	return dst - dst_start;
+}
+
+int lz4_decompress(const unsigned char *src, unsigned int src_len, unsigned char *dst, unsigned int dst_len)
+{
+	return lz4_decompress_crc(src, src_len, dst, dst_len, NULL);
+}
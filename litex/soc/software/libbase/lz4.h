@@ -0,0 +1,22 @@
+#ifndef __LZ4_H
+#define __LZ4_H
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+/* Decompress a LZ4 block (raw block format, no frame) of src_len bytes from src to dst (of dst_len
+ * bytes). Returns the decompressed length or -1 if the block is invalid or does not fit in dst.
+ */
+int lz4_decompress(const unsigned char *src, unsigned int src_len, unsigned char *dst, unsigned int dst_len);
+
+/* Same as lz4_decompress, also computing the CRC-32 of the src bytes in crc (continued from its initial
+ * value, 0 for a new CRC) while reading them (src is only read once, e.g. from SPI Flash).
+ */
+int lz4_decompress_crc(const unsigned char *src, unsigned int src_len, unsigned char *dst, unsigned int dst_len, unsigned int *crc);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif
@@ -8,6 +8,8 @@ void flush_l2_cache(void)
 {
 #ifdef CONFIG_L2_SIZE
 	unsigned int i;
+	/* Sweep twice the L2 size: each set sees 2 x ways accesses, evicting every way with LRU/PLRU
+	 * replacement policies (only best effort with the Random policy, the L2 has no flush port). */
 	for(i=0;i<2*CONFIG_L2_SIZE/4;i++) {
 		((volatile unsigned int *) MAIN_RAM_BASE)[i];
 	}
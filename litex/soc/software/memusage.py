@@ -3,61 +3,378 @@
 # This file is Copyright (c) 2020 Franck Jullien <franck.jullien@gmail.com>
 # License: BSD
 
-import subprocess
+"""Memory usage of a LiteX software (BIOS, ...).
+
+Reads the ELF section/program/symbol tables directly (no toolchain process) and the GNU ld map file
+(-Wl,-Map) when available to attribute the size of each memory region (from regions.ld) to the
+libraries (libbase, liblitedram, libfatfs, ...), objects and symbols. Reports can be exported to
+JSON and compared with the ones of a previous build.
+"""
+
+import os
+import re
+import sys
+import json
+import struct
+import bisect
 import argparse
 
-def print_usage(bios,regions, triple):
-    rom_usage = 0
-    ram_usage = 0
-
-    readelf = triple + "-readelf"
-
-    result = subprocess.run([readelf, '-e', '-W', bios], stdout=subprocess.PIPE)
-    result = result.stdout.decode('utf-8')
-    result = result.split('\n')
-
-    with open(regions, "r") as regfile:
-        for line in regfile:
-           if line == 0:
-               break
-           if 'rom' in line:
-               rom_size = int(line.split(' ')[-1], 16)
-           if 'sram' in line:
-               ram_size = int(line.split(' ')[-1], 16)
-
-    for line in result:
-        if '.text' in line:
-            if 'PROGBITS' in line:
-                tokens = list(filter(None,line.split(' ')))
-                rom_usage += int(tokens[6], 16)
-        if '.rodata' in line:
-            if 'PROGBITS' in line:
-                tokens = list(filter(None,line.split(' ')))
-                rom_usage += int(tokens[6], 16)
-        if '.data' in line:
-            if 'PROGBITS' in line:
-                tokens = list(filter(None,line.split(' ')))
-                rom_usage += int(tokens[6], 16)
-        if '.commands' in line:
-            if 'PROGBITS' in line:
-                tokens = list(filter(None,line.split(' ')))
-                rom_usage += int(tokens[6], 16)
-        if '.bss' in line:
-            if 'NOBITS' in line:
-                tokens = list(filter(None,line.split(' ')))
-                ram_usage += int(tokens[6], 16)
-
-    print("\nROM usage: {:.2f}KiB \t({:.2f}%)".format(rom_usage / 1024.0, rom_usage / rom_size * 100.0))
-    print("RAM usage: {:.2f}KiB \t({:.2f}%)\n".format(ram_usage / 1024.0, ram_usage / ram_size * 100.0))
+# ELF ----------------------------------------------------------------------------------------------
+
+SHT_PROGBITS = 1
+SHT_SYMTAB   = 2
+SHT_NOBITS   = 8
+
+SHF_WRITE     = 0x1
+SHF_ALLOC     = 0x2
+SHF_EXECINSTR = 0x4
+
+STT_OBJECT = 1
+STT_FUNC   = 2
+
+PT_LOAD = 1
+
+class ELFError(Exception):
+    pass
+
+
+class ELFSection:
+    def __init__(self, name, type, flags, addr, offset, size, link):
+        self.name   = name
+        self.type   = type
+        self.flags  = flags
+        self.addr   = addr
+        self.offset = offset
+        self.size   = size
+        self.link   = link
+        self.lma    = addr
+
+    @property
+    def alloc(self):
+        return bool(self.flags & SHF_ALLOC)
+
+    @property
+    def loaded(self):
+        # Contents stored in the image (at LMA).
+        return self.alloc and self.type != SHT_NOBITS
+
+
+class ELFSymbol:
+    def __init__(self, name, value, size, type, bind, shndx):
+        self.name  = name
+        self.value = value
+        self.size  = size
+        self.type  = type
+        self.bind  = bind
+        self.shndx = shndx
+
+
+class ELFFile:
+    """Minimal ELF32/ELF64 (little/big endian) reader: sections, LMAs and symbols."""
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            self.data = f.read()
+        if self.data[:4] != b"\x7fELF":
+            raise ELFError("{} is not an ELF file.".format(filename))
+        self.is64   = {1: False, 2: True}[self.data[4]]
+        self.endian = {1: "<", 2: ">"}[self.data[5]]
+        if self.is64:
+            header = self._unpack("HHIQQQIHHHHHH", 16)
+        else:
+            header = self._unpack("HHIIIIIHHHHHH", 16)
+        (_, _, _, _, phoff, shoff, _, _, phentsize, phnum, shentsize, shnum, shstrndx) = header
+        self.sections = self._parse_sections(shoff, shentsize, shnum, shstrndx)
+        self._set_sections_lma(phoff, phentsize, phnum)
+        self.symbols  = self._parse_symbols()
+
+    def _unpack(self, fmt, offset):
+        return struct.unpack_from(self.endian + fmt, self.data, offset)
+
+    def _get_string(self, offset):
+        return self.data[offset:self.data.index(b"\0", offset)].decode("utf-8", errors="replace")
+
+    def _parse_sections(self, shoff, shentsize, shnum, shstrndx):
+        fmt = "IIQQQQIIQQ" if self.is64 else "IIIIIIIIII"
+        headers = [self._unpack(fmt, shoff + i*shentsize) for i in range(shnum)]
+        shstroff = headers[shstrndx][4] if shnum else 0
+        sections = []
+        for (name, type, flags, addr, offset, size, link, _, _, _) in headers:
+            sections.append(ELFSection(self._get_string(shstroff + name), type, flags, addr, offset, size, link))
+        return sections
+
+    def _set_sections_lma(self, phoff, phentsize, phnum):
+        for i in range(phnum):
+            if self.is64:
+                (type, _, offset, vaddr, paddr, filesz, memsz, _) = self._unpack("IIQQQQQQ", phoff + i*phentsize)
+            else:
+                (type, offset, vaddr, paddr, filesz, memsz, _, _) = self._unpack("IIIIIIII", phoff + i*phentsize)
+            if type != PT_LOAD:
+                continue
+            for section in self.sections:
+                if section.loaded and (offset <= section.offset < offset + max(filesz, 1)):
+                    section.lma = section.offset - offset + paddr
+
+    def _parse_symbols(self):
+        symbols = []
+        for section in self.sections:
+            if section.type != SHT_SYMTAB:
+                continue
+            stroff = self.sections[section.link].offset
+            for offset in range(section.offset, section.offset + section.size, 24 if self.is64 else 16):
+                if self.is64:
+                    (name, info, _, shndx, value, size) = self._unpack("IBBHQQ", offset)
+                else:
+                    (name, value, size, info, _, shndx) = self._unpack("IIIBBH", offset)
+                symbols.append(ELFSymbol(self._get_string(stroff + name), value, size, info & 0xf, info >> 4, shndx))
+        return symbols
+
+# Linker Map/Regions -------------------------------------------------------------------------------
+
+_map_input_section = re.compile(r"^ (\S+)?\s+0x([0-9a-fA-F]+)\s+0x([0-9a-fA-F]+)\s+(\S.*)$")
+_map_section_name  = re.compile(r"^ (\S+)$")
+
+def parse_linker_map(filename):
+    """Returns the input sections [(address, size, object)] from a GNU ld map file."""
+    inputs = []
+    name   = None
+    mapped = False
+    with open(filename, "r", errors="replace") as f:
+        for line in f:
+            line = line.rstrip("\n")
+            if not mapped:
+                # Skip discarded input sections/memory configuration.
+                mapped = line.startswith("Linker script and memory map")
+                continue
+            m = _map_input_section.match(line)
+            if m is not None:
+                section = m.group(1) or name
+                name    = None
+                if section is None or section.startswith("*"):
+                    continue # Output section/*fill*.
+                address, size = int(m.group(2), 16), int(m.group(3), 16)
+                if size:
+                    inputs.append((address, size, m.group(4).strip()))
+                continue
+            m = _map_section_name.match(line)
+            name = m.group(1) if m is not None else None
+    return inputs
+
+def parse_linker_regions(filename):
+    """Returns the memory regions {name: (origin, length)} from a regions.ld file."""
+    regions = {}
+    with open(filename, "r") as f:
+        for m in re.finditer(r"(\w+)\s*:\s*ORIGIN\s*=\s*(0x[0-9a-fA-F]+|\d+)\s*,\s*LENGTH\s*=\s*(0x[0-9a-fA-F]+|\d+)", f.read()):
+            regions[m.group(1)] = (int(m.group(2), 0), int(m.group(3), 0))
+    return regions
+
+def get_library(obj, default):
+    """Library of a map object: ../libbase/libbase.a(uart.o) -> libbase, other objects -> default."""
+    m = re.match(r"^(.*)\((.*)\)$", obj)
+    if m is None:
+        return default, os.path.basename(obj)
+    return os.path.splitext(os.path.basename(m.group(1)))[0], m.group(2)
+
+# Memory Usage -------------------------------------------------------------------------------------
+
+def get_memusage(elf_filename, regions=None, map_filename=None):
+    """Returns the memory usage of an ELF as a JSON-serializable dict.
+
+    - regions: used/size of each memory region (from regions.ld, else a single "all" region).
+    - sections: size/address/load address/regions of each allocated section.
+    - libraries: size in each region of each library, and of their objects (requires the map file).
+    - symbols: functions/objects with their size, section, regions and library (when known).
+
+    Sections with contents (.data, ...) are accounted to both their run-time region (VMA) and to the
+    region storing them (LMA), ie .data is accounted to ROM and RAM.
+    """
+    elf     = ELFFile(elf_filename)
+    regions = regions or {}
+    default = os.path.splitext(os.path.basename(elf_filename))[0]
+
+    def get_region(address):
+        # Smallest region containing address (regions can overlap, ie rom in spiflash).
+        matches = [(length, name) for name, (origin, length) in regions.items() if origin <= address < origin + length]
+        if not matches:
+            return "unknown" if regions else "all"
+        return min(matches)[1]
+
+    # Sections.
+    sections = {}
+    for section in elf.sections:
+        if not section.alloc or not section.size:
+            continue
+        section_regions = [get_region(section.addr)]
+        if section.loaded and get_region(section.lma) not in section_regions:
+            section_regions.append(get_region(section.lma))
+        sections[section.name] = {
+            "address" : section.addr,
+            "lma"     : section.lma,
+            "size"    : section.size,
+            "regions" : section_regions,
+        }
+
+    # Regions.
+    usage = {name: {"origin": origin, "size": length, "used": 0} for name, (origin, length) in regions.items()}
+    for section in sections.values():
+        for region in section["regions"]:
+            usage.setdefault(region, {"origin": None, "size": None, "used": 0})
+            usage[region]["used"] += section["size"]
+
+    # Input sections (libraries/objects) from the map file.
+    inputs = []
+    if map_filename is not None:
+        section_ranges = sorted((s["address"], s["address"] + s["size"], s["regions"]) for s in sections.values())
+        starts         = [start for start, _, _ in section_ranges]
+        for address, size, obj in parse_linker_map(map_filename):
+            i = bisect.bisect_right(starts, address) - 1
+            if i < 0 or address >= section_ranges[i][1]:
+                continue # Not allocated (debug sections, ...).
+            library, obj = get_library(obj, default)
+            inputs.append((address, size, library, obj, section_ranges[i][2]))
+        inputs.sort()
+
+    libraries = {}
+    for address, size, library, obj, section_regions in inputs:
+        lib = libraries.setdefault(library, {"regions": {}, "objects": {}})
+        obj = lib["objects"].setdefault(obj, {})
+        for region in section_regions:
+            lib["regions"][region] = lib["regions"].get(region, 0) + size
+            obj[region] = obj.get(region, 0) + size
+
+    # Symbols.
+    input_starts = [i[0] for i in inputs]
+    symbols      = []
+    for symbol in elf.symbols:
+        if symbol.type not in [STT_FUNC, STT_OBJECT] or not symbol.size:
+            continue
+        if not (0 < symbol.shndx < len(elf.sections)):
+            continue
+        section = elf.sections[symbol.shndx]
+        if section.name not in sections:
+            continue
+        library = None
+        i = bisect.bisect_right(input_starts, symbol.value) - 1
+        if i >= 0 and symbol.value < inputs[i][0] + inputs[i][1]:
+            library = inputs[i][2]
+        symbols.append({
+            "name"    : symbol.name,
+            "address" : symbol.value,
+            "size"    : symbol.size,
+            "type"    : "function" if symbol.type == STT_FUNC else "object",
+            "section" : section.name,
+            "regions" : sections[section.name]["regions"],
+            "library" : library,
+        })
+    symbols.sort(key=lambda s: (-s["size"], s["name"]))
+
+    return {
+        "regions"   : usage,
+        "sections"  : sections,
+        "libraries" : libraries,
+        "symbols"   : symbols,
+    }
+
+def diff_memusage(old, new):
+    """Returns the size changes (new - old) of regions, libraries and symbols between two usages."""
+    def diff_dicts(old, new):
+        return {k: new.get(k, 0) - old.get(k, 0) for k in sorted(set(old) | set(new)) if new.get(k, 0) != old.get(k, 0)}
+
+    def symbols_sizes(usage):
+        sizes = {}
+        for s in usage["symbols"]:
+            key = "{}:{}".format(s["library"], s["name"]) if s["library"] is not None else s["name"]
+            sizes[key] = sizes.get(key, 0) + s["size"]
+        return sizes
+
+    libraries = {}
+    for library in sorted(set(old["libraries"]) | set(new["libraries"])):
+        d = diff_dicts(
+            old["libraries"].get(library, {"regions": {}})["regions"],
+            new["libraries"].get(library, {"regions": {}})["regions"])
+        if d:
+            libraries[library] = d
+    symbols = diff_dicts(symbols_sizes(old), symbols_sizes(new))
+    return {
+        "regions"   : diff_dicts(
+            {k: v["used"] for k, v in old["regions"].items()},
+            {k: v["used"] for k, v in new["regions"].items()}),
+        "libraries" : libraries,
+        "symbols"   : dict(sorted(symbols.items(), key=lambda s: (-abs(s[1]), s[0]))),
+    }
+
+# Reports ------------------------------------------------------------------------------------------
+
+def _get_size(size):
+    return "{:.2f}KiB".format(size/1024.0)
+
+def print_usage(usage, libraries=False, symbols=0, file=sys.stdout):
+    print("", file=file)
+    for name, region in usage["regions"].items():
+        if not region["used"]:
+            continue
+        r = "{} usage: {}".format(name.upper(), _get_size(region["used"]))
+        if region["size"]:
+            r += " \t({:.2f}%)".format(region["used"]/region["size"]*100.0)
+        print(r, file=file)
+    if libraries:
+        print("\nLibraries:", file=file)
+        for library, lib in sorted(usage["libraries"].items(), key=lambda l: -sum(l[1]["regions"].values())):
+            print("  {:20} {}".format(library, " ".join("{}: {:>10}".format(region, _get_size(size))
+                for region, size in lib["regions"].items())), file=file)
+    if symbols:
+        print("\nSymbols:", file=file)
+        for s in usage["symbols"][:symbols]:
+            print("  {:>10} {:16} {:12} {}".format(_get_size(s["size"]), s["library"] or "", s["section"], s["name"]), file=file)
+    print("", file=file)
+
+def print_diff(diff, symbols=20, file=sys.stdout):
+    print("\nRegions:", file=file)
+    for region, size in diff["regions"].items():
+        print("  {:20} {:+d} bytes".format(region, size), file=file)
+    print("Libraries:", file=file)
+    for library, regions in diff["libraries"].items():
+        print("  {:20} {}".format(library, " ".join("{}: {:+d}".format(r, s) for r, s in regions.items())), file=file)
+    print("Symbols:", file=file)
+    for name, size in list(diff["symbols"].items())[:symbols]:
+        print("  {:+8d} {}".format(size, name), file=file)
+    print("", file=file)
+
+# Main ---------------------------------------------------------------------------------------------
+
+def _get_map_filename(elf_filename, map_filename=None):
+    if map_filename is None and os.path.exists(elf_filename + ".map"):
+        map_filename = elf_filename + ".map"
+    return map_filename
+
+def _load_usage(filename, regions):
+    # Previous usage from a JSON report or an ELF (with its .map when present).
+    with open(filename, "rb") as f:
+        is_elf = (f.read(4) == b"\x7fELF")
+    if is_elf:
+        return get_memusage(filename, regions, _get_map_filename(filename))
+    with open(filename, "r") as f:
+        return json.load(f)
 
 def main():
-    parser = argparse.ArgumentParser(description="Print bios memory usage")
-    parser.add_argument("input", help="input file")
-    parser.add_argument("regions", help="regions definitions")
-    parser.add_argument("triple", help="toolchain triple")
+    parser = argparse.ArgumentParser(description="Print software memory usage")
+    parser.add_argument("input",                   help="Input ELF file.")
+    parser.add_argument("regions",   nargs="?",    help="Regions definitions (regions.ld).")
+    parser.add_argument("triple",    nargs="?",    help="Toolchain triple (unused, kept for compatibility).")
+    parser.add_argument("--map",       default=None,        help="Linker map file (default: <input>.map when present).")
+    parser.add_argument("--libraries", action="store_true", help="Print usage per library.")
+    parser.add_argument("--symbols",   default=0, type=int, help="Print the N largest symbols.")
+    parser.add_argument("--json",      default=None,        help="Write usage to the specified JSON file.")
+    parser.add_argument("--diff",      default=None,        help="Compare with a previous JSON report or ELF.")
     args = parser.parse_args()
-    print_usage(args.input, args.regions, args.triple)
 
+    regions = parse_linker_regions(args.regions) if args.regions is not None else None
+    usage   = get_memusage(args.input, regions, _get_map_filename(args.input, args.map))
+    print_usage(usage, libraries=args.libraries, symbols=args.symbols)
+    if args.json is not None:
+        with open(args.json, "w") as f:
+            json.dump(usage, f, indent=4)
+    if args.diff is not None:
+        print_diff(diff_memusage(_load_usage(args.diff, regions), usage))
 
 if __name__ == "__main__":
     main()
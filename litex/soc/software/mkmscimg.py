@@ -4,9 +4,36 @@
 # This file is Copyright (c) 2018 Dolu1990 <charles.papon.90@gmail.com>
 # License: BSD
 
+import os
+import json
+import struct
 import argparse
 import binascii
 
+CHUNK_SIZE = 1024*1024
+
+# Helpers ------------------------------------------------------------------------------------------
+
+def file_crc32(filename, length=None):
+    """CRC32 (and length) of a file, computed by chunks (the file is not loaded in memory)."""
+    crc   = 0
+    count = 0
+    with open(filename, "rb") as f:
+        while length is None or count < length:
+            chunk = f.read(CHUNK_SIZE if length is None else min(CHUNK_SIZE, length - count))
+            if not chunk:
+                break
+            crc    = binascii.crc32(chunk, crc)
+            count += len(chunk)
+    return crc, count
+
+def copy_file(src, dst):
+    # Copy src file object to dst file object by chunks.
+    while True:
+        chunk = src.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        dst.write(chunk)
 
 def insert_crc(i_filename, fbi_mode=False, o_filename=None, little_endian=False):
     endian = "little" if little_endian else "big"
@@ -14,29 +41,220 @@ def insert_crc(i_filename, fbi_mode=False, o_filename=None, little_endian=False)
     if o_filename is None:
         o_filename = i_filename
 
-    with open(i_filename, "rb") as f:
-        fdata = f.read()
-    fcrc = binascii.crc32(fdata).to_bytes(4, byteorder=endian)
-    flength = len(fdata).to_bytes(4, byteorder=endian)
+    fcrc, flength = file_crc32(i_filename)
+    fcrc    = fcrc.to_bytes(4, byteorder=endian)
+    flength = flength.to_bytes(4, byteorder=endian)
 
-    with open(o_filename, "wb") as f:
-        if fbi_mode:
-            f.write(flength)
-            f.write(fcrc)
-            f.write(fdata)
-        else:
-            f.write(fdata)
+    # Image + CRC (in place when possible).
+    if not fbi_mode:
+        if o_filename != i_filename:
+            with open(i_filename, "rb") as fi, open(o_filename, "wb") as fo:
+                copy_file(fi, fo)
+        with open(o_filename, "ab") as f:
             f.write(fcrc)
+    # Length + CRC + Image (through a temporary file when written in place).
+    else:
+        with open(i_filename, "rb") as fi, open(o_filename + ".tmp", "wb") as fo:
+            fo.write(flength)
+            fo.write(fcrc)
+            copy_file(fi, fo)
+        os.replace(o_filename + ".tmp", o_filename)
+
+# LZ4 ----------------------------------------------------------------------------------------------
+
+LZ4_MIN_MATCH     = 4
+LZ4_MAX_OFFSET    = 65535
+LZ4_LAST_LITERALS = 5  # Last bytes of a block are always literals.
+LZ4_MF_LIMIT      = 12 # Last match must start at least 12 bytes before the end of the block.
+
+def _lz4_length(length):
+    # Extension bytes of a length >= 15.
+    r = bytearray()
+    length -= 15
+    while length >= 255:
+        r.append(255)
+        length -= 255
+    r.append(length)
+    return r
+
+def lz4_compress(data):
+    """Compresses data to a LZ4 block (raw block format, decoded by the BIOS' lz4_decompress).
+
+    Greedy compressor with a hash table of the last position of each 4-byte sequence (speed is
+    favoured over ratio since decompression speed is what matters here).
+    """
+    data   = bytes(data)
+    n      = len(data)
+    out    = bytearray()
+    table  = {}
+    anchor = 0
+    i      = 0
+    misses = 0
+
+    def emit(literals, offset=None, length=0):
+        lit_len   = len(literals)
+        match_len = length - LZ4_MIN_MATCH
+        token = (min(lit_len, 15) << 4) | (min(match_len, 15) if offset is not None else 0)
+        out.append(token)
+        if lit_len >= 15:
+            out.extend(_lz4_length(lit_len))
+        out.extend(literals)
+        if offset is not None:
+            out.extend(offset.to_bytes(2, "little"))
+            if match_len >= 15:
+                out.extend(_lz4_length(match_len))
+
+    while i < n - LZ4_MF_LIMIT:
+        sequence = data[i:i + LZ4_MIN_MATCH]
+        ref      = table.get(sequence)
+        table[sequence] = i
+        if ref is None or (i - ref) > LZ4_MAX_OFFSET:
+            # Skip faster over incompressible data.
+            misses += 1
+            i      += 1 + (misses >> 6)
+            continue
+        misses = 0
+        # Extend match (by 16-byte slices, then bytes).
+        length = LZ4_MIN_MATCH
+        limit  = n - LZ4_LAST_LITERALS - i
+        while length + 16 <= limit and data[ref + length:ref + length + 16] == data[i + length:i + length + 16]:
+            length += 16
+        while length < limit and data[ref + length] == data[i + length]:
+            length += 1
+        emit(data[anchor:i], i - ref, length)
+        i     += length
+        anchor = i
+    emit(data[anchor:])
+    return bytes(out)
+
+# Boot Image ---------------------------------------------------------------------------------------
+
+# Multi-payload boot image loaded by the BIOS flashboot:
+# - Header (32 bytes): magic, number of payloads, boot r1/r2/r3/addr, reserved, CRC32 of the header
+#   (with CRC field excluded) and of the entries.
+# - Entries (24 bytes per payload): offset (from the image start), length (stored), size (loaded),
+#   load address, CRC32 (of the stored data) and flags.
+# - Payloads, aligned on align (flash erase block size) so that they can be updated separately.
+# Words are 32-bit, in the CPU endianness.
+
+BOOT_IMAGE_MAGIC       = 0x4c584249 # "LXBI".
+BOOT_IMAGE_HEADER_SIZE = 32
+BOOT_IMAGE_ENTRY_SIZE  = 24
+BOOT_IMAGE_FLAG_LZ4    = (1 << 0)
+
+def _align(value, align):
+    return (value + align - 1)//align*align
+
+def parse_boot_json(filename):
+    """Returns the payloads [(filename, address, compress)] and boot args of a boot.json file.
+
+    Same format as the SDCard/SATA/Net boot.json files: {"filename": "address", ..., "bootargs":
+    {"r1": ..., "r2": ..., "r3": ..., "addr": ...}}, with also {"filename": {"address": ...,
+    "compress": true}} to compress a payload. Filenames are relative to the JSON file.
+    """
+    with open(filename, "r") as f:
+        description = json.load(f)
+    base     = os.path.dirname(os.path.abspath(filename))
+    bootargs = {k: int(v, 0) if isinstance(v, str) else v for k, v in description.pop("bootargs", {}).items()}
+    payloads = []
+    for name, value in description.items():
+        compress = False
+        if isinstance(value, dict):
+            compress = value.get("compress", False)
+            value    = value["address"]
+        address = int(value, 0) if isinstance(value, str) else value
+        payloads.append((os.path.join(base, name), address, compress))
+    return payloads, bootargs
+
+def make_boot_image(payloads, o_filename, bootargs={}, align=4096, little_endian=False):
+    """Writes a multi-payload boot image to o_filename.
+
+    payloads: [(filename, address, compress)]. Without addr in bootargs, boots to the address of the
+    last payload. Uncompressed payloads are streamed (not loaded in memory).
+    """
+    endian  = "<" if little_endian else ">"
+    entries = []
+    offset  = _align(BOOT_IMAGE_HEADER_SIZE + BOOT_IMAGE_ENTRY_SIZE*len(payloads), align)
+    with open(o_filename + ".tmp", "wb") as fo:
+        fo.seek(offset)
+        for filename, address, compress in payloads:
+            compressed = None
+            if compress:
+                with open(filename, "rb") as fi:
+                    data = fi.read()
+                compressed = lz4_compress(data)
+                if len(compressed) >= len(data):
+                    compressed = None # Stored uncompressed when not compressible.
+            if compressed is not None:
+                fo.write(compressed)
+                crc, length, size, flags = binascii.crc32(compressed), len(compressed), len(data), BOOT_IMAGE_FLAG_LZ4
+            else:
+                crc, length = 0, 0
+                with open(filename, "rb") as fi:
+                    while True:
+                        chunk = fi.read(CHUNK_SIZE)
+                        if not chunk:
+                            break
+                        fo.write(chunk)
+                        crc     = binascii.crc32(chunk, crc)
+                        length += len(chunk)
+                size, flags = length, 0
+            entries.append(struct.pack(endian + "6I", offset, length, size, address, crc, flags))
+            offset = _align(offset + length, align)
+            fo.write(bytes(offset - fo.tell()))
+
+        # Header + Entries.
+        boot_addr = bootargs.get("addr", payloads[-1][1] if payloads else 0)
+        header = struct.pack(endian + "7I",
+            BOOT_IMAGE_MAGIC,
+            len(payloads),
+            bootargs.get("r1", 0),
+            bootargs.get("r2", 0),
+            bootargs.get("r3", 0),
+            boot_addr,
+            0)
+        entries = b"".join(entries)
+        fo.seek(0)
+        fo.write(header)
+        fo.write(struct.pack(endian + "I", binascii.crc32(entries, binascii.crc32(header))))
+        fo.write(entries)
+    os.replace(o_filename + ".tmp", o_filename)
+
+def read_boot_image(filename, little_endian=False):
+    """Returns the boot args and entries (dicts) of a boot image."""
+    endian = "<" if little_endian else ">"
+    with open(filename, "rb") as f:
+        header = f.read(BOOT_IMAGE_HEADER_SIZE)
+        magic, count, r1, r2, r3, addr, _, crc = struct.unpack(endian + "8I", header)
+        if magic != BOOT_IMAGE_MAGIC:
+            raise ValueError("{} is not a boot image.".format(filename))
+        entries = f.read(count*BOOT_IMAGE_ENTRY_SIZE)
+    if binascii.crc32(entries, binascii.crc32(header[:-4])) != crc:
+        raise ValueError("{}: invalid header CRC.".format(filename))
+    bootargs = {"r1": r1, "r2": r2, "r3": r3, "addr": addr}
+    keys     = ["offset", "length", "size", "address", "crc", "flags"]
+    return bootargs, [dict(zip(keys, e)) for e in struct.iter_unpack(endian + "6I", entries)]
 
+# Main ---------------------------------------------------------------------------------------------
 
 def main():
     parser = argparse.ArgumentParser(description="CRC32 computation tool and MiSoC image file writer.")
-    parser.add_argument("input", help="input file")
+    parser.add_argument("input", help="input file (boot.json description with --boot-image)")
     parser.add_argument("-o", "--output", default=None, help="output file (if not specified, use input file)")
     parser.add_argument("-f", "--fbi", default=False, action="store_true", help="build flash boot image (FBI) file")
     parser.add_argument("-l", "--little", default=False, action="store_true", help="Use little endian to write the CRC32")
+    parser.add_argument("-b", "--boot-image", default=False, action="store_true", help="build multi-payload flash boot image from a boot.json description")
+    parser.add_argument("--compress", default=False, action="store_true", help="compress all the payloads (LZ4) of the boot image")
+    parser.add_argument("--align", default="4096", help="alignment of the boot image payloads (flash erase block size)")
     args = parser.parse_args()
-    insert_crc(args.input, args.fbi, args.output, args.little)
+    if args.boot_image:
+        if args.output is None:
+            parser.error("--output is required with --boot-image.")
+        payloads, bootargs = parse_boot_json(args.input)
+        payloads = [(f, a, c or args.compress) for f, a, c in payloads]
+        make_boot_image(payloads, args.output, bootargs, align=int(args.align, 0), little_endian=args.little)
+    else:
+        insert_crc(args.input, args.fbi, args.output, args.little)
 
 
 if __name__ == "__main__":
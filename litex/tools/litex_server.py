@@ -216,7 +216,7 @@ def main():
         jtag_uart = JTAGUART(config=args.jtag_config, chain=int(args.jtag_chain))
         jtag_uart.open()
         print("[CommUART] port: JTAG / ", end="")
-        comm = CommUART(os.ttyname(jtag_uart.name), debug=args.debug)
+        comm = CommUART(os.ttyname(jtag_uart.name), debug=args.debug, bridge="jtagbone")
 
     # UDP mode
     elif args.udp:
@@ -154,6 +154,8 @@ class SimSoC(SoCCore):
         with_sdcard           = False,
         with_spi_flash        = False,
         spi_flash_init        = [],
+        with_spi_flash_dma    = False,
+        spi_flash_boot_offset = None,
         with_gpio             = False,
         sim_debug             = False,
         trace_reset_on        = False,
@@ -196,7 +198,9 @@ class SimSoC(SoCCore):
                 module                  = sdram_module,
                 l2_cache_size           = kwargs.get("l2_size", 8192),
                 l2_cache_min_data_width = kwargs.get("min_l2_data_width", 128),
-                l2_cache_reverse        = False
+                l2_cache_reverse        = False,
+                l2_cache_ways           = kwargs.get("l2_ways", 1),
+                l2_cache_policy         = kwargs.get("l2_policy", "lru"),
             )
             if sdram_init != []:
                 # Skip SDRAM test to avoid corrupting pre-initialized contents.
@@ -281,7 +285,9 @@ class SimSoC(SoCCore):
                 platform.add_sources(os.path.abspath(os.path.dirname(__file__)), "../build/sim/verilog/iddr_verilog.v")
                 platform.add_sources(os.path.abspath(os.path.dirname(__file__)), "../build/sim/verilog/oddr_verilog.v")
             self.submodules.spiflash_phy = LiteSPIPHYModel(spiflash_module, init=spi_flash_init)
-            self.add_spi_flash(phy=self.spiflash_phy, mode="4x", module=spiflash_module, with_master=True)
+            self.add_spi_flash(phy=self.spiflash_phy, mode="4x", module=spiflash_module, with_master=True, with_dma=with_spi_flash_dma)
+            if spi_flash_boot_offset is not None:
+                self.add_constant("FLASH_BOOT_ADDRESS", self.bus.regions["spiflash"].origin + spi_flash_boot_offset)
 
         # GPIO --------------------------------------------------------------------------------------
         if with_gpio:
@@ -382,6 +388,8 @@ def sim_args(parser):
     parser.add_argument("--with-sdcard",          action="store_true",     help="Enable SDCard support.")
     parser.add_argument("--with-spi-flash",       action="store_true",     help="Enable SPI Flash (MMAPed).")
     parser.add_argument("--spi_flash-init",       default=None,            help="SPI Flash init file.")
+    parser.add_argument("--with-spi-flash-dma",   action="store_true",     help="Enable SPI Flash DMA (Faster Flash boot copies).")
+    parser.add_argument("--spi_flash-boot-offset", default=None,           help="Enable Flash boot from this SPI Flash offset.")
     parser.add_argument("--with-gpio",            action="store_true",     help="Enable Tristate GPIO (32 pins).")
     parser.add_argument("--sim-debug",            action="store_true",     help="Add simulation debugging modules.")
     parser.add_argument("--gtkwave-savefile",     action="store_true",     help="Generate GTKWave savefile.")
@@ -462,6 +470,8 @@ def main():
         sim_debug          = args.sim_debug,
         trace_reset_on     = int(float(args.trace_start)) > 0 or int(float(args.trace_end)) > 0,
         spi_flash_init     = None if args.spi_flash_init is None else get_mem_data(args.spi_flash_init, endianness="big"),
+        with_spi_flash_dma = args.with_spi_flash_dma,
+        spi_flash_boot_offset = None if args.spi_flash_boot_offset is None else int(args.spi_flash_boot_offset, 0),
         **soc_kwargs)
     if ram_boot_address is not None:
         if ram_boot_address == 0:
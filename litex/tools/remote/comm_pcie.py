@@ -5,8 +5,9 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import os
-import ctypes
 import mmap
+import array
+import ctypes
 
 from litex.tools.remote.csr_builder import CSRBuilder
 
@@ -39,27 +40,52 @@ class CommPCIe(CSRBuilder):
     def close(self):
         if not hasattr(self, "file"):
             return
-        self.file.close()
-        del self.file
         self.mmap.close()
+        os.close(self.file)
+        del self.file
+
+    def _words(self, addr, buffer):
+        # 32-bit words of the BAR mmap and of the buffer.
+        nbytes = memoryview(buffer).nbytes
+        if (addr % 4) or (nbytes % 4):
+            raise ValueError("PCIe accesses must be 32-bit aligned (addr=0x{:08x}, size={})".format(
+                addr, nbytes))
+        bar_words = (ctypes.c_uint32*(nbytes//4)).from_buffer(self.mmap, addr)
+        return bar_words, memoryview(buffer).cast("B").cast("I")
+
+    def read_into(self, addr, buffer):
+        """Read len(buffer) bytes from addr into buffer (bytearray, array, NumPy array, ...).
+
+        The BAR is accessed one 32-bit word at a time (registers can have read side effects)."""
+        bar_words, words = self._words(addr, buffer)
+        for i in range(len(words)):
+            words[i] = bar_words[i]
+        del bar_words # Release mmap export.
+        if self.debug:
+            for i, value in enumerate(words):
+                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
+        return buffer
+
+    def write_from(self, addr, buffer):
+        """Write buffer (bytes, bytearray, array, NumPy array, ...) to addr.
+
+        The BAR is accessed one 32-bit word at a time."""
+        bar_words, words = self._words(addr, buffer)
+        for i in range(len(words)):
+            bar_words[i] = words[i]
+        del bar_words # Release mmap export.
+        if self.debug:
+            for i, value in enumerate(words):
+                print("write 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
 
     def read(self, addr, length=None, burst="incr"):
         assert burst == "incr"
-        data = []
         length_int = 1 if length is None else length
-        for i in range(length_int):
-            value = ctypes.c_uint32.from_buffer(self.mmap, addr + 4*i).value
-            if self.debug:
-                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
-            if length is None:
-                return value
-            data.append(value)
-        return data
+        data = self.read_into(addr, array.array("I", bytes(4*length_int)))
+        if length is None:
+            return data[0]
+        return data.tolist()
 
     def write(self, addr, data):
         data = data if isinstance(data, list) else [data]
-        length = len(data)
-        for i, value in enumerate(data):
-            ctypes.c_uint32.from_buffer(self.mmap, addr + 4*i).value = value
-            if self.debug:
-                print("write 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
+        self.write_from(addr, array.array("I", data))
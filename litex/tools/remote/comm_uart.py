@@ -15,15 +15,30 @@ CMD_WRITE_BURST_INCR  = 0x01
 CMD_READ_BURST_INCR   = 0x02
 CMD_WRITE_BURST_FIXED = 0x03
 CMD_READ_BURST_FIXED  = 0x04
+CMD_POLL              = 0x05
+CMD_RMW               = 0x06
 
 # CommUART -----------------------------------------------------------------------------------------
 
 class CommUART(CSRBuilder):
-    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False):
+    def __init__(self, port, baudrate=115200, csr_csv=None, debug=False, poll_rmw=None, length_width=None,
+        bridge = "uartbone"):
         CSRBuilder.__init__(self, comm=self, csr_csv=csr_csv)
         self.port     = serial.serial_for_url(port, baudrate)
         self.baudrate = str(baudrate)
         self.debug    = debug
+        # Use gateware poll/rmw commands when advertised by the SoC for the bridge (uartbone,
+        # jtagbone) or forced, else emulate them.
+        if poll_rmw is None:
+            poll_rmw = hasattr(self, "constants") and (f"{bridge}_poll_rmw" in self.constants.d)
+        self.poll_rmw = poll_rmw
+        # Width of the length field (8-bit unless advertised by the SoC for the bridge or forced).
+        if length_width is None:
+            length_width = 8
+            if hasattr(self, "constants"):
+                length_width = self.constants.d.get(f"{bridge}_length_width", 8)
+        self.length_width = length_width
+        self.max_length   = 2**length_width - 1
 
     def open(self):
         if hasattr(self, "port"):
@@ -54,6 +69,10 @@ class CommUART(CSRBuilder):
         if self.port.inWaiting() > 0:
             self.port.read(self.port.inWaiting())
 
+    def _write_header(self, cmd, length, addr):
+        self._write([cmd] + list(length.to_bytes(self.length_width//8, byteorder="big")))
+        self._write(list((addr//4).to_bytes(4, byteorder="big")))
+
     def read(self, addr, length=None, burst="incr"):
         self._flush()
         data       = []
@@ -62,15 +81,20 @@ class CommUART(CSRBuilder):
             "incr" : CMD_READ_BURST_INCR,
             "fixed": CMD_READ_BURST_FIXED,
         }[burst]
-        self._write([cmd, length_int])
-        self._write(list((addr//4).to_bytes(4, byteorder="big")))
-        for i in range(length_int):
-            value = int.from_bytes(self._read(4), "big")
-            if self.debug:
-                print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*i))
-            if length is None:
-                return value
-            data.append(value)
+        offset = 0
+        while length_int:
+            size = min(length_int, self.max_length)
+            self._write_header(cmd, size, addr + 4*offset*(burst == "incr"))
+            datas = self._read(4*size)
+            for i in range(size):
+                value = int.from_bytes(datas[4*i:4*(i + 1)], "big")
+                if self.debug:
+                    print("read 0x{:08x} @ 0x{:08x}".format(value, addr + 4*(offset + i)))
+                if length is None:
+                    return value
+                data.append(value)
+            offset     += size
+            length_int -= size
         return data
 
     def write(self, addr, data, burst="incr"):
@@ -84,11 +108,38 @@ class CommUART(CSRBuilder):
                 "incr" : CMD_WRITE_BURST_INCR,
                 "fixed": CMD_WRITE_BURST_FIXED,
             }[burst]
-            self._write([cmd, size])
-            self._write(list(((addr//4 + offset).to_bytes(4, byteorder="big"))))
+            self._write_header(cmd, size, addr + 4*offset)
             for i, value in enumerate(data[offset:offset+size]):
                 self._write(list(value.to_bytes(4, byteorder="big")))
                 if self.debug:
                     print("write 0x{:08x} @ 0x{:08x}".format(value, addr + offset, 4*i))
             offset += size
             length -= size
+
+    def poll(self, addr, mask, value, timeout=0.1):
+        if not self.poll_rmw:
+            return CSRBuilder.poll(self, addr, mask, value, timeout)
+        self._flush()
+        # Timeouts above max_length ms are split in several polls.
+        remaining_ms = max(int(timeout*1e3), 0)
+        while True:
+            timeout_ms = min(remaining_ms, self.max_length)
+            self._write_header(CMD_POLL, timeout_ms, addr)
+            self._write(list(mask.to_bytes(4, byteorder="big")))
+            self._write(list(value.to_bytes(4, byteorder="big")))
+            data = int.from_bytes(self._read(4), "big")
+            if self.debug:
+                print("poll 0x{:08x} @ 0x{:08x}".format(data, addr))
+            remaining_ms -= timeout_ms
+            if ((data & mask) == value) or (remaining_ms <= 0):
+                return (data & mask) == value
+
+    def rmw(self, addr, mask, value):
+        if not self.poll_rmw:
+            return CSRBuilder.rmw(self, addr, mask, value)
+        self._flush()
+        self._write_header(CMD_RMW, 1, addr)
+        self._write(list(mask.to_bytes(4, byteorder="big")))
+        self._write(list(value.to_bytes(4, byteorder="big")))
+        if self.debug:
+            print("rmw 0x{:08x}/0x{:08x} @ 0x{:08x}".format(value, mask, addr))
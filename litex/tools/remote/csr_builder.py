@@ -5,7 +5,11 @@
 # Copyright (c) 2016 Tim 'mithro' Ansell <mithro@mithis.com>
 # SPDX-License-Identifier: BSD-2-Clause
 
+import os
 import csv
+import time
+import pickle
+import hashlib
 
 # CSR Elements -------------------------------------------------------------------------------------
 
@@ -61,12 +65,57 @@ class CSRMemoryRegion:
         self.size = size
         self.type = type
 
+# CSR Map Cache ------------------------------------------------------------------------------------
+
+# Parsed csr.csv items are cached in a versioned pickle sidecar (csr.csv.cache, generated by the
+# Builder) that is only used when the SHA-256 of csr.csv matches the one recorded in it, so host tools
+# started repeatedly skip the CSV parsing.
+
+CSR_CACHE_VERSION = 2
+
+def get_csr_cache_filename(csr_csv):
+    return csr_csv + ".cache"
+
+def get_csr_csv_hash(csr_csv):
+    with open(csr_csv, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+def parse_csr_csv(csr_csv):
+    with open(csr_csv) as f:
+        return list(csv.reader(filter(lambda row: row[0] != "#", f)))
+
+def write_csr_cache(csr_csv, items=None):
+    if items is None:
+        items = parse_csr_csv(csr_csv)
+    cache = {
+        "version" : CSR_CACHE_VERSION,
+        "sha256"  : get_csr_csv_hash(csr_csv),
+        "items"   : items,
+    }
+    # Write to a temporary file first so that concurrent readers never see a partial cache.
+    filename = get_csr_cache_filename(csr_csv)
+    tmp      = filename + ".{}.tmp".format(os.getpid())
+    with open(tmp, "wb") as f:
+        pickle.dump(cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, filename)
+
+def read_csr_cache(csr_csv):
+    try:
+        with open(get_csr_cache_filename(csr_csv), "rb") as f:
+            cache = pickle.load(f)
+        if (cache["version"] == CSR_CACHE_VERSION and
+            cache["sha256"]  == get_csr_csv_hash(csr_csv)):
+            return cache["items"]
+    except Exception:
+        pass
+    return None
+
 # CSR Builder --------------------------------------------------------------------------------------
 
 class CSRBuilder:
-    def __init__(self, comm, csr_csv, csr_data_width=None):
+    def __init__(self, comm, csr_csv, csr_data_width=None, write_cache=False):
         if csr_csv is not None:
-            self.items     = self.get_csr_items(csr_csv)
+            self.items     = self.get_csr_items(csr_csv, write_cache=write_cache)
             self.constants = self.build_constants()
 
             # Load csr_data_width from the constants, otherwise it must be provided
@@ -85,8 +134,17 @@ class CSRBuilder:
             self.mems  = self.build_memories()
 
     @staticmethod
-    def get_csr_items(csr_csv):
-        return list(csv.reader(filter(lambda row: row[0] != "#", open(csr_csv))))
+    def get_csr_items(csr_csv, write_cache=False):
+        items = read_csr_cache(csr_csv)
+        if items is None:
+            items = parse_csr_csv(csr_csv)
+            # Cache is an optimization only (ex: read-only build directory).
+            if write_cache:
+                try:
+                    write_csr_cache(csr_csv, items)
+                except OSError:
+                    pass
+        return items
 
     def build_bases(self):
         d = {}
@@ -124,3 +182,18 @@ class CSRBuilder:
             if group == "memory_region":
                 d[name] = CSRMemoryRegion(int(base, 16), int(size), type)
         return CSRElements(d)
+
+    # Host-side accesses helpers (bridges executing them in gateware override these).
+
+    def poll(self, addr, mask, value, timeout=0.1):
+        """Reads addr until (reg & mask) == value or timeout (in s), returns True on match."""
+        deadline = time.time() + timeout
+        while True:
+            if (self.read(addr) & mask) == value:
+                return True
+            if time.time() > deadline:
+                return False
+
+    def rmw(self, addr, mask, value):
+        """Writes (reg & ~mask) | (value & mask) to addr."""
+        self.write(addr, (self.read(addr) & ~mask) | (value & mask))
@@ -0,0 +1,33 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+# Simulation backend selection: python -m pytest test --sim-backend=verilator runs the simulation
+# tests with the Verilator backend (litex.gen.sim.verilator) instead of the Python simulator.
+# Only run_simulation is swapped: tests instantiating Simulator directly (to access sim.memories,
+# ...) keep running on the Python simulator.
+
+import sys
+
+
+def pytest_addoption(parser):
+    parser.addoption("--sim-backend", default="python", choices=["python", "verilator"],
+        help="Simulation backend used by run_simulation.")
+
+
+def run_verilator_simulation(*args, native_memories=False, **kwargs):
+    # Memories are always simulated by the Verilator model.
+    from litex.gen.sim.verilator import run_verilator_simulation
+    return run_verilator_simulation(*args, **kwargs)
+
+
+def pytest_configure(config):
+    if config.getoption("--sim-backend") == "verilator":
+        # Patch before LiteX modules (re-exporting migen's run_simulation) are imported.
+        import migen
+        import migen.sim
+        for module in [migen, migen.sim]:
+            module.run_simulation = run_verilator_simulation
+        import litex.gen.sim
+        sys.modules["litex.gen.sim"].run_simulation = run_verilator_simulation
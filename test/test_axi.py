@@ -58,6 +58,106 @@ class Write(Access): pass
 
 class Read(Access): pass
 
+# BFM Helpers --------------------------------------------------------------------------------------
+
+def axi_bfm_test(interface, interconnect, n_masters, n_slaves, n=32, max_len=0, id_count=1,
+    slave_interface = None,
+    slave_size  = 0x10000,
+    master_size = 0x1000,
+    latency     = 2,
+    rand        = 0,
+    seed        = 42,
+    **kwargs):
+    # Each master reads (from preloaded data) and writes (sequentially, in a separate area) its own
+    # region of each slave; returns master BFMs, slave BFMs and read/write errors.
+    assert (n//n_slaves)*(max_len + 1)*4 <= master_size//2
+    prng = random.Random(seed)
+    def decoder(i):
+        shift = log2_int(slave_size//4)
+        return lambda a: (a[shift:] == i)
+    class DUT(Module):
+        def __init__(self):
+            self.masters = [interface() for _ in range(n_masters)]
+            self.slaves  = [(slave_interface or interface)() for _ in range(n_slaves)]
+            self.submodules.interconnect = interconnect(self.masters,
+                list(zip([decoder(i) for i in range(n_slaves)], self.slaves)), **kwargs)
+    dut = DUT()
+
+    def ref(word):
+        return ((word*0x01010101) ^ 0x5a5a5a5a) & 0xffffffff
+
+    masters = []
+    for m in range(n_masters):
+        transactions = []
+        for s in range(n_slaves):
+            base = s*slave_size + m*master_size
+            transactions += axi_random_traffic(n//n_slaves, base, master_size//2, read_ratio=1,
+                max_len=max_len, id_count=id_count, seed=prng.randrange(2**32))
+            transactions += axi_random_traffic(n//n_slaves, base + master_size//2, master_size//2,
+                read_ratio=0, max_len=max_len, id_count=id_count, sequential=True,
+                seed=prng.randrange(2**32))
+        prng.shuffle(transactions)
+        masters.append(AXIMasterBFM(dut.masters[m], transactions, valid_rand=rand, ready_rand=rand,
+            seed=prng.randrange(2**32), name=f"master{m}"))
+    slaves = []
+    for s in range(n_slaves):
+        mem = {w: ref(w) for w in range(s*slave_size//4, (s + 1)*slave_size//4)}
+        slaves.append(AXIMemorySlaveBFM(dut.slaves[s], mem=mem, latency=latency, valid_rand=rand,
+            ready_rand=rand, seed=prng.randrange(2**32), name=f"slave{s}"))
+
+    generators = []
+    for bfm in masters + slaves:
+        generators += bfm.generators()
+    run_simulation(dut, generators)
+
+    errors = 0
+    mem = {}
+    for slave in slaves:
+        mem.update(slave.mem)
+    for master in masters:
+        for t in master.transactions:
+            words = [t.addr//4 + i for i in range(t.len + 1)]
+            if t.write:
+                errors += sum(mem[w] != d for w, d in zip(words, t.data))
+            else:
+                errors += sum(d != ref(w) for w, d in zip(words, t.rdata))
+                errors += len(t.rdata) != (t.len + 1)
+    return masters, slaves, errors
+
+def axi_crossbar_bandwidth(n, non_blocking, crossed=False, n_transactions=16, latency=8,
+    id_count       = 4,
+    slave_id_width = 2):
+    # Aggregate bandwidth (bytes/cycle) of n masters/n slaves through an AXICrossbar: master m
+    # targets slave m (independent pairs) or rotates over the slaves (crossed, with one ID per slave
+    # up to id_count).
+    class DUT(Module):
+        def __init__(self):
+            self.masters = [AXIInterface(id_width=2) for _ in range(n)]
+            self.slaves  = [AXIInterface(id_width=slave_id_width) for _ in range(n)]
+            decoders = [lambda a, i=i: (a[16:] == i) for i in range(n)]
+            self.submodules.crossbar = AXICrossbar(self.masters, list(zip(decoders, self.slaves)),
+                non_blocking=non_blocking)
+    dut = DUT()
+
+    masters = []
+    for m in range(n):
+        transactions = []
+        for k in range(n_transactions):
+            s = (m + k)%n if crossed else m
+            transactions += axi_random_traffic(1, s*0x40000 + m*0x1000, 0x1000, max_len=3,
+                seed=m*n_transactions + k)
+            transactions[-1].id = k%id_count if crossed else 0
+        masters.append(AXIMasterBFM(dut.masters[m], transactions, max_outstanding=8))
+    slaves = [AXIMemorySlaveBFM(dut.slaves[s], latency=latency) for s in range(n)]
+
+    generators = []
+    for bfm in masters + slaves:
+        generators += bfm.generators()
+    run_simulation(dut, generators)
+
+    stats = [master.get_stats() for master in masters]
+    return sum(s["write"]["bytes"] + s["read"]["bytes"] for s in stats)/max(s["cycles"] for s in stats)
+
 # TestAXI ------------------------------------------------------------------------------------------
 
 class TestAXI(unittest.TestCase):
@@ -335,3 +435,67 @@ class TestAXI(unittest.TestCase):
             r_valid_random  = 90,
             r_ready_random  = 90
         )
+
+    def test_axi_bfm_p2p(self):
+        masters, slaves, errors = axi_bfm_test(lambda: AXIInterface(id_width=4),
+            lambda masters, slaves: AXIInterconnectPointToPoint(masters[0], slaves[0][1]),
+            n_masters=1, n_slaves=1, n=64, max_len=7, id_count=4, rand=20)
+        self.assertEqual(errors, 0)
+        stats = masters[0].get_stats()
+        self.assertEqual(stats["read"]["transactions"] + stats["write"]["transactions"], 2*64)
+        self.assertIsNotNone(stats["read"]["latency"]["p99"])
+
+    def test_axi_bfm_crossbar(self):
+        masters, slaves, errors = axi_bfm_test(AXIInterface, AXICrossbar,
+            n_masters=2, n_slaves=2, n=32, max_len=3, rand=20)
+        self.assertEqual(errors, 0)
+        for slave in slaves:
+            self.assertEqual(slave.get_stats()["reads"] + slave.get_stats()["writes"], 2*2*16)
+
+    def test_axi_bfm_crossbar_non_blocking(self):
+        for interface, id_count in [(AXIInterface, 1), (lambda: AXIInterface(id_width=2), 4)]:
+            masters, slaves, errors = axi_bfm_test(interface, AXICrossbar,
+                n_masters=3, n_slaves=2, n=16, max_len=3, id_count=id_count, rand=20,
+                non_blocking=True)
+            self.assertEqual(errors, 0)
+            for slave in slaves:
+                self.assertEqual(slave.get_stats()["reads"] + slave.get_stats()["writes"], 3*2*8)
+
+    def test_axi_crossbar_non_blocking_bandwidth(self):
+        # Aggregate bandwidth scales with the number of independent master/slave pairs.
+        bandwidth = {n: axi_crossbar_bandwidth(n, non_blocking=True) for n in [1, 2, 4]}
+        self.assertGreater(bandwidth[2], 1.5*bandwidth[1])
+        self.assertGreater(bandwidth[4], 2.5*bandwidth[1])
+        # And masters accessing several slaves are no longer serialized.
+        self.assertGreater(
+            axi_crossbar_bandwidth(4, non_blocking=True,  crossed=True),
+            axi_crossbar_bandwidth(4, non_blocking=False, crossed=True)*2)
+
+    def test_axi_bfm_crossbar_non_blocking_id_extension(self):
+        # Slaves IDs wide enough for the masters IDs + master index: masters IDs are extended.
+        for master_id_width, slave_id_width, id_count in [(1, 3, 1), (2, 4, 4)]:
+            masters, slaves, errors = axi_bfm_test(lambda: AXIInterface(id_width=master_id_width),
+                AXICrossbar, slave_interface=lambda: AXIInterface(id_width=slave_id_width),
+                n_masters=3, n_slaves=2, n=16, max_len=3, id_count=id_count, rand=20,
+                non_blocking=True)
+            self.assertEqual(errors, 0)
+            for slave in slaves:
+                self.assertEqual(slave.get_stats()["reads"] + slave.get_stats()["writes"], 3*2*8)
+        # Masters all using ID 0 are no longer serialized on the slaves.
+        self.assertGreater(
+            axi_crossbar_bandwidth(4, non_blocking=True, crossed=True, id_count=1, slave_id_width=4),
+            axi_crossbar_bandwidth(4, non_blocking=True, crossed=True, id_count=1, slave_id_width=2)*1.2)
+
+    def test_axi_bfm_crossbar_register_buffers(self):
+        for kwargs in [
+            dict(register=True),
+            dict(register=True, non_blocking=True),
+            dict(master_buffers={"pipe_valid": True, "pipe_ready": True}, slave_buffers=True),
+            dict(master_buffers=[None, {"pipe_ready": True, "channels": ["aw", "ar"]}],
+                 slave_buffers=[{"pipe_valid": True}, None], non_blocking=True),
+        ]:
+            masters, slaves, errors = axi_bfm_test(lambda: AXIInterface(id_width=2), AXICrossbar,
+                n_masters=2, n_slaves=2, n=16, max_len=3, id_count=4, rand=20, **kwargs)
+            self.assertEqual(errors, 0)
+            for master in masters:
+                self.assertTrue(all(t.complete is not None for t in master.transactions))
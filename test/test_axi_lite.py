@@ -823,6 +823,75 @@ class TestAXILiteInterconnect(unittest.TestCase):
                 ("r", 0x300, 1),
             ])
 
+    def outstanding_reads_test(self, dut, master, slaves, addrs, latency=8, timeout=200):
+        # Issue back to back reads on master (without waiting for the responses), slaves accept
+        # requests immediately and respond after latency cycles; returns the addresses accepted by
+        # each slave, the number of responses per master and the masters seeing unrequested responses.
+        masters   = [master] if not isinstance(master, list) else master
+        accepted  = [[] for _ in slaves]
+        responses = [0 for _ in masters]
+
+        def master_generator():
+            for m in masters:
+                yield m.r.ready.eq(1)
+            for addr in addrs:
+                yield masters[0].ar.addr.eq(addr)
+                yield masters[0].ar.valid.eq(1)
+                yield
+                while not (yield masters[0].ar.ready):
+                    yield
+            yield masters[0].ar.valid.eq(0)
+            for i in range(timeout):
+                yield
+
+        @passive
+        def response_monitor():
+            while True:
+                for n, m in enumerate(masters):
+                    if (yield m.r.valid) and (yield m.r.ready):
+                        responses[n] += 1
+                yield
+
+        @passive
+        def slave_generator(n):
+            bus     = slaves[n]
+            pending = []
+            yield bus.ar.ready.eq(1)
+            while True:
+                if (yield bus.r.valid) and (yield bus.r.ready):
+                    yield bus.r.valid.eq(0)
+                    pending.pop(0)
+                if (yield bus.ar.valid) and (yield bus.ar.ready):
+                    accepted[n].append((yield bus.ar.addr))
+                    pending.append(latency)
+                pending = [max(p - 1, 0) for p in pending]
+                if pending and pending[0] == 0:
+                    yield bus.r.valid.eq(1)
+                yield
+
+        run_simulation(dut, [master_generator(), response_monitor()] +
+            [slave_generator(n) for n in range(len(slaves))])
+        return accepted, responses
+
+    def test_decoder_outstanding_slave_switch(self):
+        # A request to another slave while responses of the current one are outstanding must be
+        # stalled, not routed to the current slave.
+        master = AXILiteInterface()
+        slaves = [AXILiteInterface() for _ in range(2)]
+        dut    = AXILiteDecoder(master, [(lambda a, i=i: (a[8:] == i), s) for i, s in enumerate(slaves)])
+        accepted, responses = self.outstanding_reads_test(dut, master, slaves, [0x000, 0x400])
+        self.assertEqual(accepted, [[0x000], [0x400]])
+        self.assertEqual(responses, [2])
+
+    def test_arbiter_response_routing(self):
+        # Responses must only be presented to the granted master.
+        masters = [AXILiteInterface() for _ in range(2)]
+        target  = AXILiteInterface()
+        dut     = AXILiteArbiter(masters, target)
+        accepted, responses = self.outstanding_reads_test(dut, masters, [target], [0x000])
+        self.assertEqual(accepted, [[0x000]])
+        self.assertEqual(responses, [1, 0])
+
     def interconnect_test(self, master_patterns, slave_decoders,
                                  master_delay=0, slave_ready_latency=0, slave_response_latency=0,
                                  disconnected_slaves=None, timeout=300, interconnect=AXILiteInterconnectShared,
@@ -984,3 +1053,99 @@ class TestAXILiteInterconnect(unittest.TestCase):
                                       slave_ready_latency=rand,
                                       slave_response_latency=rand,
                                       interconnect=AXILiteCrossbar)
+
+    def test_crossbar_bfm(self):
+        # Concurrent outstanding traffic from 2 masters to 2 slaves (each master in its own area).
+        class DUT(Module):
+            def __init__(self):
+                self.masters = [AXILiteInterface() for _ in range(2)]
+                self.slaves  = [AXILiteInterface() for _ in range(2)]
+                decoders = [lambda a, i=i: (a[12:] == i) for i in range(2)]
+                self.submodules.crossbar = AXILiteCrossbar(self.masters, list(zip(decoders, self.slaves)))
+        dut = DUT()
+        mems    = [{} for _ in range(2)]
+        masters = []
+        for m in range(2):
+            transactions = []
+            for s in range(2):
+                transactions += axi_random_traffic(16, s*0x4000 + m*0x800, 0x800, read_ratio=0,
+                    sequential=True, seed=m*2 + s)
+            masters.append(AXIMasterBFM(dut.masters[m], transactions, valid_rand=20, ready_rand=20, seed=m))
+        slaves = [AXIMemorySlaveBFM(dut.slaves[s], mem=mems[s], latency=2, ready_rand=20, seed=s)
+            for s in range(2)]
+        generators = []
+        for bfm in masters + slaves:
+            generators += bfm.generators()
+        run_simulation(dut, generators)
+        for master in masters:
+            for t in master.writes:
+                self.assertEqual(mems[t.addr//0x4000][t.addr//4], t.data[0])
+            self.assertEqual(master.get_stats()["write"]["transactions"], 32)
+
+    def test_crossbar_register_buffers_bfm(self):
+        class DUT(Module):
+            def __init__(self, **kwargs):
+                self.masters = [AXILiteInterface() for _ in range(2)]
+                self.slaves  = [AXILiteInterface() for _ in range(2)]
+                decoders = [lambda a, i=i: (a[12:] == i) for i in range(2)]
+                self.submodules.crossbar = AXILiteCrossbar(self.masters,
+                    list(zip(decoders, self.slaves)), **kwargs)
+        for kwargs in [
+            dict(register=True),
+            dict(master_buffers={"pipe_valid": True, "pipe_ready": True}, slave_buffers=True),
+            dict(master_buffers=[{"pipe_ready": True, "channels": ["aw", "ar"]}, None], register=True),
+        ]:
+            dut     = DUT(**kwargs)
+            mems    = [{w: w for w in range(s*1024, (s + 1)*1024)} for s in range(2)]
+            masters = [AXIMasterBFM(dut.masters[m], axi_random_traffic(32, 0, 0x2000, seed=m),
+                valid_rand=20, ready_rand=20, seed=m) for m in range(2)]
+            slaves  = [AXIMemorySlaveBFM(dut.slaves[s], mem=mems[s], latency=1, ready_rand=20, seed=s)
+                for s in range(2)]
+            generators = []
+            for bfm in masters + slaves:
+                generators += bfm.generators()
+            run_simulation(dut, generators)
+            for master in masters:
+                self.assertTrue(all(t.complete is not None for t in master.transactions))
+
+    def test_soc_interconnect_not_registered(self):
+        # SoC must keep the AXI-Lite interconnect latency: registered decode is opt-in.
+        import logging
+        from litex.build.generic_platform import Pins
+        from litex.build.xilinx import XilinxPlatform
+        from litex.build.io import CRG
+        from litex.soc.integration.soc_core import SoCCore
+        logging.disable(logging.CRITICAL)
+        try:
+            platform = XilinxPlatform("xc7a35ticsg324-1L", [("clk", 0, Pins("E3"))], toolchain="vivado")
+            soc = SoCCore(platform,
+                clk_freq                 = int(1e6),
+                cpu_type                 = None,
+                bus_standard             = "axi-lite",
+                integrated_main_ram_size = 0x100,
+                with_uart                = False,
+                with_timer               = False)
+            soc.crg = CRG(platform.request("clk"))
+            for name in ["a", "b"]:
+                soc.bus.add_master(name=name, master=AXILiteInterface())
+            soc.finalize()
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertIsInstance(soc.bus_interconnect, AXILiteInterconnectShared)
+        self.assertFalse(hasattr(soc.bus_interconnect.decoder, "request_register"))
+
+    def test_clock_domain_crossing_bfm(self):
+        class DUT(Module):
+            def __init__(self):
+                self.master = AXILiteInterface(clock_domain="sys")
+                self.slave  = AXILiteInterface(clock_domain="slow")
+                self.submodules.cdc = AXILiteClockDomainCrossing(self.master, self.slave, "sys", "slow")
+        dut    = DUT()
+        mem    = {w: w for w in range(1024)}
+        master = AXIMasterBFM(dut.master, axi_random_traffic(32, 0, 0x1000, read_ratio=1), max_outstanding=8)
+        slave  = AXIMemorySlaveBFM(dut.slave, mem=mem)
+        run_simulation(dut, {"sys": master.generators(), "slow": slave.generators()},
+            clocks={"sys": 10, "slow": 23})
+        for t in master.reads:
+            self.assertEqual(t.rdata, [t.addr//4])
+        self.assertEqual(master.get_stats()["read"]["transactions"], 32)
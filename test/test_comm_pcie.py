@@ -0,0 +1,47 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import array
+import tempfile
+import unittest
+
+from litex.tools.remote.comm_pcie import CommPCIe
+
+
+class TestCommPCIe(unittest.TestCase):
+    def test_bulk_accesses(self):
+        with tempfile.TemporaryDirectory() as d:
+            # File-backed mmap standing in for the BAR.
+            device = os.path.join(d, "sys/bus/pci/devices/0000:01:00.0")
+            os.makedirs(device)
+            with open(os.path.join(device, "enable"), "w") as f:
+                f.write("0")
+            with open(os.path.join(device, "resource0"), "wb") as f:
+                f.write(bytes(1024*1024))
+
+            bus = CommPCIe(os.path.join(device, "resource0"))
+            with open(os.path.join(device, "enable")) as f:
+                self.assertEqual(f.read(1), "1")
+            bus.open()
+
+            # Single/multi-word accesses.
+            bus.write(0x100, 0x12345678)
+            bus.write(0x104, [0xdeadbeef, 0xcafebabe])
+            self.assertEqual(bus.read(0x100), 0x12345678)
+            self.assertEqual(bus.read(0x100, length=3), [0x12345678, 0xdeadbeef, 0xcafebabe])
+
+            # Bulk accesses.
+            data = array.array("I", range(256*1024))
+            bus.write_from(0, data)
+            self.assertEqual(bus.read(4*1000, length=2), [1000, 1001])
+            dump = bus.read_into(0, bytearray(1024*1024))
+            self.assertEqual(bytes(dump), data.tobytes())
+            with self.assertRaises(ValueError):
+                bus.read_into(2, bytearray(4))
+            with self.assertRaises(ValueError):
+                bus.write_from(0, bytearray(6))
+
+            bus.close()
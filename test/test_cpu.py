@@ -68,3 +68,76 @@ class TestCPU(unittest.TestCase):
         for cpu in tested_cpus:
              with self.subTest(target=cpu):
                 self.assertTrue(self.boot_test(cpu))
+
+    def test_cpu_registry_lazy(self):
+        import subprocess
+        # Importing the SoC must only list CPUs, not import their modules.
+        cmd = [sys.executable, "-c", "\n".join([
+            "import sys",
+            "from litex.soc.integration import soc",
+            "from litex.soc.cores import cpu",
+            "assert 'vexriscv' in cpu.CPUS and 'rocket' in cpu.CPUS",
+            "assert 'litex.soc.cores.cpu.vexriscv' not in sys.modules",
+            "assert cpu.CPUS['vexriscv'].name == 'vexriscv'",
+            "assert 'litex.soc.cores.cpu.vexriscv' in sys.modules",
+            "assert 'litex.soc.cores.cpu.rocket' not in sys.modules",
+        ])]
+        subprocess.check_call(cmd)
+
+    def test_cpu_registry_import_time(self):
+        import subprocess
+        # Import time benchmark (python -X importtime): CPU modules are not imported with the SoC.
+        def import_times(code):
+            r = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                capture_output=True, text=True, check=True)
+            times = {}
+            for line in r.stderr.splitlines():
+                if line.startswith("import time:") and "|" in line:
+                    _, cumulative, module = line.split("|")
+                    if cumulative.strip().isdigit():
+                        times[module.strip()] = int(cumulative)
+            return times
+        cpu_module = lambda m: m.startswith("litex.soc.cores.cpu.")
+        soc_times  = import_times("import litex.soc.integration.soc")
+        all_times  = import_times("\n".join([
+            "import litex.soc.integration.soc",
+            "from litex.soc.cores import cpu",
+            "for name in cpu.CPUS: cpu.CPUS.get(name)",
+        ]))
+        cpu_times = {m: t for m, t in all_times.items() if cpu_module(m) and m.endswith(".core")}
+        self.assertEqual([m for m in soc_times if cpu_module(m)], [])
+        self.assertGreater(len(cpu_times), 20)
+        print("\nImport time: SoC {:.1f}ms, CPU modules (deferred) {:.1f}ms".format(
+            soc_times["litex.soc.integration.soc"]/1e3, sum(cpu_times.values())/1e3))
+
+    def test_cpu_registry_no_cpu_class(self):
+        import os
+        import subprocess
+        import tempfile
+        # A directory of the execution path with a core.py but no CPU class is listed but skipped.
+        with tempfile.TemporaryDirectory() as cwd:
+            os.mkdir(os.path.join(cwd, "notacpu"))
+            open(os.path.join(cwd, "notacpu", "core.py"), "w").close()
+            cmd = [sys.executable, "-c", "\n".join([
+                "import sys",
+                "from litex.build.generic_platform import Pins",
+                "from litex.build.sim import SimPlatform",
+                "from litex.soc.integration.soc import SoC, SoCError, LiteXSoCArgumentParser",
+                "from litex.soc.cores import cpu",
+                "assert 'notacpu' in cpu.CPUS",
+                "assert cpu.CPUS.get('notacpu') is None",
+                "sys.argv = ['test', '--cpu-type=notacpu']",
+                "parser = LiteXSoCArgumentParser()",
+                "parser.add_argument('--cpu-type')",
+                "assert parser.parse_args().cpu_type == 'notacpu'",
+                "soc = SoC(SimPlatform('SIM', [('sys_clk', 0, Pins(1))]), sys_clk_freq=int(1e6))",
+                "try:",
+                "    soc.add_cpu(name='notacpu')",
+                "    assert False",
+                "except SoCError:",
+                "    pass",
+            ])]
+            env = dict(os.environ)
+            root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+            env["PYTHONPATH"] = os.pathsep.join([root] + [p for p in [env.get("PYTHONPATH")] if p])
+            subprocess.check_call(cmd, cwd=cwd, env=env, stderr=subprocess.DEVNULL)
@@ -10,6 +10,7 @@ from migen import *
 
 from litex.soc.interconnect import csr
 from litex.soc.interconnect import csr_bus
+from litex.soc.interconnect import wishbone
 
 
 def csr32_write(dut, adr, dat):
@@ -61,6 +62,63 @@ class CSRDUT(Module):
         self.submodules.csrcon = csr_bus.Interconnect(
             self.csr, self.csrbankarray.get_buses())
 
+class CSRBridgeDUT(Module):
+    def __init__(self, n=8, pipelined=False, register=True, hierarchical=False, **kwargs):
+        self.csrmodules = [CSRModule() for i in range(n)]
+        for i, m in enumerate(self.csrmodules):
+            setattr(self.submodules, "csrmodule{}".format(i), m)
+        self.submodules.csrbankarray = csr_bus.CSRBankArray(self,
+            lambda name, memory: int(name[len("csrmodule"):]),
+            data_width = 32)
+        read_latency = 1
+        if hierarchical:
+            read_latency = csr_bus.InterconnectHierarchical.get_read_latency(register=register, **kwargs)
+        self.submodules.bridge = wishbone.Wishbone2CSR(
+            bus_csr      = csr_bus.Interface(data_width=32),
+            register     = register,
+            pipelined    = pipelined,
+            read_latency = read_latency)
+        self.wb = self.bridge.wishbone
+        self.cycles = Signal(32)
+        self.sync += self.cycles.eq(self.cycles + 1)
+        if hierarchical:
+            self.submodules.csrcon = csr_bus.InterconnectHierarchical(
+                masters  = [self.bridge.csr],
+                slaves   = self.csrbankarray.get_buses(),
+                register = register,
+                **kwargs)
+            assert self.csrcon.read_latency == read_latency
+        else:
+            self.submodules.csrcon = csr_bus.InterconnectShared(
+                masters = [self.bridge.csr],
+                slaves  = self.csrbankarray.get_buses())
+
+
+def csr_bridge_test(n=8, **kwargs):
+    # Write/Read the storage (word 1) and status (word 2) CSRs of n banks, returns read values and
+    # cycles per access.
+    dut    = CSRBridgeDUT(n=n, **kwargs)
+    result = {}
+    def generator(dut):
+        start = (yield dut.cycles)
+        for i in range(n):
+            yield from dut.wb.write(0x200*i + 1, 0x01020304*(i + 1))
+        result["write_cycles"] = ((yield dut.cycles) - start)/n
+        start = (yield dut.cycles)
+        result["storage"] = []
+        for i in range(n):
+            result["storage"].append((yield from dut.wb.read(0x200*i + 1)))
+        result["read_cycles"] = ((yield dut.cycles) - start)/n
+        # Status takes the storage value on csr write.
+        for i in range(n):
+            yield from dut.wb.write(0x200*i + 0, 1)
+        result["status"] = []
+        for i in range(n):
+            result["status"].append((yield from dut.wb.read(0x200*i + 2)))
+    run_simulation(dut, generator(dut))
+    return result
+
+
 class TestCSR(unittest.TestCase):
     def test_csr_constant(self):
         def generator(dut):
@@ -133,3 +191,30 @@ class TestCSR(unittest.TestCase):
                 ]
         dut = DUT()
         run_simulation(dut, generator(dut))
+
+    def test_csr_bridge(self):
+        configs = [
+            dict(pipelined=False, register=False),
+            dict(pipelined=False, register=True),
+            dict(pipelined=True,  register=False),
+            dict(pipelined=True,  register=True),
+            dict(pipelined=True,  register=False, hierarchical=True),
+            dict(pipelined=True,  register=True,  hierarchical=True),
+            dict(pipelined=True,  register=True,  hierarchical=True, levels=2),
+        ]
+        n = 9
+        for config in configs:
+            result = csr_bridge_test(n=n, **config)
+            self.assertEqual(result["storage"], [0x01020304*(i + 1) for i in range(n)], config)
+            self.assertEqual(result["status"], [0x01020304*(i + 1) for i in range(n)], config)
+            if config["pipelined"]:
+                # Posted writes: one write per cycle.
+                self.assertEqual(result["write_cycles"], 1, config)
+
+    def test_csr_bridge_pipelined_bandwidth(self):
+        n = 16
+        classic   = csr_bridge_test(n=n, pipelined=False, register=True)
+        pipelined = csr_bridge_test(n=n, pipelined=True,  register=True)
+        self.assertEqual(classic["write_cycles"],   3)
+        self.assertEqual(pipelined["write_cycles"], 1)
+        self.assertLessEqual(pipelined["read_cycles"], classic["read_cycles"])
@@ -0,0 +1,109 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import argparse
+import tempfile
+import unittest
+
+from litex.tools.remote import csr_builder
+from litex.tools.remote.csr_builder import CSRBuilder, get_csr_cache_filename
+
+from litex.soc.integration.builder import builder_args, builder_argdict
+
+csr_csv_contents = """\
+#--------------------------------------------------------------------------------
+# Auto-generated by LiteX
+#--------------------------------------------------------------------------------
+csr_base,ctrl,0xf0000000,,
+csr_register,ctrl_reset,0xf0000000,1,rw
+csr_register,ctrl_scratch,0xf0000004,1,rw
+constant,config_csr_data_width,32,,
+memory_region,sram,0x10000000,8192,cached
+"""
+
+class DummyComm:
+    def __init__(self):
+        self.mem = {}
+
+    def read(self, addr, length=None):
+        return self.mem.get(addr, 0)
+
+    def write(self, addr, datas):
+        for i, data in enumerate(datas):
+            self.mem[addr + 4*i] = data
+
+
+class TestCSRBuilder(unittest.TestCase):
+    def test_csr_cache(self):
+        with tempfile.TemporaryDirectory() as d:
+            csr_csv = os.path.join(d, "csr.csv")
+            with open(csr_csv, "w") as f:
+                f.write(csr_csv_contents)
+
+            # Host tools only write the cache when requested (generated by the Builder with --csr-cache otherwise).
+            comm = DummyComm()
+            bus  = CSRBuilder(comm, csr_csv)
+            self.assertFalse(os.path.exists(get_csr_cache_filename(csr_csv)))
+            bus  = CSRBuilder(comm, csr_csv, write_cache=True)
+            self.assertTrue(os.path.exists(get_csr_cache_filename(csr_csv)))
+            self.assertEqual(bus.bases.ctrl, 0xf0000000)
+            self.assertEqual(bus.mems.sram.size, 8192)
+
+            # Registers are all built, in csr.csv order.
+            self.assertEqual(list(bus.regs.__dict__.keys()), ["ctrl_reset", "ctrl_scratch"])
+            self.assertEqual(list(bus.regs.d.keys()), ["ctrl_reset", "ctrl_scratch"])
+            bus.regs.ctrl_scratch.write(0x12345678)
+            self.assertEqual(bus.regs.ctrl_scratch.read(), 0x12345678)
+            with self.assertRaises(AttributeError):
+                bus.regs.ctrl_unknown
+
+            # Next starts: items come from the cache (csr.csv not parsed).
+            parse_csr_csv = csr_builder.parse_csr_csv
+            csr_builder.parse_csr_csv = None
+            try:
+                self.assertEqual(CSRBuilder(comm, csr_csv).regs.ctrl_reset.addr, 0xf0000000)
+            finally:
+                csr_builder.parse_csr_csv = parse_csr_csv
+
+            # csr.csv update invalidates the cache (even with same size and mtime).
+            stat = os.stat(csr_csv)
+            with open(csr_csv, "w") as f:
+                f.write(csr_csv_contents.replace("0xf0000004", "0xf0000008"))
+            os.utime(csr_csv, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+            self.assertEqual(os.stat(csr_csv).st_size, stat.st_size)
+            self.assertEqual(CSRBuilder(comm, csr_csv).regs.ctrl_scratch.addr, 0xf0000008)
+
+    def test_csr_cache_builder_args(self):
+        # The Builder only writes the cache when explicitly requested.
+        parser = argparse.ArgumentParser()
+        builder_args(parser)
+        args = builder_argdict(parser.parse_args(["--csr-csv", "csr.csv"]))
+        self.assertEqual(args["csr_cache"], False)
+        args = builder_argdict(parser.parse_args(["--csr-csv", "csr.csv", "--csr-cache"]))
+        self.assertEqual(args["csr_cache"], True)
+
+    def test_csr_cache_read_only(self):
+        with tempfile.TemporaryDirectory() as d:
+            csr_csv = os.path.join(d, "csr.csv")
+            with open(csr_csv, "w") as f:
+                f.write(csr_csv_contents)
+            os.chmod(d, 0o555)
+            try:
+                bus = CSRBuilder(DummyComm(), csr_csv, write_cache=True)
+                self.assertEqual(bus.regs.ctrl_scratch.addr, 0xf0000004)
+            finally:
+                os.chmod(d, 0o755)
+
+    def test_poll_rmw_emulation(self):
+        class DummyCommBuilder(DummyComm, CSRBuilder):
+            def write(self, addr, datas):
+                DummyComm.write(self, addr, datas if isinstance(datas, list) else [datas])
+        comm = DummyCommBuilder()
+        comm.write(0x100, 0x12345678)
+        comm.rmw(0x100, 0x0000ff00, 0xaaaaaaaa)
+        self.assertEqual(comm.read(0x100), 0x1234aa78)
+        self.assertTrue(comm.poll(0x100, 0x0000ff00, 0x0000aa00))
+        self.assertFalse(comm.poll(0x100, 0x1, 0x1, timeout=0.01))
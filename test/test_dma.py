@@ -0,0 +1,76 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import logging
+
+from migen import *
+
+from litex.build.generic_platform import Pins
+from litex.build.xilinx import XilinxPlatform
+from litex.build.io import CRG
+
+from litex.soc.integration.soc_core import SoCCore
+
+
+class TestSPIFlashDMA(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def test_spi_flash_dma(self):
+        # SPI Flash DMA copying from the SRAM (standing for the memory-mapped Flash) to the Main RAM.
+        platform = XilinxPlatform("xc7a35ticsg324-1L", [("clk", 0, Pins("E3"))], toolchain="vivado")
+        soc = SoCCore(platform,
+            clk_freq                 = int(1e6),
+            cpu_type                 = None,
+            integrated_main_ram_size = 0x100,
+            with_uart                = False,
+            with_timer               = False)
+        soc.crg = CRG(platform.request("clk"))
+        soc.add_spi_flash_dma(name="spiflash")
+        soc.finalize()
+        self.assertIn("spiflash_dma_reader", soc.csr_regions.keys())
+        self.assertIn("spiflash_dma_writer", soc.csr_regions.keys())
+
+        sram_base     = soc.bus.regions["sram"].origin
+        main_ram_base = soc.bus.regions["main_ram"].origin
+        reader        = soc.spiflash_dma_reader
+        writer        = soc.spiflash_dma_writer
+        data          = [(0x01020304*i) & 0xffffffff for i in range(64)]
+        results       = []
+
+        def copy(src, dst, length):
+            # Same sequence as the BIOS (flash_dma_start/flash_dma_wait).
+            yield reader._enable.storage.eq(0)
+            yield writer._enable.storage.eq(0)
+            yield
+            for csr, value in [
+                (reader._base,   src),
+                (reader._length, length),
+                (writer._base,   dst),
+                (writer._length, length)]:
+                yield csr.storage.eq(value)
+            yield writer._enable.storage.eq(1)
+            yield
+            yield reader._enable.storage.eq(1)
+            for i in range(1000):
+                if (yield writer._done.status):
+                    break
+                yield
+
+        def generator():
+            for i, d in enumerate(data):
+                yield soc.sram.mem[i].eq(d)
+            # Two blocks, as the BIOS re-arms the DMA for each block.
+            yield from copy(sram_base + 0x00, main_ram_base + 0x00, 0x80)
+            yield from copy(sram_base + 0x80, main_ram_base + 0x80, 0x40)
+            for i in range(64):
+                results.append((yield soc.main_ram.mem[i]))
+
+        run_simulation(soc, generator())
+        self.assertEqual(results, data[:48] + [0]*16)
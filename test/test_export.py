@@ -0,0 +1,64 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import tempfile
+import unittest
+
+from litex.build.generic_platform import Pins
+from litex.build.xilinx import XilinxPlatform
+from litex.build.io import CRG
+from litex.build.tools import write_to_file, generated_banner
+
+from litex.soc.integration import export
+from litex.soc.integration.soc_core import SoCCore
+
+
+def strip_banner(contents):
+    return "\n".join(contents.split("\n")[3:])
+
+
+class TestExport(unittest.TestCase):
+    def soc(self):
+        platform = XilinxPlatform("xc7a35ticsg324-1L", [("clk", 0, Pins("E3"))], toolchain="vivado")
+        soc = SoCCore(platform,
+            clk_freq                 = int(1e6),
+            cpu_type                 = None,
+            integrated_main_ram_size = 0x100,
+            with_uart                = False,
+            with_timer               = True)
+        soc.crg = CRG(platform.request("clk"))
+        soc.finalize()
+        return soc
+
+    def test_csr_header_fragments(self):
+        soc = self.soc()
+        kwargs = dict(
+            regions   = soc.csr_regions,
+            constants = soc.constants,
+            csr_base  = soc.mem_regions["csr"].origin)
+        csr_header = strip_banner(export.get_csr_header(**kwargs))
+        fragments  = export.get_csr_header_fragments(**kwargs)
+        self.assertEqual(set(fragments.keys()), {"csr.h", "csr_base.h", "csr/ctrl.h", "csr/timer0.h"})
+        # Each fragment contains the defines/functions of its peripheral, as in csr.h.
+        for name in soc.csr_regions.keys():
+            fragment = strip_banner(fragments[f"csr/{name}.h"])
+            body     = fragment[fragment.index(f"\n/* {name} */\n"):fragment.rindex("\n#endif")]
+            self.assertIn(body, csr_header)
+            self.assertIn(f"#include <generated/csr/{name}.h>\n", fragments["csr.h"])
+        self.assertNotIn("timer0", fragments["csr/ctrl.h"])
+
+    def test_write_to_file_ignore_banner_date(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "soc.h")
+            contents = generated_banner("//") + "#define FOO 1\n"
+            write_to_file(filename, contents)
+            banner_date = contents.replace(contents.split("\n")[1][-19:], "1970-01-01 00:00:00")
+            # Only the banner date differs: file is kept.
+            write_to_file(filename, banner_date, ignore_banner_date=True)
+            self.assertEqual(open(filename).read(), contents)
+            # Contents differ: file is rewritten.
+            write_to_file(filename, banner_date + "#define BAR 1\n", ignore_banner_date=True)
+            self.assertEqual(open(filename).read(), banner_date + "#define BAR 1\n")
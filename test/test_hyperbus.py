@@ -5,8 +5,12 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import unittest
+import random
 
 from migen import *
+from migen.sim import passive
+
+from litex.build.io import DDROutput, DDRInput
 
 from litex.soc.cores.hyperbus import HyperRAM
 
@@ -25,6 +29,106 @@ class HyperRamPads:
         self.rwds = Record([("oe", 1), ("o", dw//8),  ("i", dw//8)])
 
 
+class SimDDROutputImpl(Module):
+    def __init__(self, i1, i2, o):
+        # As the DDR primitives (ODDR SAME_EDGE, ODDRX1F, sim DDR_OUTPUT): i1/i2 are registered on
+        # sys_clk rising edge and output on the first/second half of the next sys_clk period. The
+        # level at the end of the period (i2) is enough for the model (edges detection).
+        self.sync += o.eq(i2)
+
+
+class SimDDROutput:
+    @staticmethod
+    def lower(dr):
+        return SimDDROutputImpl(dr.i1, dr.i2, dr.o)
+
+
+class SimDDRInputImpl(Module):
+    def __init__(self, i, o1, o2):
+        # As the DDR primitives (IDDR SAME_EDGE_PIPELINED, IDDRX1F): i is sampled on sys_clk rising
+        # and falling edges and output on the next sys_clk rising edge. Only the rising edge sample
+        # (o1) is used by the core.
+        self.sync += o1.eq(i)
+
+
+class SimDDRInput:
+    @staticmethod
+    def lower(dr):
+        return SimDDRInputImpl(dr.i, dr.o1, dr.o2)
+
+
+class HyperRAMModel:
+    """Edge based simulation model of a x8 HyperRAM.
+
+    DQ is sampled/driven on each Clk edge; Clk edges are detected on the Clk pad level changes. On
+    reads, RWDS is toggled with the data (edge aligned) and DQ/RWDS can be delayed by read_delay
+    sys_clk cycles (Clk to DQ/RWDS and IOs delays).
+    """
+    def __init__(self, pads, latency=6, latency_mode="fixed", latency_x2=True, read_delay=0, size=4096):
+        self.pads         = pads
+        self.latency      = latency
+        self.latency_mode = latency_mode
+        self.latency_x2   = latency_x2
+        self.read_delay   = read_delay
+        self.mem          = bytearray(size)
+        self.cr0          = None
+        self.bursts       = 0
+
+    @passive
+    def generator(self):
+        pads     = self.pads
+        clk_prev = 0
+        edge     = 0
+        dq_i     = 0
+        rwds_i   = 0
+        delay    = [(0, 0)]*self.read_delay
+        while True:
+            cs_n = (yield pads.cs_n)
+            clk  = (yield pads.clk)
+            if cs_n:
+                edge   = 0
+                ca     = 0
+                dq_i   = 0
+                rwds_i = 0
+            else:
+                # Latency indication on RWDS during Command/Address.
+                x2 = self.latency_x2 or (self.latency_mode == "fixed")
+                if edge < 6:
+                    rwds_i = x2
+                if clk != clk_prev:
+                    # Command/Address.
+                    if edge < 6:
+                        ca = (ca << 8) | ((yield pads.dq.o) & 0xff)
+                        if edge == 5:
+                            self.bursts += 1
+                            read    = (ca >> 47) & 0b1
+                            reg     = (ca >> 46) & 0b1
+                            address = (((ca >> 16) & (2**29 - 1)) << 3) | (ca & 0b111)
+                            first   = 6 if reg else 4 + 2*self.latency*(2 if x2 else 1)
+                            config  = 0
+                            rwds_i  = 0
+                    # Register write (CR0).
+                    elif reg:
+                        config = (config << 8) | ((yield pads.dq.o) & 0xff)
+                        if edge == 7:
+                            self.cr0 = config
+                    # Memory read/write.
+                    elif edge >= first:
+                        n = 2*address + edge - first
+                        if read:
+                            dq_i   = self.mem[n]
+                            rwds_i = (edge - first + 1)%2
+                        elif not (yield pads.rwds.o):
+                            self.mem[n] = (yield pads.dq.o)
+                    edge += 1
+            delay.append((dq_i, rwds_i))
+            _dq_i, _rwds_i = delay.pop(0)
+            yield pads.dq.i.eq(_dq_i)
+            yield pads.rwds.i.eq(_rwds_i)
+            clk_prev = clk
+            yield
+
+
 class TestHyperBus(unittest.TestCase):
     def test_hyperram_syntax(self):
         pads = Record([("clk", 1), ("cs_n", 1), ("dq", 8), ("rwds", 1)])
@@ -86,3 +190,99 @@ class TestHyperBus(unittest.TestCase):
 
         dut = HyperRAM(HyperRamPads())
         run_simulation(dut, [fpga_gen(dut), hyperram_gen(dut)], vcd_name="sim.vcd")
+
+    def hyperram_model_test(self, clk_ratio="4:1", latency=6, latency_mode="fixed", latency_x2=True,
+        read_delay=0, with_config=False):
+        dut   = HyperRAM(HyperRamPads(), latency=latency, sys_clk_freq=100e6, clk_ratio=clk_ratio,
+            latency_mode = latency_mode,
+            with_config  = with_config)
+        model = HyperRAMModel(dut.pads, latency=latency, latency_mode=latency_mode, latency_x2=latency_x2,
+            read_delay=read_delay)
+        prng  = random.Random(42)
+        datas = [prng.randrange(2**32) for i in range(32)]
+        dut.cycles = {"now": 0}
+
+        def burst(bus, adr, datas=None, n=None):
+            # Incrementing burst, keeping cyc/stb asserted.
+            we = datas is not None
+            n  = len(datas) if we else n
+            r  = []
+            yield bus.cyc.eq(1)
+            yield bus.stb.eq(1)
+            yield bus.we.eq(we)
+            yield bus.sel.eq(0b1111)
+            i = 0
+            while i < n:
+                yield bus.adr.eq(adr + i)
+                yield bus.cti.eq(0b111 if i == (n - 1) else 0b010)
+                if we:
+                    yield bus.dat_w.eq(datas[i])
+                yield
+                if (yield bus.ack):
+                    r.append((yield bus.dat_r))
+                    i += 1
+            yield bus.cyc.eq(0)
+            yield bus.stb.eq(0)
+            yield
+            return r
+
+        def fpga_gen(dut):
+            for name, n in [("write-1", 1), ("read-1", 1), ("write-32", 32), ("read-32", 32)]:
+                start = dut.cycles["now"]
+                if name.startswith("write"):
+                    yield from burst(dut.bus, 0x100, datas=datas[:n])
+                else:
+                    r = yield from burst(dut.bus, 0x100, n=n)
+                    self.assertEqual(r, datas[:n])
+                dut.cycles[name] = dut.cycles["now"] - start
+            # Check memory content (big endian 32-bit words).
+            for i, data in enumerate(datas):
+                self.assertEqual(int.from_bytes(model.mem[4*(0x100 + i):4*(0x100 + i + 1)], "big"), data)
+
+        @passive
+        def timer_gen(dut):
+            while True:
+                dut.cycles["now"] += 1
+                yield
+
+        run_simulation(dut, [fpga_gen(dut), timer_gen(dut), model.generator()],
+            special_overrides={DDROutput: SimDDROutput, DDRInput: SimDDRInput})
+        return dut, model
+
+    def test_hyperram_model(self):
+        dut, model = self.hyperram_model_test()
+        self.assertEqual(model.cr0, None)
+        # Bursts are used for consecutive accesses.
+        self.assertEqual(model.bursts, 4)
+
+    def test_hyperram_clk_ratio_2_1(self):
+        self.hyperram_model_test(clk_ratio="2:1")
+
+    def test_hyperram_clk_ratio_2_1_read_delay(self):
+        # Read data is validated by RWDS: no dependency on the Clk to DQ/RWDS delays.
+        for read_delay in [1, 2, 3]:
+            for latency_mode in ["fixed", "variable"]:
+                self.hyperram_model_test(clk_ratio="2:1", latency_mode=latency_mode, latency_x2=False,
+                    read_delay=read_delay)
+
+    def test_hyperram_config(self):
+        dut, model = self.hyperram_model_test(latency=7, with_config=True)
+        self.assertEqual(model.cr0, 0x8f2f)
+        dut, model = self.hyperram_model_test(latency_mode="variable")
+        self.assertEqual(model.cr0, 0x8f17)
+
+    def test_hyperram_variable_latency(self):
+        for clk_ratio in ["4:1", "2:1"]:
+            for latency_x2 in [True, False]:
+                self.hyperram_model_test(clk_ratio=clk_ratio, latency_mode="variable", latency_x2=latency_x2)
+
+    def test_hyperram_throughput(self):
+        # Sequential throughput (sys_clk cycles per 32-bit word on 32-word bursts).
+        dut_4_1, _ = self.hyperram_model_test(clk_ratio="4:1")
+        dut_2_1, _ = self.hyperram_model_test(clk_ratio="2:1", latency_mode="variable", latency_x2=False)
+        for name in ["write-32", "read-32"]:
+            self.assertLess(dut_4_1.cycles[name], 32*8 + 128)
+            self.assertLess(dut_2_1.cycles[name], 32*4 + 64)
+        # Single accesses latency.
+        for name in ["write-1", "read-1"]:
+            self.assertLess(dut_2_1.cycles[name], dut_4_1.cycles[name]/2)
@@ -0,0 +1,61 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+from functools import reduce
+from operator import or_
+
+from migen import *
+
+from litex.gen.fhdl.verilog import convert
+from litex.gen.fhdl.logic_depth import LogicDepthAnalyzer
+
+
+class TestLogicDepth(unittest.TestCase):
+    def test_chain_depth(self):
+        class DUT(Module):
+            def __init__(self):
+                self.clock_domains.cd_sys = ClockDomain()
+                self.a = a = Signal(32)
+                self.b = b = Signal(32)
+                self.c = c = Signal(32)
+                self.s = s = Signal(32)
+                self.e = e = Signal()
+                self.o = o = Signal(32)
+                self.sync += [a.eq(a + 1), b.eq(b + 1), c.eq(c + 1)]
+                self.comb += s.eq(a + b)
+                self.comb += e.eq(s == c)
+                self.sync += If(e, o.eq(s))
+
+        dut = DUT()
+        r   = convert(dut, ios={dut.o, dut.cd_sys.clk, dut.cd_sys.rst}, analyze_logic_depth=True)
+        paths = r.logic_depth.get_paths(n=10)
+        worst = paths[0]
+        # a/b -> adder (2) -> s -> == (3 levels over 64 bits) -> e -> If mux (1) -> o.
+        self.assertEqual(worst["endpoint"], "o")
+        self.assertAlmostEqual(worst["depth"], 2 + 3 + 1)
+        self.assertEqual([name for name, depth in worst["path"]][-2:], ["s", "e"])
+        self.assertAlmostEqual(r.logic_depth.max_depth, worst["depth"])
+        self.assertIn("o (sys)", r.logic_depth.report(n=1))
+
+    def test_wide_or_and_array(self):
+        class DUT(Module):
+            def __init__(self):
+                regs = [Signal(8) for i in range(36)]
+                sel  = Signal(6)
+                self.o1 = o1 = Signal(8)
+                self.o2 = o2 = Signal(8)
+                self.sync += [r.eq(r + 1) for r in regs]
+                self.sync += sel.eq(sel + 1)
+                # OR tree of 36 inputs: 2 levels of 6-input LUTs (not a 35-deep chain).
+                self.sync += o1.eq(reduce(or_, regs))
+                # 36:1 mux: 3 levels of 4:1 muxes.
+                self.sync += o2.eq(Array(regs)[sel])
+
+        dut = DUT()
+        analyzer = LogicDepthAnalyzer(dut)
+        depths = {p["endpoint"]: p["depth"] for p in analyzer.get_paths(n=100)}
+        self.assertEqual(depths["o1"], 2)
+        self.assertEqual(depths["o2"], 3)
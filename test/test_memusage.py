@@ -0,0 +1,93 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import sys
+import tempfile
+import unittest
+import subprocess
+from shutil import which
+
+from litex.soc.software.memusage import get_memusage, diff_memusage, parse_linker_regions
+
+lib_c = """
+int lib_table[{n}] = {{1}};
+int lib_func(int x) {{ return lib_table[x & 63] * 3; }}
+int lib_unused(int x) {{ return x + 1; }}
+"""
+
+main_c = """
+extern int lib_func(int);
+static char buffer[512];
+const char message[] = "hello world";
+int counter = 5;
+void _start(void) { buffer[0] = message[counter]; counter = lib_func(buffer[1]); for(;;); }
+"""
+
+regions_ld = """
+MEMORY {
+	rom : ORIGIN = 0x00000000, LENGTH = 0x00008000
+	sram : ORIGIN = 0x10000000, LENGTH = 0x00002000
+}
+"""
+
+linker_ld = """
+ENTRY(_start)
+INCLUDE regions.ld
+SECTIONS {
+	.text : { *(.text .text.*) } > rom
+	.rodata : { *(.rodata .rodata.*) } > rom
+	.data : { *(.data .data.*) } > sram AT > rom
+	.bss : { *(.bss .bss.* COMMON) } > sram
+	/DISCARD/ : { *(.eh_frame .note.* .comment) }
+}
+"""
+
+def build(d, n):
+    for filename, contents in [("lib.c", lib_c.format(n=n)), ("main.c", main_c), ("regions.ld", regions_ld), ("linker.ld", linker_ld)]:
+        with open(os.path.join(d, filename), "w") as f:
+            f.write(contents)
+    cflags = ["-O1", "-ffunction-sections", "-fdata-sections", "-fno-pic", "-fno-asynchronous-unwind-tables"]
+    for cmd in [
+        ["gcc", *cflags, "-c", "lib.c", "main.c"],
+        ["ar", "rcs", "libfoo.a", "lib.o"],
+        ["gcc", "-nostdlib", "-static", "-no-pie", "-Wl,--build-id=none", "-T", "linker.ld",
+         "-Wl,--gc-sections", "-Wl,-Map,app.elf.map", "-o", "app.elf", "main.o", "-L.", "-lfoo"]]:
+        subprocess.run(cmd, cwd=d, check=True, capture_output=True)
+    return get_memusage(
+        elf_filename = os.path.join(d, "app.elf"),
+        regions      = parse_linker_regions(os.path.join(d, "regions.ld")),
+        map_filename = os.path.join(d, "app.elf.map"))
+
+
+@unittest.skipIf(which("gcc") is None or not sys.platform.startswith("linux"), "GCC (Linux) not installed")
+class TestMemUsage(unittest.TestCase):
+    def test_memusage(self):
+        with tempfile.TemporaryDirectory() as d:
+            old = build(d, n=64)
+            new = build(d, n=128)
+
+        # Regions: .data is accounted to both ROM (LMA) and SRAM (VMA).
+        sections = old["sections"]
+        self.assertEqual(sections[".data"]["regions"], ["sram", "rom"])
+        self.assertEqual(old["regions"]["rom"]["used"],
+            sum(sections[s]["size"] for s in [".text", ".rodata", ".data"]))
+        self.assertEqual(old["regions"]["sram"]["used"],
+            sum(sections[s]["size"] for s in [".data", ".bss"]))
+
+        # Libraries/Symbols.
+        symbols = {s["name"]: s for s in old["symbols"]}
+        self.assertEqual(symbols["lib_table"]["library"], "libfoo")
+        self.assertEqual(symbols["lib_table"]["size"], 64*4)
+        self.assertEqual(symbols["buffer"]["library"], "app")
+        self.assertNotIn("lib_unused", symbols) # Garbage collected.
+        self.assertIn("lib.o", old["libraries"]["libfoo"]["objects"])
+        self.assertGreaterEqual(old["libraries"]["libfoo"]["regions"]["sram"], 64*4)
+
+        # Diff.
+        diff = diff_memusage(old, new)
+        self.assertEqual(diff["regions"], {"rom": 64*4, "sram": 64*4})
+        self.assertEqual(diff["libraries"], {"libfoo": {"rom": 64*4, "sram": 64*4}})
+        self.assertEqual(diff["symbols"], {"libfoo:lib_table": 64*4})
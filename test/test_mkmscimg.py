@@ -0,0 +1,143 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import json
+import random
+import binascii
+import tempfile
+import unittest
+import subprocess
+from shutil import which
+
+from litex.soc.software import mkmscimg
+from litex.soc.software.mkmscimg import insert_crc, parse_boot_json, make_boot_image, read_boot_image
+
+libbase_dir = os.path.join(os.path.dirname(mkmscimg.__file__), "libbase")
+
+# Loads the payloads of a boot image with libbase's crc32/lz4_decompress_crc (as the BIOS).
+loader_c = """
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <stdint.h>
+#include "crc.h"
+#include "lz4.h"
+
+int main(int argc, char **argv)
+{
+    FILE *f = fopen(argv[1], "rb");
+    static unsigned char image[1 << 24];
+    size_t size = fread(image, 1, sizeof(image), f);
+    uint32_t *header = (uint32_t *) image;
+    uint32_t i;
+    fclose(f);
+    if (crc32_update(crc32(image, 28), image + 32, header[1]*24) != header[7])
+        return 1;
+    for (i=0; i<header[1]; i++) {
+        uint32_t *entry = (uint32_t *) (image + 32 + 24*i);
+        unsigned char *payload = malloc(entry[2]);
+        unsigned int crc = 0;
+        char filename[256];
+        if (entry[0] + entry[1] > size)
+            return 2;
+        if (entry[5] & 1) {
+            /* CRC computed while decompressing (single pass). */
+            if (lz4_decompress_crc(image + entry[0], entry[1], payload, entry[2], &crc) != (int) entry[2])
+                return 3;
+        } else {
+            memcpy(payload, image + entry[0], entry[1]);
+            crc = crc32(payload, entry[1]);
+        }
+        if (crc != entry[4])
+            return 4;
+        snprintf(filename, sizeof(filename), "%s.%d", argv[1], i);
+        f = fopen(filename, "wb");
+        fwrite(payload, 1, entry[2], f);
+        fclose(f);
+        free(payload);
+    }
+    return 0;
+}
+"""
+
+
+class TestMkMSCImg(unittest.TestCase):
+    def test_insert_crc(self):
+        data = bytes(random.Random(0).randrange(256) for _ in range(5000))
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "bios.bin")
+            for fbi_mode in [False, True]:
+                with open(filename, "wb") as f:
+                    f.write(data)
+                insert_crc(filename, fbi_mode=fbi_mode, little_endian=True)
+                crc    = binascii.crc32(data).to_bytes(4, "little")
+                length = len(data).to_bytes(4, "little")
+                with open(filename, "rb") as f:
+                    self.assertEqual(f.read(), (length + crc + data) if fbi_mode else (data + crc))
+
+    def boot_image(self, d):
+        prng = random.Random(42)
+        payloads = {
+            "Image"       : b"".join(prng.choice([b"litex ", b"linux ", b"\x00"*8, b"\x13\x05"]) for _ in range(20000)),
+            "tiny"        : b"abcdabcdabcdabcdabcd",
+            "rv32.dtb"    : bytes(prng.randrange(256) for _ in range(3000)),
+            "opensbi.bin" : b"\x13\x00\x00\x00"*5000,
+        }
+        for name, data in payloads.items():
+            with open(os.path.join(d, name), "wb") as f:
+                f.write(data)
+        with open(os.path.join(d, "boot.json"), "w") as f:
+            json.dump({
+                "Image"       : {"address": "0x40000000", "compress": True},
+                "tiny"        : {"address": "0x40e00000", "compress": True},
+                "rv32.dtb"    : {"address": "0x40ef0000", "compress": True},
+                "opensbi.bin" : "0x40f00000",
+                "bootargs"    : {"r1": "0x40ef0000", "addr": "0x40f00000"},
+            }, f)
+        boot_payloads, bootargs = parse_boot_json(os.path.join(d, "boot.json"))
+        filename = os.path.join(d, "boot.img")
+        make_boot_image(boot_payloads, filename, bootargs, align=0x10000, little_endian=True)
+        return filename, payloads
+
+    def test_boot_image(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename, payloads = self.boot_image(d)
+            bootargs, entries  = read_boot_image(filename, little_endian=True)
+            self.assertEqual(bootargs, {"r1": 0x40ef0000, "r2": 0, "r3": 0, "addr": 0x40f00000})
+            self.assertEqual([e["address"] for e in entries], [0x40000000, 0x40e00000, 0x40ef0000, 0x40f00000])
+            with open(filename, "rb") as f:
+                image = f.read()
+            self.assertEqual(len(image) % 0x10000, 0)
+            for entry, data in zip(entries, payloads.values()):
+                self.assertEqual(entry["offset"] % 0x10000, 0)
+                self.assertEqual(entry["size"], len(data))
+                stored = image[entry["offset"]:entry["offset"] + entry["length"]]
+                self.assertEqual(binascii.crc32(stored), entry["crc"])
+            # Compressed when requested and compressible.
+            self.assertEqual([e["flags"] for e in entries], [1, 1, 0, 0])
+            self.assertLess(entries[0]["length"], len(payloads["Image"])//2)
+
+    @unittest.skipIf(which("gcc") is None, "GCC not installed")
+    def test_boot_image_loader(self):
+        with tempfile.TemporaryDirectory() as d:
+            filename, payloads = self.boot_image(d)
+            with open(os.path.join(d, "loader.c"), "w") as f:
+                f.write(loader_c)
+            subprocess.run(["gcc", "-O1", "-I", libbase_dir, "-o", "loader", "loader.c",
+                os.path.join(libbase_dir, "crc32.c"), os.path.join(libbase_dir, "lz4.c")],
+                cwd=d, check=True)
+            subprocess.run([os.path.join(d, "loader"), filename], check=True)
+            for i, data in enumerate(payloads.values()):
+                with open(filename + ".{}".format(i), "rb") as f:
+                    self.assertEqual(f.read(), data)
+            # Corrupted compressed payload: detected by the single-pass CRC.
+            _, entries = read_boot_image(filename, little_endian=True)
+            with open(filename, "r+b") as f:
+                f.seek(entries[0]["offset"] + entries[0]["length"]//2)
+                byte = f.read(1)
+                f.seek(-1, os.SEEK_CUR)
+                f.write(bytes([byte[0] ^ 0x01]))
+            self.assertIn(subprocess.run([os.path.join(d, "loader"), filename]).returncode, [3, 4])
@@ -0,0 +1,154 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import unittest
+import random
+from shutil import which
+
+from migen import *
+
+from litex.gen.sim import Simulator, run_simulation, run_verilator_simulation, ActivityProfiler
+
+
+class MemoryDUT(Module):
+    def __init__(self, width=32, depth=16, init=None):
+        self.mem = Memory(width, depth, init=init)
+        self.specials += self.mem
+        self.ports = [
+            self.mem.get_port(write_capable=True, we_granularity=8, mode=READ_FIRST),
+            self.mem.get_port(write_capable=True, mode=WRITE_FIRST, has_re=True),
+            self.mem.get_port(write_capable=True, mode=NO_CHANGE),
+            self.mem.get_port(async_read=True),
+        ]
+        self.specials += self.ports
+
+
+def memory_generator(dut, trace, seed=42, n=200):
+    prng = random.Random(seed)
+    for i in range(n):
+        for port in dut.ports:
+            yield port.adr.eq(prng.randrange(dut.mem.depth))
+            if port.we is not None:
+                yield port.we.eq(prng.randrange(2**len(port.we)) if prng.randrange(4) == 0 else 0)
+                yield port.dat_w.eq(prng.randrange(2**dut.mem.width))
+            if port.re is not None:
+                yield port.re.eq(prng.randrange(2))
+        yield
+        for port in dut.ports:
+            trace.append((yield port.dat_r))
+    for i in range(dut.mem.depth):
+        trace.append((yield dut.mem[i]))
+
+
+class CounterDUT(Module):
+    def __init__(self, enable):
+        self.counter = Signal(4)
+        self.sync += If(enable, self.counter.eq(self.counter + 1))
+
+
+class ActivityDUT(Module):
+    def __init__(self):
+        self.submodules.hot  = CounterDUT(enable=1)
+        self.submodules.cold = CounterDUT(enable=0)
+
+
+class TestSim(unittest.TestCase):
+    def test_native_memory_equivalence(self):
+        traces = {}
+        for native_memories in [False, True]:
+            init = [i*0x01010101 for i in range(16)]
+            dut  = MemoryDUT(init=init)
+            trace = traces[native_memories] = []
+            run_simulation(dut, memory_generator(dut, trace), native_memories=native_memories)
+        self.assertEqual(traces[False], traces[True])
+
+    def test_native_memory_testbench_access(self):
+        dut = MemoryDUT(depth=4)
+        def generator(dut):
+            yield dut.mem[1].eq(0x12345678)
+            yield
+            self.assertEqual((yield dut.mem[1]), 0x12345678)
+            yield dut.ports[3].adr.eq(1)
+            yield
+            self.assertEqual((yield dut.ports[3].dat_r), 0x12345678)
+            yield dut.ports[3].adr.eq(2)
+            yield
+            self.assertEqual((yield dut.ports[3].dat_r), 0xcafebabe)
+        with Simulator(dut, generator(dut), native_memories=True) as sim:
+            sim.memories[dut.mem].load([0xcafebabe, 0xdeadbeef], offset=2)
+            sim.run()
+            self.assertEqual(sim.memories[dut.mem].dump(), [0, 0x12345678, 0xcafebabe, 0xdeadbeef])
+
+    def test_native_memory_large(self):
+        # 1M words memory: instantiated without creating one Signal per word.
+        mem  = Memory(32, 2**20)
+        port = mem.get_port(write_capable=True)
+        dut  = Module()
+        dut.specials += mem, port
+        def generator():
+            yield port.adr.eq(2**20 - 1)
+            yield port.dat_w.eq(0x5a5a5a5a)
+            yield port.we.eq(1)
+            yield
+            yield port.we.eq(0)
+            yield
+            yield
+            self.assertEqual((yield port.dat_r), 0x5a5a5a5a)
+        run_simulation(dut, generator(), native_memories=True)
+
+    # Verilator is built in CI: only skipped outside of CI.
+    @unittest.skipIf(which("verilator") is None and not os.environ.get("CI"), "Verilator not installed")
+    def test_verilator_memory_equivalence(self):
+        traces = {}
+        for backend, run in [("python", run_simulation), ("verilator", run_verilator_simulation)]:
+            init = [i*0x01010101 for i in range(16)]
+            dut  = MemoryDUT(init=init)
+            trace = traces[backend] = []
+            run(dut, memory_generator(dut, trace))
+        self.assertEqual(traces["python"], traces["verilator"])
+
+    def test_verilator_design_driven_clocks(self):
+        # Designs driving all their clocks leave no simulator driven IOs: clear error (before build).
+        class DUT(Module):
+            def __init__(self):
+                self.clock_domains.cd_sys = ClockDomain(reset_less=True)
+                self.comb += self.cd_sys.clk.eq(1)
+                counter = Signal(8)
+                self.sync += counter.eq(counter + 1)
+        with self.assertRaises(ValueError):
+            run_verilator_simulation(DUT(), [], clocks={"sys": 10})
+
+    def test_verilator_signal_values_reset(self):
+        # Signals not in the Verilator model read as their reset value until written.
+        from litex.gen.sim.verilator import _VerilatorSignalValues
+        values = _VerilatorSignalValues(model=None, names={})
+        signal = Signal(8, reset=0x5a)
+        self.assertEqual(values[signal], 0x5a)
+        values[signal] = 0x12
+        self.assertEqual(values[signal], 0x12)
+
+    def test_activity_profiler(self):
+        dut = ActivityDUT()
+        def generator():
+            for i in range(16):
+                yield
+        profiler = ActivityProfiler()
+        run_simulation(dut, generator(), activity_profiler=profiler)
+        # 4-bit counter incremented on each of the 17 cycles.
+        bits = sum(bin((i % 16) ^ ((i + 1) % 16)).count("1") for i in range(17))
+        signals = {s["name"]: s for s in profiler.get_signals(n=100)}
+        counter = [s for name, s in signals.items() if "hot" in name and "counter" in name][0]
+        self.assertEqual(counter["toggles"], 17)
+        self.assertEqual(counter["bits"], bits)
+        self.assertFalse(any("cold" in name for name in signals))
+        # Aggregation by hierarchy.
+        modules = {m["name"]: m for m in profiler.get_modules(n=100)}
+        self.assertEqual(modules["hot"]["bits"], bits)
+        self.assertNotIn("cold", modules)
+        self.assertGreater(modules["top"]["bits"], bits)
+        # Domains.
+        self.assertEqual(profiler.get_domains()["sys"]["cycles"], 17)
+        self.assertIn("Signals:", profiler.report())
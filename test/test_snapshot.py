@@ -0,0 +1,68 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import os
+import tempfile
+import unittest
+
+from litex.build.generic_platform import Pins
+from litex.build.xilinx import XilinxPlatform
+from litex.build.io import CRG
+
+from litex.soc.integration import export
+from litex.soc.integration.soc_core import SoCCore
+from litex.soc.integration.snapshot import SoCSnapshot, get_snapshot_key
+
+
+def soc_exports(soc, svd_regions=None):
+    return [
+        export.get_csr_json(soc.csr_regions, soc.constants, soc.mem_regions),
+        export.get_csr_csv(soc.csr_regions, soc.constants, soc.mem_regions),
+        export.get_csr_header(soc.csr_regions, soc.constants, csr_base=soc.mem_regions["csr"].origin),
+        export.get_soc_header(soc.constants),
+        export.get_mem_header(soc.mem_regions),
+        export.get_memory_x(soc),
+        export.get_csr_svd(soc, description="test", documented_regions=svd_regions),
+    ]
+
+
+class TestSnapshot(unittest.TestCase):
+    def soc(self):
+        platform = XilinxPlatform("xc7a35ticsg324-1L", [("clk", 0, Pins("E3"))], toolchain="vivado")
+        soc = SoCCore(platform,
+            clk_freq                 = int(1e6),
+            cpu_type                 = None,
+            integrated_main_ram_size = 0x100,
+            with_uart                = False,
+            with_timer               = True)
+        soc.crg = CRG(platform.request("clk"))
+        soc.finalize()
+        return soc
+
+    def test_snapshot_exports(self):
+        soc = self.soc()
+        with tempfile.TemporaryDirectory() as d:
+            filename = os.path.join(d, "soc_snapshot.pickle")
+            svd_regions = export.get_documented_csr_regions(soc)
+            SoCSnapshot(soc, "key", svd_regions=svd_regions).write(filename)
+            snapshot = SoCSnapshot.read(filename)
+            self.assertEqual(soc_exports(soc), soc_exports(snapshot, snapshot.svd_regions))
+
+            # Invalid key/file.
+            self.assertIsNotNone(SoCSnapshot.read(filename, key="key"))
+            self.assertIsNone(SoCSnapshot.read(filename, key="other"))
+            with open(filename, "wb") as f:
+                f.write(b"invalid")
+            self.assertIsNone(SoCSnapshot.read(filename))
+
+    def test_snapshot_key(self):
+        argv = ["target.py", "--sys-clk-freq=50e6", "--csr-json", "csr.json", "--no-compile"]
+        key  = get_snapshot_key(argv, modules=[unittest])
+        # Export/compilation arguments are not part of the key.
+        self.assertEqual(key, get_snapshot_key(argv[:2], modules=[unittest]))
+        self.assertEqual(key, get_snapshot_key(argv[:2] + ["--csr-json=soc.json"], modules=[unittest]))
+        # Other arguments/modules are.
+        self.assertNotEqual(key, get_snapshot_key(argv[:1] + ["--sys-clk-freq=60e6"], modules=[unittest]))
+        self.assertNotEqual(key, get_snapshot_key(argv, modules=[unittest, tempfile]))
@@ -0,0 +1,92 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import sys
+import unittest
+import logging
+
+from litex.soc.integration.soc import SoCBusHandler, SoCRegion, SoCIORegion, SoCError
+
+
+class TestSoCBusHandler(unittest.TestCase):
+    def setUp(self):
+        logging.disable(logging.CRITICAL)
+
+    def tearDown(self):
+        logging.disable(logging.NOTSET)
+
+    def bus(self):
+        bus = SoCBusHandler()
+        bus.add_region("io", SoCIORegion(origin=0x80000000, size=0x80000000, cached=False))
+        return bus
+
+    def test_alloc_region(self):
+        bus = self.bus()
+        bus.add_region("rom",  SoCRegion(origin=0x00000000, size=0x10000))
+        bus.add_region("sram", SoCRegion(origin=0x00020000, size=0x2000))
+        bus.add_region("a", SoCRegion(size=0x10000))
+        bus.add_region("b", SoCRegion(size=0x1000))
+        bus.add_region("c", SoCRegion(size=0x20000))
+        bus.add_region("d", SoCRegion(size=0x100, cached=False))
+        self.assertEqual(bus.regions["a"].origin, 0x00010000)
+        self.assertEqual(bus.regions["b"].origin, 0x00022000)
+        self.assertEqual(bus.regions["c"].origin, 0x00040000)
+        self.assertEqual(bus.regions["d"].origin, 0x80000000)
+
+    def test_alloc_region_linker(self):
+        # Linker regions are not considered for allocation/overlap.
+        bus = self.bus()
+        bus.add_region("rom",    SoCRegion(origin=0x00000000, size=0x10000))
+        bus.add_region("linker", SoCRegion(origin=0x00010000, size=0x10000, linker=True))
+        bus.add_region("a", SoCRegion(size=0x10000))
+        self.assertEqual(bus.regions["a"].origin, 0x00010000)
+
+    def test_regions_overlap(self):
+        bus = self.bus()
+        bus.add_region("rom", SoCRegion(origin=0x00000000, size=0x10000))
+        with self.assertRaises(SoCError):
+            bus.add_region("sram", SoCRegion(origin=0x00008000, size=0x1000))
+        self.assertEqual(bus.check_regions_overlap({
+            "a": SoCRegion(origin=0x0000, size=0x10000),
+            "b": SoCRegion(origin=0x1000, size=0x100),
+            "c": SoCRegion(origin=0x8000, size=0x100),
+        }), ("a", "b"))
+
+    def test_error_stderr(self):
+        # SoCErrors leave stderr untouched, the command-line entry points exit without traceback.
+        import subprocess
+        stderr = sys.stderr
+        bus = self.bus()
+        bus.add_region("rom", SoCRegion(origin=0x00000000, size=0x10000))
+        with self.assertRaises(SoCError):
+            bus.add_region("sram", SoCRegion(origin=0x00008000, size=0x1000))
+        self.assertIs(sys.stderr, stderr)
+        r = subprocess.run([sys.executable, "-c",
+            "from litex.soc.integration.soc import SoCError; raise SoCError()"], capture_output=True)
+        self.assertEqual(r.returncode, 1)
+        self.assertIn(b"Traceback", r.stderr)
+        r = subprocess.run([sys.executable, "-c", "; ".join([
+            "from litex.soc.integration.soc import SoCError, LiteXSoCArgumentParser",
+            "LiteXSoCArgumentParser().parse_args()",
+            "raise SoCError()"])], capture_output=True)
+        self.assertEqual(r.returncode, 1)
+        self.assertEqual(r.stderr, b"")
+
+    def test_fragmentation(self):
+        bus = self.bus()
+        bus.add_region("a", SoCRegion(origin=0x00001000, size=0x1000))
+        self.assertEqual(bus.get_free_regions(cached=True), [
+            (0x00000000, 0x00001000),
+            (0x00002000, 0x80000000 - 0x2000),
+        ])
+        self.assertAlmostEqual(bus.get_fragmentation(cached=True), 0x1000/(0x80000000 - 0x1000))
+        self.assertEqual(bus.get_fragmentation(cached=False), 0)
+
+    def test_alloc_many_regions(self):
+        bus = self.bus()
+        for i in range(2000):
+            bus.add_region(f"io{i}", SoCRegion(size=0x100, cached=False))
+        self.assertEqual(bus.regions["io1999"].origin, 0x80000000 + 1999*0x100)
+        self.assertEqual(bus.regions["io0"].origin,    0x80000000)
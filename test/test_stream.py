@@ -6,6 +6,7 @@
 
 import unittest
 import random
+import json
 
 from migen import *
 
@@ -50,3 +51,87 @@ class TestStream(unittest.TestCase):
     def test_pipe_ready(self):
         dut = PipeReady([("data", 8)])
         self.pipe_test(dut)
+
+    def test_stream_profiler(self):
+        def generator(dut, npackets=4, length=8):
+            for n in range(npackets):
+                for i in range(length):
+                    yield dut.sink.valid.eq(1)
+                    yield dut.sink.first.eq(i == 0)
+                    yield dut.sink.last.eq(i == (length - 1))
+                    yield dut.sink.data.eq(i)
+                    yield
+                    while (yield dut.sink.ready) == 0:
+                        yield
+                yield dut.sink.valid.eq(0)
+                yield
+
+        def checker(dut, npackets=4, length=8):
+            # Only accept data every other cycle to create backpressure.
+            for i in range(npackets*length):
+                yield dut.source.ready.eq(0)
+                yield
+                yield dut.source.ready.eq(1)
+                yield
+                while (yield dut.source.valid) == 0:
+                    yield
+            yield dut.source.ready.eq(0)
+
+        class DUT(Module):
+            def __init__(self):
+                self.submodules.pipe_valid = PipeValid([("data", 8)])
+                self.submodules.pipe_ready = PipeReady([("data", 8)])
+                self.submodules.pipeline   = Pipeline(self.pipe_valid, self.pipe_ready)
+                self.sink   = self.pipeline.sink
+                self.source = self.pipeline.source
+
+        dut      = DUT()
+        profiler = StreamProfiler(dut)
+        run_simulation(dut, [generator(dut), checker(dut), profiler.generator()])
+        stats = profiler.get_stats()
+        # DUT/Pipeline sink/source are shared with PipeValid/PipeReady and only profiled once.
+        self.assertEqual(set(stats.keys()), {
+            "top.sink", "top.source", "top.pipe_valid.source", "top.pipe_ready.sink"})
+        for name in ["top.sink", "top.source"]:
+            self.assertEqual(stats[name]["transfers"], 32)
+            self.assertEqual(stats[name]["packets"], 4)
+            self.assertGreater(stats[name]["stalls"], 0)
+        self.assertEqual(sum(1 for name in stats if name in profiler.report(n=2)), 2)
+        self.assertEqual(json.loads(profiler.export_json()), stats)
+
+    def test_pipeline_register_slices(self):
+        class DUT(Module):
+            def __init__(self, **kwargs):
+                stages = [Cast([("data", 8)], [("data", 8)]) for i in range(6)]
+                self.submodules += stages
+                self.submodules.pipeline = Pipeline(*stages, **kwargs)
+                self.sink   = self.pipeline.sink
+                self.source = self.pipeline.source
+
+        for kwargs, slices, latencies in [
+            (dict(),                                             [],               [0, 0, 0, 0, 0, 0]),
+            (dict(register_every=2),                             [(1, 2), (3, 4)], [0, 0, 1, 1, 2, 2]),
+            (dict(register_budget=3),                            [(2, 3)],         [0, 0, 0, 1, 1, 1]),
+            (dict(register_budget=2, register_mode="both"),      [(1, 2), (3, 4)], [0, 0, 1, 1, 2, 2]),
+            (dict(register_every=3,  register_mode="ready"),     [(2, 3)],         [0, 0, 0, 0, 0, 0]),
+            ]:
+            with self.subTest(**kwargs):
+                dut = DUT(**kwargs)
+                self.assertEqual(dut.pipeline.register_slices, slices)
+                self.assertEqual(dut.pipeline.stage_latency, latencies)
+                self.assertEqual(dut.pipeline.added_latency, latencies[-1])
+                self.pipe_test(dut)
+
+    def test_pipeline_register_budget_cdc(self):
+        # A ClockDomainCrossing is only a register stage between different Clk Domains.
+        def pipeline(cd_to):
+            layout = [("data", 8)]
+            stages = [
+                Cast(layout, layout),
+                ClockDomainCrossing(layout, cd_from="sys", cd_to=cd_to),
+                Cast(layout, layout),
+                Cast(layout, layout),
+            ]
+            return Pipeline(*stages, register_budget=2)
+        self.assertEqual(pipeline(cd_to="sys").register_slices,  [(2, 3)])
+        self.assertEqual(pipeline(cd_to="user").register_slices, [])
@@ -0,0 +1,213 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+
+from migen import *
+from migen.sim import passive
+
+from litex.soc.interconnect import wishbone
+from litex.soc.cores.uart import *
+
+
+class Stream2WishboneDUT(Module):
+    def __init__(self, init=[0x00000000, 0x12345678], **kwargs):
+        self.submodules.bridge = Stream2Wishbone(clk_freq=100e3, **kwargs)
+        self.submodules.sram   = wishbone.SRAM(4*max(16, len(init)), init=init)
+        self.comb += self.bridge.wishbone.connect(self.sram.bus)
+
+
+def send_bytes(dut, data):
+    for byte in data:
+        yield dut.bridge.sink.valid.eq(1)
+        yield dut.bridge.sink.data.eq(byte)
+        yield
+        while (yield dut.bridge.sink.ready) == 0:
+            yield
+    yield dut.bridge.sink.valid.eq(0)
+
+def recv_word(dut, timeout=10000):
+    data = []
+    yield dut.bridge.source.ready.eq(1)
+    yield
+    while len(data) < 4:
+        if (yield dut.bridge.source.valid):
+            data.append((yield dut.bridge.source.data))
+        timeout -= 1
+        assert timeout > 0
+        yield
+    yield dut.bridge.source.ready.eq(0)
+    return int.from_bytes(bytes(data), "big")
+
+def recv_words(dut, n):
+    data = []
+    yield dut.bridge.source.ready.eq(1)
+    yield
+    while len(data) < 4*n:
+        if (yield dut.bridge.source.valid):
+            data.append((yield dut.bridge.source.data))
+        yield
+    yield dut.bridge.source.ready.eq(0)
+    return [int.from_bytes(bytes(data[4*i:4*(i + 1)]), "big") for i in range(n)]
+
+def command(cmd, length, addr, *words, length_width=8):
+    r = [cmd] + list(length.to_bytes(length_width//8, "big")) + list(addr.to_bytes(4, "big"))
+    for word in words:
+        r += list(word.to_bytes(4, "big"))
+    return r
+
+
+class TestUART(unittest.TestCase):
+    def test_stream2wishbone_read_write(self):
+        dut = Stream2WishboneDUT()
+        def generator(dut):
+            yield from send_bytes(dut, command(CMD_WRITE_BURST_INCR, 1, 2, 0xcafebabe))
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 1, 2))
+            self.assertEqual((yield from recv_word(dut)), 0xcafebabe)
+        run_simulation(dut, generator(dut))
+
+    def test_stream2wishbone_rmw(self):
+        dut = Stream2WishboneDUT(with_poll_rmw=True)
+        def generator(dut):
+            yield from send_bytes(dut, command(CMD_RMW, 1, 1, 0x0000ff00, 0xaaaaaaaa))
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 1, 1))
+            self.assertEqual((yield from recv_word(dut)), 0x1234aa78)
+        run_simulation(dut, generator(dut))
+
+    def test_stream2wishbone_poll(self):
+        dut = Stream2WishboneDUT(with_poll_rmw=True)
+        def generator(dut):
+            # Match: register updated during the poll.
+            yield from send_bytes(dut, command(CMD_POLL, 10, 0, 0x00000001, 0x00000001))
+            for i in range(32):
+                yield
+            yield dut.sram.mem[0].eq(0x00000003)
+            self.assertEqual((yield from recv_word(dut)), 0x00000003)
+            # Timeout: last read value returned after ~2ms (200 cycles at 100kHz).
+            yield from send_bytes(dut, command(CMD_POLL, 2, 0, 0x00000010, 0x00000010))
+            start = 0
+            while (yield dut.bridge.source.valid) == 0:
+                start += 1
+                yield
+            self.assertGreaterEqual(start, 200)
+            self.assertEqual((yield from recv_word(dut)), 0x00000003)
+            # Bridge is still responsive.
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 1, 1))
+            self.assertEqual((yield from recv_word(dut)), 0x12345678)
+        run_simulation(dut, generator(dut))
+
+    def test_stream2wishbone_poll_no_ack(self):
+        # Slave never acking: poll abandoned (cyc/stb released) 1ms after the timeout.
+        dut = Module()
+        dut.submodules.bridge = Stream2Wishbone(clk_freq=100e3, with_poll_rmw=True)
+        def generator(dut):
+            yield from send_bytes(dut, command(CMD_POLL, 1, 0, 0x00000001, 0x00000001))
+            cycles = 0
+            while (yield dut.bridge.source.valid) == 0:
+                cycles += 1
+                self.assertLess(cycles, 1000)
+                yield
+            self.assertGreaterEqual(cycles, 200)
+            self.assertEqual((yield dut.bridge.wishbone.cyc), 0)
+            self.assertEqual((yield from recv_word(dut)) & 0x00000001, 0)
+        run_simulation(dut, generator(dut))
+
+    def test_stream2wishbone_poll_rmw_disabled(self):
+        # Unknown commands are dropped after the address.
+        dut = Stream2WishboneDUT()
+        def generator(dut):
+            yield from send_bytes(dut, command(CMD_RMW, 1, 1))
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 1, 1))
+            self.assertEqual((yield from recv_word(dut)), 0x12345678)
+        run_simulation(dut, generator(dut))
+
+    def stream2wishbone_read_test(self, n, length_width=8, **kwargs):
+        init = [(0x01020304*i) & 0xffffffff for i in range(n)]
+        dut  = Stream2WishboneDUT(init=init, length_width=length_width, **kwargs)
+        dut.cycles = 0
+        def generator(dut):
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, n, 0, length_width=length_width))
+            dut.cycles = 0
+            dut.data = yield from recv_words(dut, n)
+        def timer(dut):
+            while True:
+                dut.cycles += 1
+                yield
+        run_simulation(dut, [generator(dut), passive(timer)(dut)])
+        self.assertEqual(dut.data, init)
+        return dut.cycles
+
+    def test_stream2wishbone_read_prefetch(self):
+        cycles = self.stream2wishbone_read_test(64)
+        cycles_prefetch = self.stream2wishbone_read_test(64, prefetch_depth=4)
+        # Prefetched reads are sent at 1 byte/cycle.
+        self.assertLess(cycles_prefetch, 4*64 + 16)
+        self.assertLess(cycles_prefetch, cycles)
+
+    def test_stream2wishbone_read_prefetch_backpressure(self):
+        # Slow host: bursts must be ended (cti=0b111) before cyc/stb are released on a full FIFO.
+        init = [(0x01020304*i) & 0xffffffff for i in range(32)]
+        dut  = Stream2WishboneDUT(init=init, prefetch_depth=4)
+        dut.errors = 0
+        def generator(dut):
+            # Zero-length read: no-op.
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 0, 0))
+            yield from send_bytes(dut, command(CMD_READ_BURST_INCR, 32, 0))
+            data = []
+            for cycle in range(10000):
+                # Host accepting one byte every 8 cycles.
+                yield dut.bridge.source.ready.eq(cycle % 8 == 0)
+                yield
+                if (yield dut.bridge.source.valid) and (yield dut.bridge.source.ready):
+                    data.append((yield dut.bridge.source.data))
+                if len(data) == 4*32:
+                    break
+            yield dut.bridge.source.ready.eq(0)
+            self.assertEqual([int.from_bytes(bytes(data[4*i:4*(i + 1)]), "big") for i in range(32)], init)
+        @passive
+        def monitor(dut):
+            bus = dut.bridge.wishbone
+            burst = False
+            while True:
+                stb = (yield bus.stb) & (yield bus.cyc)
+                if burst and not stb:
+                    dut.errors += 1
+                burst = stb and (yield bus.ack) and ((yield bus.cti) == 0b010)
+                yield
+        run_simulation(dut, [generator(dut), monitor(dut)])
+        self.assertEqual(dut.errors, 0)
+
+    def test_stream2wishbone_read_length_width(self):
+        self.stream2wishbone_read_test(300, length_width=16)
+        self.stream2wishbone_read_test(300, length_width=16, prefetch_depth=8)
+
+    def test_uartbone_jtagbone_constants(self):
+        # UARTBone/JTAGBone advertise their poll/rmw commands and length width separately.
+        import logging
+        from litex.build.generic_platform import Pins, Subsignal
+        from litex.build.xilinx import XilinxPlatform
+        from litex.build.io import CRG
+        from litex.soc.integration.soc_core import SoCCore
+        logging.disable(logging.CRITICAL)
+        try:
+            platform = XilinxPlatform("xc7a35ticsg324-1L", [
+                ("clk",    0, Pins("E3")),
+                ("serial", 0, Subsignal("tx", Pins("D10")), Subsignal("rx", Pins("A9"))),
+            ], toolchain="vivado")
+            soc = SoCCore(platform,
+                clk_freq                 = int(1e6),
+                cpu_type                 = None,
+                integrated_main_ram_size = 0x100,
+                with_uart                = False,
+                with_timer               = False)
+            soc.crg = CRG(platform.request("clk"))
+            soc.add_uartbone(length_width=16)
+            soc.add_jtagbone(with_poll_rmw=True)
+        finally:
+            logging.disable(logging.NOTSET)
+        self.assertEqual(soc.constants["UARTBONE_LENGTH_WIDTH"], 16)
+        self.assertNotIn("UARTBONE_POLL_RMW", soc.constants)
+        self.assertNotIn("JTAGBONE_LENGTH_WIDTH", soc.constants)
+        self.assertIn("JTAGBONE_POLL_RMW", soc.constants)
@@ -0,0 +1,134 @@
+#
+# This file is part of LiteX.
+#
+# SPDX-License-Identifier: BSD-2-Clause
+
+import unittest
+import random
+
+from migen import *
+
+from litex.soc.interconnect import stream
+from litex.soc.interconnect.csr import AutoCSR
+from litex.soc.cores.video import VideoScaler, VideoFrameBuffer, video_timing_layout
+
+
+class DMAReaderStub(Module):
+    # LiteDRAMDMAReader interface (enable/sink) accepting an address every cycle.
+    def __init__(self, address_width=32):
+        self.enable = Signal(reset=1)
+        self.sink   = stream.Endpoint([("address", address_width)])
+        self.comb += self.sink.ready.eq(1)
+
+
+class DoubleBufferDUT(Module, AutoCSR):
+    def __init__(self, base, length):
+        class DRAMPort: data_width = 32
+        self.vtg_sink = stream.Endpoint(video_timing_layout)
+        self.submodules.dma = DMAReaderStub()
+        VideoFrameBuffer.add_double_buffer(self, DRAMPort, base, length, "sys")
+
+
+class TestVideo(unittest.TestCase):
+    def video_scaler_test(self, hres, hscale, vscale, nlines=3):
+        dut  = VideoScaler(hres=hres, depth=16, hscale=hscale, vscale=vscale)
+        prng = random.Random(42)
+        lines = [[prng.randrange(2**16) for x in range(hres)] for y in range(nlines)]
+        pixels = []
+        for line in lines:
+            scaled = [pixel for pixel in line for i in range(hscale)]
+            pixels += scaled*vscale
+
+        def generator(dut):
+            for line in lines:
+                for pixel in line:
+                    yield dut.sink.valid.eq(1)
+                    yield dut.sink.data.eq(pixel)
+                    yield
+                    while (yield dut.sink.ready) == 0:
+                        yield
+                    yield dut.sink.valid.eq(0)
+                    while prng.randrange(100) < 20:
+                        yield
+
+        def checker(dut):
+            dut.pixels = []
+            while len(dut.pixels) < len(pixels):
+                ready = prng.randrange(100) < 80
+                yield dut.source.ready.eq(ready)
+                yield
+                if ready and (yield dut.source.valid):
+                    dut.pixels.append((yield dut.source.data))
+            yield dut.source.ready.eq(0)
+
+        run_simulation(dut, [generator(dut), checker(dut)])
+        self.assertEqual(dut.pixels, pixels)
+
+    def test_video_scaler_identity(self):
+        self.video_scaler_test(hres=8, hscale=1, vscale=1)
+
+    def test_video_scaler_hscale(self):
+        self.video_scaler_test(hres=8, hscale=2, vscale=1)
+
+    def test_video_scaler_vscale(self):
+        self.video_scaler_test(hres=8, hscale=1, vscale=2)
+
+    def test_video_scaler_hvscale(self):
+        self.video_scaler_test(hres=8, hscale=2, vscale=4)
+        self.video_scaler_test(hres=5, hscale=3, vscale=3)
+
+    def test_video_double_buffer(self):
+        # Framebuffers of 4 words at 0x100 (front) and 0x200 (back).
+        dut = DoubleBufferDUT(base=0x100, length=16)
+        addresses = []
+        pending   = []
+
+        def csr_write(csr, value):
+            yield csr.storage.eq(value)
+            yield csr.re.eq(1)
+            yield
+            yield csr.re.eq(0)
+
+        def generator(dut):
+            yield from csr_write(dut._dma_enable, 1)
+            for i in range(5):
+                yield
+            # Swap requested in the middle of a frame.
+            yield from csr_write(dut._dma_swap_base, 0x200)
+            for i in range(12):
+                pending.append((yield dut._dma_swap_pending.status))
+                yield
+            # Swap completed on VSync.
+            yield dut.vtg_sink.vsync.eq(1)
+            for i in range(4):
+                yield
+            pending.append((yield dut._dma_swap_pending.status))
+            # Single frame (loop disabled): done at the end of the frame.
+            yield from csr_write(dut._dma_enable, 0)
+            yield dut._dma_loop.storage.eq(0)
+            yield from csr_write(dut._dma_enable, 1)
+            for i in range(8):
+                yield
+            self.assertEqual((yield dut._dma_done.status), 1)
+
+        @passive
+        def monitor(dut):
+            while True:
+                if (yield dut.dma.sink.valid) and (yield dut.dma.sink.ready):
+                    addresses.append((yield dut.dma.sink.address))
+                yield
+
+        run_simulation(dut, [generator(dut), monitor(dut)])
+        front = [0x40, 0x41, 0x42, 0x43]
+        back  = [0x80, 0x81, 0x82, 0x83]
+        # Front frames until the end of the frame in progress when the swap is requested...
+        i = addresses.index(0x80)
+        self.assertEqual(i % 4, 0)
+        self.assertEqual(addresses[:i], front*(i//4))
+        # ... then back frames, and a single one once loop is disabled.
+        self.assertEqual(addresses[i:i+8], back*2)
+        self.assertEqual(addresses[-4:], back)
+        self.assertEqual(addresses[-5], 0x82)
+        # Swap pending until VSync.
+        self.assertTrue(all(pending[1:-1]))
+        self.assertEqual(pending[-1], 0)
@@ -5,8 +5,10 @@
 # SPDX-License-Identifier: BSD-2-Clause
 
 import unittest
+import random
 
 from migen import *
+from migen.sim import passive
 
 from litex.soc.interconnect import wishbone
 
@@ -117,3 +119,191 @@ class TestWishbone(unittest.TestCase):
 
         dut = DUT()
         run_simulation(dut, generator(dut))
+
+    def converter_burst_test(self, dw_from, dw_to, n=64, length=8, bte=0, bursting=True, seed=0):
+        # Write then read n master data words in bursts of length accesses (wrap size for wrapping
+        # bursts, or single accesses when not bursting) through a Converter to a bursting SRAM,
+        # returns cycles per access.
+        prng    = random.Random(seed)
+        datas   = [prng.randrange(2**dw_from) for i in range(n)]
+        wrap    = {0: 0, 1: 4, 2: 8, 3: 16}[bte]
+        length  = wrap or length
+        results = {"reads": []}
+
+        def adrs(base):
+            if wrap:
+                return [(base & ~(wrap - 1)) | ((base + i) & (wrap - 1)) for i in range(length)]
+            return [base + i for i in range(length)]
+
+        def burst(bus, we):
+            # Start bursts in the middle of a wrap to exercise wrapping.
+            for base in range(0, n, length):
+                cti = wishbone.CTI_BURST_INCREMENTING if bursting else wishbone.CTI_BURST_NONE
+                for i, adr in enumerate(adrs(base + (wrap//2 if wrap else 0))):
+                    if bursting and i == (length - 1):
+                        cti = wishbone.CTI_BURST_END
+                    if we:
+                        yield from bus.write(adr, datas[adr], cti=cti, bte=bte)
+                    else:
+                        results["reads"].append((adr, (yield from bus.read(adr, cti=cti, bte=bte))))
+
+        def generator(dut):
+            for we in [1, 0]:
+                start = (yield dut.cycles)
+                yield from burst(dut.master, we)
+                results["write" if we else "read"] = ((yield dut.cycles) - start)/n
+
+        class DUT(Module):
+            def __init__(self):
+                self.master = wishbone.Interface(data_width=dw_from, bursting=bursting)
+                slave       = wishbone.Interface(data_width=dw_to,   bursting=True)
+                self.submodules += wishbone.Converter(self.master, slave)
+                self.submodules += wishbone.SRAM(n*dw_from//8, bus=slave)
+                self.cycles = Signal(32)
+                self.sync += self.cycles.eq(self.cycles + 1)
+
+        dut = DUT()
+        run_simulation(dut, generator(dut))
+        for adr, data in results["reads"]:
+            self.assertEqual(data, datas[adr], (dw_from, dw_to, bte, bursting))
+        self.assertEqual(len(results["reads"]), n)
+        return results
+
+    def test_converter_burst(self):
+        for dw_from, dw_to in [(32, 64), (32, 128), (64, 32), (128, 32), (64, 128), (128, 64)]:
+            for bte in [0, 1, 2]:
+                for bursting in [True, False]:
+                    self.converter_burst_test(dw_from, dw_to, bte=bte, bursting=bursting)
+
+    def test_converter_burst_partial_writes(self):
+        # Partial (sel) writes of an UpConverter burst are merged in the slave data word.
+        def generator(dut):
+            yield from dut.wb32.write(0x0000, 0xffffffff)
+            yield from dut.wb32.write(0x0001, 0xffffffff)
+            yield from dut.wb32.write(0x0000, 0x12345678, sel=0b0011, cti=wishbone.CTI_BURST_INCREMENTING)
+            yield from dut.wb32.write(0x0001, 0x9abcdef0, sel=0b1100, cti=wishbone.CTI_BURST_END)
+            self.assertEqual((yield from dut.wb32.read(0x0000)), 0xffff5678)
+            self.assertEqual((yield from dut.wb32.read(0x0001)), 0x9abcffff)
+
+        class DUT(Module):
+            def __init__(self):
+                self.wb32 = wishbone.Interface(data_width=32)
+                wb64      = wishbone.Interface(data_width=64)
+                self.submodules += wishbone.UpConverter(self.wb32, wb64)
+                self.submodules += wishbone.SRAM(32, bus=wb64)
+
+        dut = DUT()
+        run_simulation(dut, generator(dut))
+
+    def test_converter_burst_posted_writes_flush(self):
+        # Posted writes of an UpConverter burst not ended with CTI_BURST_END are flushed to the
+        # slave when the master releases the bus or does an access that can't be merged.
+        def generator(dut):
+            incr = wishbone.CTI_BURST_INCREMENTING
+            # Burst interrupted by a release of the bus.
+            yield from dut.wb32.write(0x0000, 0x11111111, cti=incr)
+            for i in range(4):
+                yield
+            # Burst interrupted by a read.
+            yield from dut.wb32.write(0x0002, 0x22222222, cti=incr)
+            self.assertEqual((yield from dut.wb32.read(0x0002)), 0x22222222)
+            # Burst interrupted by a write to another slave data word.
+            yield from dut.wb32.write(0x0004, 0x44444444, cti=incr)
+            yield from dut.wb32.write(0x0007, 0x77777777)
+            self.assertEqual((yield from dut.wb32.read(0x0000)), 0x11111111)
+            self.assertEqual((yield from dut.wb32.read(0x0004)), 0x44444444)
+            self.assertEqual((yield from dut.wb32.read(0x0006)), 0x00000000)
+            self.assertEqual((yield from dut.wb32.read(0x0007)), 0x77777777)
+
+        class DUT(Module):
+            def __init__(self):
+                self.wb32 = wishbone.Interface(data_width=32)
+                wb64      = wishbone.Interface(data_width=64)
+                self.submodules += wishbone.UpConverter(self.wb32, wb64)
+                self.submodules += wishbone.SRAM(32, bus=wb64)
+
+        dut = DUT()
+        run_simulation(dut, generator(dut))
+
+    def test_converter_burst_benchmark(self):
+        # Sustained throughput (cycles per master access) of bursts vs single accesses.
+        for dw_from, dw_to in [(32, 64), (32, 128), (64, 32), (128, 32), (64, 128), (128, 64)]:
+            single = self.converter_burst_test(dw_from, dw_to, n=64, length=16, bursting=False)
+            burst  = self.converter_burst_test(dw_from, dw_to, n=64, length=16, bursting=True)
+            ratio  = max(dw_from, dw_to)//min(dw_from, dw_to)
+            for kind in ["write", "read"]:
+                self.assertLess(burst[kind], single[kind], (dw_from, dw_to, kind))
+            if dw_from > dw_to:
+                # Close to one slave access per cycle.
+                self.assertLessEqual(burst["read"],  ratio + 1, (dw_from, dw_to))
+                self.assertLessEqual(burst["write"], ratio + 1, (dw_from, dw_to))
+            else:
+                # Single slave access per slave data word.
+                self.assertLessEqual(burst["write"], 1 + 2/ratio, (dw_from, dw_to))
+                self.assertLessEqual(burst["read"],  1 + 2/ratio, (dw_from, dw_to))
+
+    def cache_trace_test(self, trace, cache_cls=wishbone.SetAssociativeCache, cachesize=16,
+        master_data_width=32, slave_data_width=32, **kwargs):
+        # Run trace of (we, adr, dat) accesses through the cache, check read data against a model
+        # and return number of cycles and slave refills.
+        stats = {"cycles": 0, "refills": 0}
+
+        def generator(dut):
+            model = {}
+            for we, adr, dat in trace:
+                if we:
+                    yield from dut.master.write(adr, dat)
+                    model[adr] = dat
+                else:
+                    self.assertEqual((yield from dut.master.read(adr)), model.get(adr, 0))
+
+        @passive
+        def monitor(dut):
+            while True:
+                stats["cycles"] += 1
+                if ((yield dut.slave.cyc) & (yield dut.slave.stb) & (yield dut.slave.ack) &
+                    ((yield dut.slave.we) == 0)):
+                    stats["refills"] += 1
+                yield
+
+        class DUT(Module):
+            def __init__(self):
+                self.master = wishbone.Interface(data_width=master_data_width)
+                self.slave  = wishbone.Interface(data_width=slave_data_width)
+                self.submodules.cache = cache_cls(
+                    cachesize = cachesize,
+                    master    = self.master,
+                    slave     = self.slave,
+                    **kwargs)
+                self.submodules.sram = wishbone.SRAM(1024, bus=self.slave)
+
+        dut = DUT()
+        run_simulation(dut, [generator(dut), monitor(dut)])
+        return stats
+
+    def test_set_associative_cache(self):
+        prng  = random.Random(42)
+        trace = [(prng.randrange(2), prng.randrange(128), prng.randrange(2**32)) for _ in range(128)]
+        for master_data_width, slave_data_width in [(32, 32), (32, 128), (64, 32)]:
+            for ways, policy in [(1, "lru"), (2, "lru"), (4, "lru"), (4, "plru"), (4, "random")]:
+                with self.subTest(dw_from=master_data_width, dw_to=slave_data_width, ways=ways,
+                    policy=policy):
+                    self.cache_trace_test(trace,
+                        cachesize         = 64,
+                        master_data_width = master_data_width,
+                        slave_data_width  = slave_data_width,
+                        ways              = ways,
+                        policy            = policy,
+                        reverse           = False)
+
+    def test_set_associative_cache_aliasing_benchmark(self):
+        # Two hot lines aliasing on the same set: the direct-mapped Cache thrashes while the
+        # 2-way SetAssociativeCache only refills both lines once.
+        trace = []
+        for i in range(32):
+            trace += [(0, 0x100, None), (0, 0x110, None)]
+        dm_stats = self.cache_trace_test(trace, cache_cls=wishbone.Cache)
+        sa_stats = self.cache_trace_test(trace, ways=2)
+        self.assertEqual(dm_stats["refills"], len(trace))
+        self.assertEqual(sa_stats["refills"], 2)
+        self.assertLess(sa_stats["cycles"], dm_stats["cycles"])